@@ -5,6 +5,11 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+
+Live event stream (store/api/events/) needs this entry point, e.g.:
+    uvicorn shop_core.asgi:application --workers 1
+Events are broadcast in-process, so every client of one stream must be
+served by the same worker process.
 """
 
 import os
@@ -155,12 +155,52 @@ import os
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# TTF-шрифт з кирилицею для PDF (чеки, етикетки). Якщо не задано — store/fonts/DejaVuSans.ttf
+# або системні шрифти (DejaVu/Liberation/Noto на Linux, Arial на Windows).
+# Застосунок не постачає власного шрифту: каталогу store/fonts/ у репозиторії немає,
+# його створюють при розгортанні, щоб покласти туди TTF. Без нього і без системного
+# шрифту PDF друкуються Helvetica, у якій немає кирилиці
+PDF_FONT_PATH = os.getenv('PDF_FONT_PATH') or None
+PDF_FONT_BOLD_PATH = os.getenv('PDF_FONT_BOLD_PATH') or None
+
+# Кодова сторінка термопринтера для чеків ESC/POS: 'cp1251' (WPC1251) або 'cp866' (PC866)
+ESCPOS_CODEPAGE = os.getenv('ESCPOS_CODEPAGE', 'cp1251')
+
 # === НАЛАШТУВАННЯ ВХОДУ ===
 LOGIN_URL = '/login/'
 LOGIN_REDIRECT_URL = '/'  # Після входу кидаємо на головну (а там розберемося)
 LOGOUT_REDIRECT_URL = '/login/'  # Після виходу - на логін
 LOGOUT_ALLOWED_METHODS = ['POST']  # Дозволити вихід тільки через POST
 
+# === КЕШ ===
+# Для кількох процесів (gunicorn/uvicorn + фонові задачі) варто вказати спільний бекенд,
+# напр. CACHE_BACKEND=django.core.cache.backends.redis.RedisCache
+# run_report_scheduler пише прогріті звіти в кеш, який мають бачити веб-воркери, — у продакшені
+# потрібен спільний бекенд (Redis, Memcached, DatabaseCache); з LocMemCache планувальник не запуститься
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'sis-cache'),
+    }
+}
+
+# TTL секцій аналітики (секунди), перевизначає DashboardService.SECTION_TTL
+DASHBOARD_SECTION_TTL = {}
+
+# Інтервали фонових звітних задач (секунди), напр. {'supplier_stats': 300}; див. run_report_scheduler
+REPORT_JOB_INTERVALS = {}
+
+# Дозамовлення (store.forecasting): днів до поставки, днів до наступного замовлення, z рівня сервісу
+REORDER_LEAD_TIME_DAYS = int(os.getenv('REORDER_LEAD_TIME_DAYS', '3'))
+REORDER_REVIEW_DAYS = int(os.getenv('REORDER_REVIEW_DAYS', '7'))
+REORDER_SERVICE_Z = float(os.getenv('REORDER_SERVICE_Z', '1.65'))
+
+# Чи оновлювати ціну закупівлі товару з unit_cost при проведенні отриманої поставки
+PURCHASE_RECEIVE_UPDATES_PRICE = os.getenv('PURCHASE_RECEIVE_UPDATES_PRICE', 'False') == 'True'
+
+# Розмір пулу потоків для паралельних звітних запитів (store.reports.run_parallel)
+REPORT_MAX_WORKERS = int(os.getenv('REPORT_MAX_WORKERS', '4'))
+
 # === НАЛАШТУВАННЯ СЕСІЇ ===
 SESSION_ENGINE = 'django.contrib.sessions.backends.db'
 SESSION_COOKIE_SECURE = False  # Set to True in production with HTTPS
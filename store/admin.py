@@ -1,6 +1,7 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.utils.html import format_html
 from .models import Category, Product, Order, OrderItem, Supplier, Purchase, PurchaseItem, WriteOff, Return, ReturnItem
+from .services import PurchaseService
 
 # === КАТЕГОРІЇ ===
 class CategoryAdmin(admin.ModelAdmin):
@@ -56,8 +57,8 @@ class OrderAdmin(admin.ModelAdmin):
 
 # 3. ТОВАРИ (Product)
 class ProductAdmin(admin.ModelAdmin):
-    list_display = ['name', 'category', 'price', 'purchase_price', 'quantity', 'expiry_date']
-    list_filter = ['category']
+    list_display = ['name', 'category', 'price', 'purchase_price', 'quantity', 'reorder_point', 'is_low_stock', 'expiry_date']
+    list_filter = ['category', 'is_low_stock']
     search_fields = ['name', 'sku']
 
 
@@ -85,6 +86,7 @@ class PurchaseAdmin(admin.ModelAdmin):
     date_hierarchy = 'created_at'
     inlines = [PurchaseItemInline]
     readonly_fields = ['total_cost']
+    actions = ['receive_selected']
 
     def get_readonly_fields(self, request, obj=None):
         # Блокуємо редагування supplier після збереження
@@ -93,23 +95,41 @@ class PurchaseAdmin(admin.ModelAdmin):
             base_readonly.append('supplier')
         return base_readonly
 
-    def save_model(self, request, obj, form, change):
-        # При зміні статусу на "received" — зараховуємо товар у базу
-        super().save_model(request, obj, form, change)
-        purchase = obj
-        if purchase.status == 'received' and not purchase.received_applied:
-            purchase.apply_to_stock_once()
-
     def save_formset(self, request, form, formset, change):
         formset.save()
         # Після збереження позицій — перераховуємо total_cost
         purchase = form.instance
         purchase.recalc_total()
         purchase.save(update_fields=['total_cost'])
-        # миттєве зарахування при статусі "Отримано"
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        # При статусі "Отримано" зараховуємо товар — вже з усіма збереженими позиціями.
+        # apply_to_stock_once блокує поставку, тож паралельне збереження не проведе її вдруге
+        purchase = form.instance
         if purchase.status == 'received' and not purchase.received_applied:
             purchase.apply_to_stock_once()
 
+    @admin.action(description="Позначити отриманими та провести на склад")
+    def receive_selected(self, request, queryset):
+        results = PurchaseService.receive_purchases(queryset.values_list('id', flat=True))
+        received = [r for r in results if r['result'] == PurchaseService.RECEIVED]
+        skipped = [r for r in results if r['result'] != PurchaseService.RECEIVED]
+        if received:
+            total = sum(r['total_cost'] for r in received)
+            self.message_user(
+                request,
+                f"Проведено поставок: {len(received)}, одиниць товару: {sum(r['quantity'] for r in received)}, "
+                f"на суму {total:.2f} ₴",
+                messages.SUCCESS,
+            )
+        if skipped:
+            self.message_user(
+                request,
+                "Пропущено (вже проведені або скасовані): " + ', '.join(f"#{r['id']}" for r in skipped),
+                messages.WARNING,
+            )
+
 
 admin.site.register(Supplier, SupplierAdmin)
 admin.site.register(Purchase, PurchaseAdmin)
@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class StoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'store'
+
+    def ready(self):
+        from .services import register_report_jobs
+        from .pdf import receipt_styles
+        register_report_jobs()
+        # Шрифти PDF реєструються при старті, а не в першому запиті на чек
+        receipt_styles()
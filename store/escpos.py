@@ -0,0 +1,97 @@
+"""
+Чек у вигляді сирих команд ESC/POS для термопринтера 80 мм.
+
+Шрифт A на 80-мм стрічці вміщує 48 символів у рядку. Кирилиця друкується в
+однобайтовій кодовій сторінці: за замовчуванням WPC1251 (є всі українські
+літери), для старих принтерів — PC866 (без І/і та Ґ/ґ, вони замінюються).
+"""
+from django.conf import settings
+
+ESC = b'\x1b'
+GS = b'\x1d'
+
+INIT = ESC + b'@'
+ALIGN_LEFT = ESC + b'a\x00'
+ALIGN_CENTER = ESC + b'a\x01'
+BOLD_ON = ESC + b'E\x01'
+BOLD_OFF = ESC + b'E\x00'
+DOUBLE_SIZE = GS + b'!\x11'
+NORMAL_SIZE = GS + b'!\x00'
+FEED_AND_CUT = GS + b'V\x42\x03'
+
+LINE_WIDTH = 48
+
+# Кодування Python -> номер таблиці для команди ESC t n (нумерація Epson)
+CODEPAGES = {
+    'cp1251': 46,
+    'cp866': 17,
+}
+# Літери, яких немає в PC866
+CP866_FALLBACK = str.maketrans({'І': 'I', 'і': 'i', 'Ґ': 'Г', 'ґ': 'г'})
+
+
+class EscPosWriter:
+    """Накопичує команди та текст у вибраній кодовій сторінці."""
+
+    def __init__(self, codepage=None, width=LINE_WIDTH):
+        self.codepage = codepage or getattr(settings, 'ESCPOS_CODEPAGE', 'cp1251')
+        if self.codepage not in CODEPAGES:
+            raise ValueError(f"Непідтримувана кодова сторінка: {self.codepage}")
+        self.width = width
+        self._buffer = bytearray(INIT + ESC + b't' + bytes([CODEPAGES[self.codepage]]))
+
+    def raw(self, data):
+        self._buffer += data
+        return self
+
+    def text(self, value):
+        if self.codepage == 'cp866':
+            value = value.translate(CP866_FALLBACK)
+        self._buffer += value.encode(self.codepage, errors='replace')
+        return self
+
+    def line(self, value=''):
+        return self.text(value[:self.width] + '\n')
+
+    def columns(self, left, right):
+        """Текст зліва і справа в одному рядку (лівий обрізається, якщо не вміщується)."""
+        left = left[:max(0, self.width - len(right) - 1)]
+        return self.line(left + ' ' * (self.width - len(left) - len(right)) + right)
+
+    def wrapped(self, value):
+        """Довгий текст — кількома рядками по ширині стрічки."""
+        for start in range(0, max(len(value), 1), self.width):
+            self.line(value[start:start + self.width])
+        return self
+
+    def separator(self, char='-'):
+        return self.line(char * self.width)
+
+    def getvalue(self):
+        return bytes(self._buffer)
+
+
+def render_receipt(order, items, codepage=None):
+    """
+    Args:
+        order: Order - чек
+        items: iterable[OrderItem] - позиції з product
+
+    Returns:
+        bytes - потік ESC/POS, що закінчується відрізом паперу
+    """
+    out = EscPosWriter(codepage)
+    out.raw(ALIGN_CENTER + BOLD_ON + DOUBLE_SIZE).line('КАСА')
+    out.raw(NORMAL_SIZE + BOLD_OFF).line(f'Чек №{order.id}')
+    out.line(order.created_at.strftime('%d.%m.%Y %H:%M:%S'))
+    out.raw(ALIGN_LEFT).separator()
+
+    for item in items:
+        out.wrapped(item.product.name)
+        out.columns(f'  {item.quantity} x {item.price:.2f}', f'{item.quantity * item.price:.2f}')
+
+    out.separator()
+    out.raw(BOLD_ON).columns('РАЗОМ:', f'{order.total_price:.2f} грн').raw(BOLD_OFF)
+    out.separator('=')
+    out.raw(ALIGN_CENTER).line('Дякуємо за покупку!')
+    return out.raw(FEED_AND_CUT).getvalue()
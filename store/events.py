@@ -0,0 +1,136 @@
+"""
+Внутрішньопроцесний розсильник подій для SSE-потоку (/store/api/events/).
+
+Події публікуються лише після коміту транзакції (transaction.on_commit), тож
+клієнти ніколи не бачать продажів чи залишків, які потім відкотилися.
+Розсильник живе в пам'яті одного процесу ASGI-сервера: при кількох воркерах
+кожен клієнт отримує події лише з того процесу, в якому їх згенеровано.
+"""
+import asyncio
+import itertools
+import json
+import threading
+from collections import deque
+
+from django.db import transaction
+
+# Події, що використовуються в інтерфейсі
+EVENT_ORDER = 'order'
+EVENT_RETURN = 'return'
+EVENT_WRITEOFF = 'writeoff'
+EVENT_STOCK = 'stock'
+
+# Поля подій, які бачать лише менеджери (маржа): касирам вони не розсилаються
+MANAGER_ONLY_FIELDS = {
+    EVENT_ORDER: ('profit',),
+    EVENT_RETURN: ('loss',),
+}
+
+# Значення stock.crossed
+CROSSED_LOW = 'low'
+CROSSED_RESTORED = 'restored'
+
+
+class Broadcaster:
+    """Розсилає події всім підписникам (asyncio.Queue) з будь-якого потоку."""
+
+    def __init__(self, history_size=200, queue_size=500):
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._history = deque(maxlen=history_size)
+        self._subscribers = {}
+        self._queue_size = queue_size
+
+    def publish(self, event_type, data):
+        with self._lock:
+            event = (next(self._ids), event_type, data)
+            self._history.append(event)
+            subscribers = list(self._subscribers.items())
+        for queue, loop in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._offer, queue, event)
+            except RuntimeError:
+                # Цикл подій підписника вже закрито
+                self.unsubscribe(queue)
+
+    @staticmethod
+    def _offer(queue, event):
+        if not queue.full():
+            queue.put_nowait(event)
+
+    def subscribe(self, last_event_id=None):
+        """
+        Реєструє підписника в поточному циклі подій.
+
+        Returns:
+            asyncio.Queue - з уже доданими пропущеними подіями після last_event_id
+        """
+        queue = asyncio.Queue(maxsize=self._queue_size)
+        with self._lock:
+            if last_event_id is not None:
+                for event in self._history:
+                    if event[0] > last_event_id and not queue.full():
+                        queue.put_nowait(event)
+            self._subscribers[queue] = asyncio.get_running_loop()
+        return queue
+
+    def unsubscribe(self, queue):
+        with self._lock:
+            self._subscribers.pop(queue, None)
+
+
+broadcaster = Broadcaster()
+
+
+def publish_on_commit(event_type, data):
+    """Публікує подію після успішного коміту поточної транзакції."""
+    transaction.on_commit(lambda: broadcaster.publish(event_type, data))
+
+
+def stock_crossing(old_quantity, new_quantity, threshold):
+    """'low' — впав до порогу, 'restored' — піднявся вище, None — без перетину."""
+    if old_quantity > threshold >= new_quantity:
+        return CROSSED_LOW
+    if new_quantity > threshold >= old_quantity:
+        return CROSSED_RESTORED
+    return None
+
+
+def publish_stock_change(product, old_quantity, new_quantity):
+    """
+    Подія зміни залишку з прапорцями перетину точки дозамовлення товару.
+    """
+    publish_on_commit(EVENT_STOCK, {
+        'id': product.id,
+        'name': product.name,
+        'qty': new_quantity,
+        'reorder_point': product.reorder_point,
+        'low': new_quantity <= product.reorder_point,
+        'crossed': stock_crossing(old_quantity, new_quantity, product.reorder_point),
+    })
+
+
+def publish_order(order, items_count):
+    """Подія нового чека (для стрічки останніх продажів і підсумків дня)."""
+    publish_on_commit(EVENT_ORDER, {
+        'id': order.id,
+        'total': order.total_price,
+        'profit': order.total_profit,
+        'items': items_count,
+        'created_at': order.created_at.isoformat(),
+    })
+
+
+def format_sse(event, manager=True):
+    """
+    Серіалізує подію у формат text/event-stream.
+
+    Args:
+        manager: bool - False — без полів MANAGER_ONLY_FIELDS (потік касира)
+    """
+    event_id, event_type, data = event
+    hidden = () if manager else MANAGER_ONLY_FIELDS.get(event_type, ())
+    if hidden:
+        data = {key: value for key, value in data.items() if key not in hidden}
+    payload = json.dumps(data, ensure_ascii=False, default=str)
+    return f"id: {event_id}\nevent: {event_type}\ndata: {payload}\n\n"
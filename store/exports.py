@@ -0,0 +1,87 @@
+"""
+Фонові експорти для веб-інтерфейсу (чеки за період, цінники).
+
+Великий експорт не рендериться у веб-воркері: представлення запускає
+management-команду окремим процесом (вона сама розпаралелює рендер) і
+перенаправляє на сторінку експорту, яка показує прогрес і віддає готовий файл.
+Стан експорту — файли в MEDIA_ROOT/exports/web:
+- <name> — готовий результат (команди пишуть у <name>.part і перейменовують);
+- <name>.log — вивід команди: рядки прогресу або помилка.
+"""
+import os
+import re
+import subprocess
+import sys
+import time
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+
+EXPORT_SUBDIR = Path('exports') / 'web'
+# Готові й незавершені експорти старші за добу видаляються під час наступного запуску
+EXPORT_TTL = 24 * 3600
+NAME_RE = re.compile(r'^[\w-]+\.(zip|pdf)$')
+
+READY = 'ready'
+RUNNING = 'running'
+FAILED = 'failed'
+
+
+def export_dir():
+    return Path(settings.MEDIA_ROOT) / EXPORT_SUBDIR
+
+
+def _purge(directory):
+    cutoff = time.time() - EXPORT_TTL
+    for path in directory.iterdir():
+        try:
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def start(command, args, prefix, extension):
+    """
+    Запускає `manage.py <command> <args> --output <файл>` окремим процесом.
+
+    Returns:
+        str - назва експорту для status() і сторінки завантаження
+    """
+    directory = export_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    _purge(directory)
+
+    name = f'{prefix}_{uuid.uuid4().hex[:12]}.{extension}'
+    env = {**os.environ, 'DJANGO_SETTINGS_MODULE': settings.SETTINGS_MODULE}
+    with open(directory / f'{name}.log', 'wb') as log:
+        subprocess.Popen(
+            [sys.executable, str(Path(settings.BASE_DIR) / 'manage.py'), command, *args,
+             '--output', str(directory / name)],
+            stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT,
+            cwd=settings.BASE_DIR, env=env, start_new_session=True,
+        )
+    return name
+
+
+def status(name):
+    """
+    Returns:
+        tuple | None - (READY, шлях), (RUNNING, останній рядок прогресу),
+        (FAILED, повідомлення) або None, якщо такого експорту немає
+    """
+    if not NAME_RE.match(name):
+        return None
+    path = export_dir() / name
+    if path.exists():
+        return READY, path
+    try:
+        output = (export_dir() / f'{name}.log').read_text(errors='replace')
+    except FileNotFoundError:
+        return None
+    lines = [line.strip() for line in output.splitlines() if line.strip()]
+    # Команда завершилась помилкою: CommandError або необроблений виняток
+    if 'Traceback' in output or 'CommandError' in output:
+        return FAILED, lines[-1]
+    return RUNNING, lines[-1] if lines else ''
@@ -0,0 +1,204 @@
+"""
+Прогноз попиту і пропозиції дозамовлення.
+
+Денні продажі беруться з ProductDailySales — це продажі з OrderItem за мінусом
+повернень, уже згруповані по локальних днях, — одним запитом у матрицю
+товари × дні. Експоненційне згладжування з тижневою сезонністю (адитивний
+Holt-Winters без тренду) рахується для всіх товарів одночасно: цикл іде по
+днях історії, а кожен крок — векторна операція NumPy над усіма товарами.
+
+Точка дозамовлення = прогноз на час доставки + страховий запас
+(z · σ похибки прогнозу · √днів доставки). Якщо залишок разом із уже
+замовленим (відкриті поставки) не вище неї, пропонується дозамовити до рівня
+«прогноз на доставку і період до наступного замовлення + страховий запас».
+"""
+import math
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+
+SEASON_LENGTH = 7
+HISTORY_DAYS = 12 * SEASON_LENGTH
+# Коефіцієнти згладжування рівня і сезонності
+ALPHA = 0.3
+GAMMA = 0.2
+
+DEFAULT_LEAD_TIME_DAYS = 3
+DEFAULT_REVIEW_DAYS = 7
+# z для рівня сервісу ~95% (ймовірність не залишитись без товару до поставки)
+DEFAULT_SERVICE_Z = 1.65
+
+
+class SalesHistory:
+    """Товари (паралельні масиви) і матриця денних продажів [товар, день]."""
+
+    def __init__(self, ids, names, quantity, on_order, supplier_ids, supplier_names, purchase_prices, sales, start):
+        self.ids = ids
+        self.names = names
+        self.quantity = quantity
+        self.on_order = on_order
+        self.supplier_ids = supplier_ids
+        self.supplier_names = supplier_names
+        self.purchase_prices = purchase_prices
+        self.sales = sales
+        self.start = start
+
+
+def load_sales_history(days=HISTORY_DAYS, today=None):
+    """
+    Три запити: товари, кількість у відкритих поставках і продажі за `days`
+    повних днів до сьогодні.
+
+    Returns:
+        SalesHistory
+    """
+    from django.db.models import Sum
+
+    from .models import Product, ProductDailySales, Purchase, PurchaseItem
+
+    today = today or timezone.localdate()
+    start = today - timedelta(days=days)
+
+    rows = list(Product.objects.order_by('id').values_list(
+        'id', 'name', 'quantity', 'supplier_id', 'supplier__name', 'purchase_price',
+    ))
+    ids, names, quantity, supplier_ids, supplier_names, prices = zip(*rows) if rows else ((),) * 6
+    ids = np.array(ids, dtype=np.int64)
+
+    on_order = np.zeros(len(ids))
+    ordered = list(PurchaseItem.objects.filter(
+        purchase__status__in=(Purchase.Status.DRAFT, Purchase.Status.ORDERED),
+    ).values_list('product_id').annotate(qty=Sum('quantity')).order_by())
+    if ordered:
+        product_ids, qty = zip(*ordered)
+        on_order[np.searchsorted(ids, product_ids)] = qty
+
+    sales = np.zeros((len(ids), days))
+    daily = ProductDailySales.objects.filter(date__gte=start, date__lt=today).values_list('product_id', 'date', 'qty_sold')
+    product_idx, day_idx, qty = [], [], []
+    for product_id, day, sold in daily.iterator(chunk_size=10000):
+        product_idx.append(product_id)
+        day_idx.append((day - start).days)
+        qty.append(sold)
+    if qty:
+        # ids відсортовані — позиція товару в матриці через бінарний пошук
+        sales[np.searchsorted(ids, product_idx), day_idx] = qty
+    # День, коли повернули більше, ніж продали, для прогнозу — нульовий попит
+    np.clip(sales, 0, None, out=sales)
+
+    return SalesHistory(
+        ids, list(names), np.array(quantity, dtype=float), on_order, list(supplier_ids), list(supplier_names),
+        list(prices), sales, start,
+    )
+
+
+def fit(sales, alpha=ALPHA, gamma=GAMMA, season_length=SEASON_LENGTH):
+    """
+    Згладжування для всіх рядків матриці одночасно.
+
+    Args:
+        sales: ndarray [товари, дні] - щонайменше два сезони історії
+
+    Returns:
+        tuple - (рівень [товари], сезонні поправки [товари, season_length],
+        σ похибки прогнозу на день [товари])
+    """
+    n, days = sales.shape
+    if days < 2 * season_length:
+        raise ValueError(f"Потрібно щонайменше {2 * season_length} днів історії")
+
+    # Початкові значення — середнє і відхилення днів тижня за перші два сезони
+    first = sales[:, :2 * season_length]
+    level = first.mean(axis=1)
+    season = first.reshape(n, 2, season_length).mean(axis=1) - level[:, None]
+
+    squared_error = np.zeros(n)
+    for t in range(days):
+        position = t % season_length
+        observed = sales[:, t]
+        seasonal = season[:, position]
+        squared_error += (observed - level - seasonal) ** 2
+        new_level = alpha * (observed - seasonal) + (1 - alpha) * level
+        season[:, position] = gamma * (observed - new_level) + (1 - gamma) * seasonal
+        level = new_level
+
+    return level, season, np.sqrt(squared_error / days)
+
+
+def forecast(level, season, horizon, offset):
+    """
+    Прогноз на `horizon` днів уперед (не від'ємний).
+
+    Args:
+        offset: int - номер першого дня прогнозу від початку історії (для дня тижня)
+    """
+    positions = (offset + np.arange(horizon)) % season.shape[1]
+    return np.clip(level[:, None] + season[:, positions], 0, None)
+
+
+def reorder_suggestions(lead_time_days=None, review_days=None, service_z=None, today=None):
+    """
+    Пропозиції дозамовлення, згруповані за постачальниками.
+
+    Товари без постачальника не пропонуються — для них не створити поставку.
+
+    Returns:
+        list[dict] - [{supplier_id, supplier_name, total_cost, items: [{product_id,
+        name, stock, on_order, daily_demand, reorder_point, quantity, unit_cost}]}]
+    """
+    lead = lead_time_days or getattr(settings, 'REORDER_LEAD_TIME_DAYS', DEFAULT_LEAD_TIME_DAYS)
+    review = review_days or getattr(settings, 'REORDER_REVIEW_DAYS', DEFAULT_REVIEW_DAYS)
+    z = service_z if service_z is not None else getattr(settings, 'REORDER_SERVICE_Z', DEFAULT_SERVICE_Z)
+
+    history = load_sales_history(today=today)
+    if not len(history.ids):
+        return []
+    level, season, sigma = fit(history.sales)
+    demand = forecast(level, season, lead + review, offset=history.sales.shape[1])
+
+    safety = z * sigma * math.sqrt(lead)
+    reorder_point = np.ceil(demand[:, :lead].sum(axis=1) + safety)
+    order_up_to = np.ceil(demand.sum(axis=1) + safety)
+    position = history.quantity + history.on_order
+    quantity = np.maximum(order_up_to - position, 0)
+    has_supplier = np.array([supplier_id is not None for supplier_id in history.supplier_ids])
+    selected = np.flatnonzero(has_supplier & (position <= reorder_point) & (quantity > 0))
+
+    groups = {}
+    for i in selected:
+        supplier_id = history.supplier_ids[i]
+        group = groups.setdefault(supplier_id, {
+            'supplier_id': supplier_id,
+            'supplier_name': history.supplier_names[i],
+            'total_cost': 0.0,
+            'items': [],
+        })
+        unit_cost = history.purchase_prices[i]
+        group['items'].append({
+            'product_id': int(history.ids[i]),
+            'name': history.names[i],
+            'stock': int(history.quantity[i]),
+            'on_order': int(history.on_order[i]),
+            'daily_demand': round(float(demand[i].mean()), 2),
+            'reorder_point': int(reorder_point[i]),
+            'quantity': int(quantity[i]),
+            'unit_cost': str(unit_cost),
+        })
+        group['total_cost'] += float(unit_cost) * int(quantity[i])
+
+    for group in groups.values():
+        group['items'].sort(key=lambda item: item['name'])
+        group['total_cost'] = round(group['total_cost'], 2)
+    return sorted(groups.values(), key=lambda group: group['supplier_name'])
+
+
+def purchase_items(suggestions, supplier_id=None):
+    """Позиції для PurchaseService.create_purchase_from_items (за потреби — одного постачальника)."""
+    return [
+        {'product_id': item['product_id'], 'quantity': item['quantity'], 'unit_cost': item['unit_cost']}
+        for group in suggestions
+        if supplier_id is None or group['supplier_id'] == supplier_id
+        for item in group['items']
+    ]
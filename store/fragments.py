@@ -0,0 +1,65 @@
+"""
+Кешовані HTML-фрагменти списків (таблиця + пагінація без решти сторінки).
+
+Ключ фрагмента складається з назви, версії даних і параметрів запиту.
+Версії ('catalog' — товари/категорії/залишки, 'receipts' — чеки) збільшуються
+після коміту будь-якої зміни, тож старі фрагменти просто перестають читатися
+і витісняються за TTL — інвалідувати кожен ключ окремо не потрібно.
+"""
+import hashlib
+
+from django.core.cache import cache
+from django.db import transaction
+
+VERSION_PREFIX = 'fragments:version:'
+FRAGMENT_PREFIX = 'fragments:html:'
+FRAGMENT_TTL = 300
+
+FRAGMENT_HEADER = 'X-Fragment'
+
+CATALOG = 'catalog'
+RECEIPTS = 'receipts'
+
+
+def get_version(name):
+    version = cache.get(VERSION_PREFIX + name)
+    if version is None:
+        # add() не перезапише версію, яку щойно встановив інший процес
+        cache.add(VERSION_PREFIX + name, 1, None)
+        version = cache.get(VERSION_PREFIX + name, 1)
+    return version
+
+
+def _bump(name):
+    try:
+        cache.incr(VERSION_PREFIX + name)
+    except ValueError:
+        cache.add(VERSION_PREFIX + name, 2, None)
+
+
+def bump_version(name):
+    """Робить застарілими всі фрагменти, що залежать від даних name (після коміту)."""
+    transaction.on_commit(lambda: _bump(name))
+
+
+def wants_fragment(request):
+    return request.headers.get(FRAGMENT_HEADER) == '1'
+
+
+def cached_fragment(request, name, version_name, render):
+    """
+    Повертає HTML фрагмента з кешу або рендерить його.
+
+    Args:
+        name: str - назва фрагмента
+        version_name: str - версія даних, від якої залежить фрагмент
+        render: callable - () -> str
+    """
+    params = '&'.join(f'{key}={value}' for key, value in sorted(request.GET.items()))
+    digest = hashlib.md5(params.encode()).hexdigest()
+    key = f'{FRAGMENT_PREFIX}{name}:{get_version(version_name)}:{digest}'
+    html = cache.get(key)
+    if html is None:
+        html = render()
+        cache.set(key, html, FRAGMENT_TTL)
+    return html
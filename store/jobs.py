@@ -0,0 +1,170 @@
+"""
+Реєстр звітних задач, які фоново прогріваються в кеш.
+
+Команда run_report_scheduler періодично виконує зареєстровані задачі (з
+розкидом інтервалу, щоб задачі не збігалися в часі) і кладе результати в кеш
+разом з часом оновлення. Представлення читають готові значення через read():
+- свіже значення віддається одразу;
+- застаріле теж віддається одразу, а перерахунок запускається у фоні
+  (stale-while-revalidate) — так сторінки працюють, навіть якщо планувальник
+  зупинено;
+- відсутнє значення рахується в запиті.
+
+Планувальник і веб-процеси обмінюються значеннями лише через спільний кеш
+(Redis, Memcached, база даних, файли): LocMemCache живе всередині процесу,
+тож прогріте планувальником веб-воркери не побачать.
+"""
+import logging
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.utils import timezone
+
+from .reports import can_run_parallel, run_in_background, run_parallel
+
+logger = logging.getLogger(__name__)
+
+VALUE_PREFIX = 'jobs:value:'
+STATS_PREFIX = 'jobs:stats:'
+LOCK_PREFIX = 'jobs:lock:'
+LOCK_TIMEOUT = 300
+DEFAULT_JITTER = 0.1
+
+
+class ReportJob:
+    """Задача: функція без аргументів, результат якої кешується."""
+
+    def __init__(self, name, func, interval, jitter=DEFAULT_JITTER):
+        self.name = name
+        self.func = func
+        self._interval = interval
+        self.jitter = jitter
+
+    @property
+    def interval(self):
+        """Інтервал у секундах (settings.REPORT_JOB_INTERVALS має пріоритет)."""
+        overrides = getattr(settings, 'REPORT_JOB_INTERVALS', {})
+        if self.name in overrides:
+            return overrides[self.name]
+        return self._interval() if callable(self._interval) else self._interval
+
+    def next_delay(self):
+        """Інтервал з випадковим розкидом ±jitter."""
+        spread = self.interval * self.jitter
+        return max(1.0, self.interval + random.uniform(-spread, spread))
+
+
+_registry = {}
+
+
+def is_shared_cache():
+    """Чи бачать кеш інші процеси (планувальник і веб-воркери)."""
+    return not isinstance(caches[DEFAULT_CACHE_ALIAS], (LocMemCache, DummyCache))
+
+
+def register(name, func, interval, jitter=DEFAULT_JITTER):
+    _registry[name] = ReportJob(name, func, interval, jitter)
+    return _registry[name]
+
+
+def get_job(name):
+    """
+    Raises:
+        KeyError - невідома задача
+    """
+    return _registry[name]
+
+
+def jobs():
+    return list(_registry.values())
+
+
+def run(name):
+    """Виконує задачу, зберігає результат і статистику запуску. Повертає результат."""
+    job = get_job(name)
+    started = time.monotonic()
+    stats = cache.get(STATS_PREFIX + name) or {'runs': 0, 'failures': 0}
+    try:
+        value = job.func()
+    except Exception as e:
+        stats.update(failures=stats['failures'] + 1, last_error=str(e), last_failure=timezone.now().isoformat())
+        cache.set(STATS_PREFIX + name, stats, None)
+        raise
+    duration = time.monotonic() - started
+
+    cache.set(VALUE_PREFIX + name, {'value': value, 'refreshed_at': time.time()}, None)
+    stats.update(
+        runs=stats['runs'] + 1,
+        last_success=timezone.now().isoformat(),
+        last_duration=round(duration, 3),
+        last_error=None,
+    )
+    cache.set(STATS_PREFIX + name, stats, None)
+    return value
+
+
+def expire(name):
+    """Скидає кешоване значення (наступне читання порахує його заново)."""
+    cache.delete(VALUE_PREFIX + name)
+
+
+def stats(name):
+    return cache.get(STATS_PREFIX + name) or {}
+
+
+def _revalidate(name):
+    """Фоновий перерахунок застарілого значення; одночасно — лише один."""
+    lock = LOCK_PREFIX + name
+    if not cache.add(lock, 1, LOCK_TIMEOUT):
+        return
+
+    def task():
+        try:
+            run(name)
+        except Exception as e:
+            logger.error(f"Report job {name} failed: {e}")
+        finally:
+            cache.delete(lock)
+
+    if can_run_parallel():
+        run_in_background(task)
+    else:
+        # SQLite або відкрита транзакція: фоновий потік не побачить тих самих даних
+        task()
+
+
+def _is_fresh(name, entry):
+    return time.time() - entry['refreshed_at'] <= get_job(name).interval
+
+
+def read(name):
+    """Значення задачі з кешу (stale-while-revalidate)."""
+    return read_many([name])[name]
+
+
+def read_many(names):
+    """
+    Значення кількох задач; відсутні в кеші рахуються паралельно.
+
+    Returns:
+        dict - {назва задачі: значення}
+    """
+    entries = cache.get_many([VALUE_PREFIX + name for name in names])
+    result = {}
+    missing = []
+    for name in names:
+        entry = entries.get(VALUE_PREFIX + name)
+        if entry is None:
+            missing.append(name)
+            continue
+        if not _is_fresh(name, entry):
+            _revalidate(name)
+            entry = cache.get(VALUE_PREFIX + name, entry)
+        result[name] = entry['value']
+
+    result.update(run_parallel({name: (lambda n=name: run(n)) for name in missing}))
+    return result
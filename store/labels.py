@@ -0,0 +1,221 @@
+"""
+Пакетний друк цінників: назва, ціна, ціна за кг/л/шт і штрихкод артикулу.
+
+Аркуш A4 — сітка 3×8 етикеток 70×37 мм (стандартні самоклейні аркуші).
+Набір товарів ділиться на частини по SHEETS_PER_PART аркушів; кожна частина —
+окремий PDF, тож частини рендеряться незалежно: у процесах-воркерах (команда
+print_labels) або по черзі у веб-запиті, де готова частина одразу йде у ZIP.
+Як і receipt_export.py, модуль виконується у воркерах, тому моделі
+імпортуються всередині функцій.
+"""
+import io
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from django.db import connections
+from reportlab.graphics.barcode.code128 import Code128
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import mm
+from reportlab.lib.utils import simpleSplit
+from reportlab.pdfgen import canvas
+
+from . import zipstream
+from .pdf import register_fonts
+from .rollups import init_worker
+
+LABEL_COLUMNS = 3
+LABEL_ROWS = 8
+LABELS_PER_SHEET = LABEL_COLUMNS * LABEL_ROWS
+LABEL_WIDTH = A4[0] / LABEL_COLUMNS
+LABEL_HEIGHT = A4[1] / LABEL_ROWS
+LABEL_PADDING = 3 * mm
+
+SHEETS_PER_PART = 10
+PART_SIZE = LABELS_PER_SHEET * SHEETS_PER_PART
+
+BARCODE_HEIGHT = 8 * mm
+BARCODE_MAX_WIDTH = LABEL_WIDTH - 2 * LABEL_PADDING - 22 * mm
+
+
+def product_ids(category_id=None, supplier_id=None, changed_since=None):
+    """
+    id товарів для друку в порядку розкладки на полиці (категорія, назва).
+
+    Args:
+        changed_since: date | None - лише товари, змінені з цього локального дня
+    """
+    from .models import Product
+    from .utils import local_midnight
+
+    qs = Product.objects.all()
+    if category_id:
+        qs = qs.filter(category_id=category_id)
+    if supplier_id:
+        qs = qs.filter(supplier_id=supplier_id)
+    if changed_since:
+        qs = qs.filter(updated_at__gte=local_midnight(changed_since))
+    return list(qs.order_by('category__name', 'name', 'id').values_list('id', flat=True))
+
+
+def parts(ids, size=None):
+    size = size or PART_SIZE
+    return [ids[i:i + size] for i in range(0, len(ids), size)]
+
+
+def can_encode(sku):
+    """
+    Чи можна закодувати артикул у Code128 без втрат.
+
+    Code128 кодує лише ASCII; решту символів ReportLab мовчки відкидає
+    (артикул «АБВ-12» дав би робочий, але хибний штрихкод «-12»).
+    """
+    return sku.isascii() and sku.isprintable()
+
+
+def _barcode(sku):
+    """Code128 артикулу, стиснутий по ширині, щоб вміститись на етикетці."""
+    # Тиха зона — відступ етикетки і порожнє місце справа від штрихкоду
+    options = dict(barHeight=BARCODE_HEIGHT, humanReadable=True, fontSize=6, quiet=False)
+    barcode = Code128(sku, **options)
+    if barcode.width > BARCODE_MAX_WIDTH:
+        barcode = Code128(sku, barWidth=barcode.barWidth * BARCODE_MAX_WIDTH / barcode.width, **options)
+    return barcode
+
+
+def draw_label(c, product, x, y, fonts):
+    """Малює одну етикетку з лівим нижнім кутом у (x, y)."""
+    font, bold = fonts
+    right = x + LABEL_WIDTH - LABEL_PADDING
+    top = y + LABEL_HEIGHT - LABEL_PADDING
+
+    c.setStrokeColor(colors.lightgrey)
+    c.setLineWidth(0.25)
+    c.rect(x, y, LABEL_WIDTH, LABEL_HEIGHT)
+
+    # Назва — до двох рядків
+    lines = simpleSplit(product.name, bold, 9, LABEL_WIDTH - 2 * LABEL_PADDING)
+    if len(lines) > 2:
+        lines = [lines[0], lines[1][:-1].rstrip() + '…']
+    c.setFont(bold, 9)
+    for index, line in enumerate(lines):
+        c.drawString(x + LABEL_PADDING, top - 9 - index * 11, line)
+
+    c.setFont(bold, 18)
+    c.drawRightString(right, y + 15 * mm, f'{product.price:.2f} грн')
+
+    c.setFont(font, 7)
+    if product.weight_value:
+        c.drawRightString(right, y + LABEL_PADDING + 9,
+                          f'{product.weight_value.normalize():f} {product.get_weight_unit_display()}')
+    unit_price = product.unit_price()
+    if unit_price:
+        value, unit = unit_price
+        c.drawRightString(right, y + LABEL_PADDING, f'{value:.2f} грн/{unit}')
+
+    if product.sku and can_encode(product.sku):
+        _barcode(product.sku).drawOn(c, x + LABEL_PADDING, y + LABEL_PADDING)
+    elif product.sku:
+        # Без штрихкоду: лише артикул текстом, щоб на касі ввели його вручну
+        c.drawString(x + LABEL_PADDING, y + LABEL_PADDING, f'арт. {product.sku}')
+
+
+def write_sheets(products, target):
+    """
+    Args:
+        products: iterable[Product] - у порядку друку
+        target: str | файловий об'єкт
+    """
+    fonts = register_fonts()
+    # invariant: однаковий набір товарів -> побайтно однаковий PDF
+    c = canvas.Canvas(target, pagesize=A4, invariant=1)
+    c.setTitle('Цінники')
+    position = 0
+    for product in products:
+        if position == LABELS_PER_SHEET:
+            c.showPage()
+            position = 0
+        row, column = divmod(position, LABEL_COLUMNS)
+        draw_label(c, product, column * LABEL_WIDTH, A4[1] - (row + 1) * LABEL_HEIGHT, fonts)
+        position += 1
+    c.showPage()
+    c.save()
+
+
+def _products(ids):
+    from .models import Product
+
+    batch = Product.objects.in_bulk(ids)
+    return [batch[product_id] for product_id in ids if product_id in batch]
+
+
+def render_part(ids):
+    """PDF однієї частини (до SHEETS_PER_PART аркушів). Returns: bytes."""
+    buffer = io.BytesIO()
+    write_sheets(_products(ids), buffer)
+    return buffer.getvalue()
+
+
+def rendered_parts(ids, workers=1, progress=None):
+    """
+    PDF частин у порядку ids; з workers > 1 — пулом процесів.
+
+    У роботі одночасно не більше 2×workers частин, тож пам'ять не росте
+    разом із кількістю товарів, навіть якщо споживач повільний.
+
+    Args:
+        progress: callable | None - progress(готово, всього)
+    """
+    chunks = parts(ids)
+    total = len(ids)
+    done = 0
+
+    def results():
+        if workers <= 1:
+            for chunk in chunks:
+                yield render_part(chunk)
+            return
+        # Дочірні процеси не повинні успадкувати відкриті з'єднання батьківського
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+            pending = deque()
+            for chunk in chunks:
+                pending.append(pool.submit(render_part, chunk))
+                if len(pending) >= 2 * workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    # results() першим: після останньої частини генератор завершується і закриває пул
+    for data, chunk in zip(results(), chunks):
+        yield data
+        done += len(chunk)
+        if progress:
+            progress(done, total)
+
+
+def iter_zip(ids, workers=1, progress=None):
+    """Потоково віддає ZIP з частинами labels_001.pdf, labels_002.pdf, ..."""
+    return zipstream.iter_zip(
+        (f'labels_{number:03d}.pdf', data)
+        for number, data in enumerate(rendered_parts(ids, workers, progress), start=1)
+    )
+
+
+def write_zip(ids, target, workers=1, progress=None):
+    with open(target, 'wb') as f:
+        for data in iter_zip(ids, workers, progress):
+            f.write(data)
+
+
+def write_pdf(ids, target, progress=None):
+    """Один PDF на весь набір; товари читаються частинами."""
+    def products():
+        done = 0
+        for chunk in parts(ids):
+            yield from _products(chunk)
+            done += len(chunk)
+            if progress:
+                progress(done, len(ids))
+
+    write_sheets(products(), target)
@@ -0,0 +1,80 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Min
+from django.utils import timezone
+
+from store import rollups
+from store.models import Order, WriteOff, Return
+
+
+class Command(BaseCommand):
+    help = "Паралельно перераховує денні підсумки (DailySalesRollup) по місяцях історії"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Кількість процесів-воркерів (1 = без пулу)')
+        parser.add_argument('--since', help='Починати з місяця YYYY-MM (за замовчуванням — з першого запису)')
+        parser.add_argument('--force', action='store_true',
+                            help='Перераховувати і вже готові місяці')
+
+    def _first_day(self, since):
+        if since:
+            try:
+                return datetime.strptime(since, '%Y-%m').date()
+            except ValueError:
+                raise CommandError('--since має бути у форматі YYYY-MM')
+
+        candidates = [
+            Order.objects.aggregate(v=Min('created_at'))['v'],
+            WriteOff.objects.aggregate(v=Min('created_at'))['v'],
+            Return.objects.aggregate(v=Min('created_at'))['v'],
+        ]
+        candidates = [c for c in candidates if c]
+        if not candidates:
+            return None
+        return timezone.localtime(min(candidates)).date()
+
+    def handle(self, *args, **options):
+        first_day = self._first_day(options['since'])
+        if first_day is None:
+            self.stdout.write(self.style.WARNING("Немає історії для перерахунку"))
+            return
+
+        today = timezone.localdate()
+        chunks = [
+            chunk for chunk in rollups.month_chunks(first_day, today)
+            # Поточний місяць і місяці, пораховані до свого кінця, ще не готові
+            if options['force'] or not rollups.is_month_complete(*chunk)
+        ]
+        if not chunks:
+            self.stdout.write(self.style.SUCCESS("✅ Усі місяці вже пораховані"))
+            return
+
+        workers = max(1, min(options['workers'], len(chunks)))
+        self.stdout.write(f"Місяців до перерахунку: {len(chunks)}, воркерів: {workers}")
+
+        done = 0
+        for year, month, rows in self._compute(chunks, workers):
+            # Кожен місяць записується окремою транзакцією — перерваний запуск можна продовжити
+            rollups.write_rows(rows)
+            done += 1
+            self.stdout.write(f"  [{done}/{len(chunks)}] {year}-{month:02d}: {len(rows)} днів")
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Перераховано {done} місяців"))
+
+    def _compute(self, chunks, workers):
+        if workers == 1:
+            for chunk in chunks:
+                yield rollups.compute_month(*chunk)
+            return
+
+        # Дочірні процеси не повинні успадкувати відкриті з'єднання батьківського
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, initializer=rollups.init_worker) as pool:
+            futures = [pool.submit(rollups.compute_month, *chunk) for chunk in chunks]
+            for future in as_completed(futures):
+                yield future.result()
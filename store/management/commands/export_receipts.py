@@ -0,0 +1,60 @@
+import os
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from store import receipt_export
+
+
+class Command(BaseCommand):
+    help = "Експорт чеків за період у ZIP (окремі PDF, паралельний рендер) або один PDF"
+
+    def add_arguments(self, parser):
+        parser.add_argument('date_from', help='Перший день YYYY-MM-DD')
+        parser.add_argument('date_to', nargs='?', help='Останній день YYYY-MM-DD (за замовчуванням = date_from)')
+        parser.add_argument('--format', choices=['zip', 'pdf'], default='zip')
+        parser.add_argument('--output', help='Файл результату (за замовчуванням MEDIA_ROOT/exports/...)')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Процесів для рендеру ZIP (1 = без пулу)')
+
+    def _parse(self, value):
+        try:
+            return datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError(f"Дата має бути у форматі YYYY-MM-DD: {value}")
+
+    def handle(self, *args, **options):
+        date_from = self._parse(options['date_from'])
+        date_to = self._parse(options['date_to']) if options['date_to'] else date_from
+        if date_to < date_from:
+            raise CommandError("date_to раніше за date_from")
+
+        ids = receipt_export.order_ids(date_from, date_to)
+        if not ids:
+            self.stdout.write(self.style.WARNING("За період немає чеків"))
+            return
+
+        fmt = options['format']
+        output = Path(options['output'] or Path(settings.MEDIA_ROOT) / 'exports' / f"receipts_{date_from}_{date_to}.{fmt}")
+        output.parent.mkdir(parents=True, exist_ok=True)
+        workers = max(1, min(options['workers'], len(receipt_export.chunks(ids))))
+        self.stdout.write(f"Чеків: {len(ids)}, формат: {fmt}" + (f", воркерів: {workers}" if fmt == 'zip' else ''))
+
+        def progress(done, total):
+            self.stdout.write(f"  [{done}/{total}]")
+
+        # Результат з'являється лише цілим: сторінка експорту (store.exports) чекає саме на нього
+        partial = output.with_name(output.name + '.part')
+        try:
+            if fmt == 'zip':
+                receipt_export.write_zip(ids, partial, workers, progress)
+            else:
+                receipt_export.write_pdf(ids, str(partial), progress)
+        except BaseException:
+            partial.unlink(missing_ok=True)
+            raise
+        os.replace(partial, output)
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Збережено: {output}"))
@@ -0,0 +1,59 @@
+import os
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from store import labels
+
+
+class Command(BaseCommand):
+    help = "Цінники зі штрихкодами: ZIP з PDF-частинами (паралельний рендер) або один PDF"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--category', type=int, help='id категорії')
+        parser.add_argument('--supplier', type=int, help='id постачальника')
+        parser.add_argument('--changed-since', help='Лише товари, змінені з дня YYYY-MM-DD')
+        parser.add_argument('--format', choices=['zip', 'pdf'], default='zip')
+        parser.add_argument('--output', help='Файл результату (за замовчуванням MEDIA_ROOT/exports/...)')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Процесів для рендеру ZIP (1 = без пулу)')
+
+    def handle(self, *args, **options):
+        changed_since = None
+        if options['changed_since']:
+            try:
+                changed_since = datetime.strptime(options['changed_since'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError(f"Дата має бути у форматі YYYY-MM-DD: {options['changed_since']}")
+
+        ids = labels.product_ids(options['category'], options['supplier'], changed_since)
+        if not ids:
+            self.stdout.write(self.style.WARNING("Немає товарів для друку"))
+            return
+
+        fmt = options['format']
+        output = Path(options['output'] or Path(settings.MEDIA_ROOT) / 'exports' / f"labels.{fmt}")
+        output.parent.mkdir(parents=True, exist_ok=True)
+        workers = max(1, min(options['workers'], len(labels.parts(ids))))
+        sheets = -(-len(ids) // labels.LABELS_PER_SHEET)
+        self.stdout.write(f"Цінників: {len(ids)}, аркушів: {sheets}, формат: {fmt}"
+                          + (f", воркерів: {workers}" if fmt == 'zip' else ''))
+
+        def progress(done, total):
+            self.stdout.write(f"  [{done}/{total}]")
+
+        # Як в export_receipts: результат з'являється лише цілим
+        partial = output.with_name(output.name + '.part')
+        try:
+            if fmt == 'zip':
+                labels.write_zip(ids, partial, workers, progress)
+            else:
+                labels.write_pdf(ids, str(partial), progress)
+        except BaseException:
+            partial.unlink(missing_ok=True)
+            raise
+        os.replace(partial, output)
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Збережено: {output}"))
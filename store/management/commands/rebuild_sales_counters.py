@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from store.services import SalesCounterService
+
+
+class Command(BaseCommand):
+    help = "Перераховує лічильники продажів і погодинні бакети з історії чеків та повернень"
+
+    def handle(self, *args, **options):
+        rows = SalesCounterService.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"✅ Лічильники перераховано ({rows} рядків денних продажів)"))
@@ -0,0 +1,86 @@
+import heapq
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection
+
+from store import jobs
+
+
+class Command(BaseCommand):
+    help = "Фоновий планувальник: періодично прогріває звітні задачі в кеш"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Виконати всі задачі один раз і завершитися')
+        parser.add_argument('--only', nargs='+', metavar='JOB',
+                            help='Виконувати лише вказані задачі')
+        parser.add_argument('--status', action='store_true',
+                            help='Показати статистику запусків і вийти')
+
+    def handle(self, *args, **options):
+        if not jobs.is_shared_cache():
+            raise CommandError(
+                "Кеш за замовчуванням локальний для процесу (LocMemCache/DummyCache): "
+                "веб-воркери не побачать прогрітих значень. Вкажіть спільний кеш через "
+                "CACHE_BACKEND і CACHE_LOCATION (напр. django.core.cache.backends.redis.RedisCache)"
+            )
+
+        selected = jobs.jobs()
+        if options['only']:
+            try:
+                selected = [jobs.get_job(name) for name in options['only']]
+            except KeyError as e:
+                raise CommandError(f"Невідома задача: {e.args[0]}")
+
+        if options['status']:
+            self._print_status(selected)
+            return
+
+        if options['once']:
+            for job in selected:
+                self._run(job)
+            return
+
+        self.stdout.write(f"Планувальник запущено, задач: {len(selected)} (Ctrl+C для зупинки)")
+        # Черга (час наступного запуску, назва); перший прохід — одразу
+        now = time.monotonic()
+        queue = [(now, job.name) for job in selected]
+        heapq.heapify(queue)
+        try:
+            while queue:
+                due, name = heapq.heappop(queue)
+                delay = due - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                job = jobs.get_job(name)
+                self._run(job)
+                heapq.heappush(queue, (time.monotonic() + job.next_delay(), name))
+        except KeyboardInterrupt:
+            self.stdout.write("Планувальник зупинено")
+
+    def _run(self, job):
+        # Довгоживучий процес: не тримаємо з'єднання, що вже "протухли" на боці БД.
+        # Усередині транзакції (виклик з коду/тестів) з'єднання закривати не можна
+        if not connection.in_atomic_block:
+            close_old_connections()
+        try:
+            jobs.run(job.name)
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f"  ✗ {job.name}: {e}"))
+            return
+        duration = jobs.stats(job.name).get('last_duration', 0)
+        self.stdout.write(f"  ✓ {job.name}: {duration:.3f} с")
+
+    def _print_status(self, selected):
+        for job in selected:
+            stats = jobs.stats(job.name)
+            line = (
+                f"{job.name:<28} кожні {job.interval:>5} с  "
+                f"останній успіх: {stats.get('last_success', '—')}  "
+                f"тривалість: {stats.get('last_duration', '—')} с  "
+                f"запусків: {stats.get('runs', 0)}, помилок: {stats.get('failures', 0)}"
+            )
+            if stats.get('last_error'):
+                line += f"  помилка: {stats['last_error']}"
+            self.stdout.write(line)
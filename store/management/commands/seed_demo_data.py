@@ -2,9 +2,13 @@ from django.core.management.base import BaseCommand
 from django.db import transaction, connection
 from django.utils import timezone
 from django.core.files.base import ContentFile
+from django.core.management import call_command
 from decimal import Decimal
 from datetime import timedelta
-from store.models import Category, Product, Supplier, Order, OrderItem, WriteOff, Return, ReturnItem, Purchase, PurchaseItem
+from store.models import (
+    Category, Product, Supplier, Order, OrderItem, WriteOff, Return, ReturnItem, Purchase, PurchaseItem,
+    DailySalesRollup,
+)
 from django.contrib.auth.models import User
 import random
 import requests
@@ -57,6 +61,7 @@ class Command(BaseCommand):
             WriteOff.objects.all().delete()
             OrderItem.objects.all().delete()
             Order.objects.all().delete()
+            DailySalesRollup.objects.all().delete()
             Product.objects.all().delete()
             Supplier.objects.all().delete()
             Category.objects.all().delete()
@@ -677,6 +682,11 @@ class Command(BaseCommand):
 
         self.stdout.write(self.style.SUCCESS(f'Створено записів списання: {WriteOff.objects.count()}'))
 
+        # Демо-чеки створюються напряму, тож лічильники, погодинні бакети й денні підсумки треба перерахувати
+        call_command('rebuild_sales_counters', stdout=self.stdout)
+        call_command('backfill_rollups', workers=1, force=True, stdout=self.stdout)
+        call_command('verify_stock_valuation', fix=True, stdout=self.stdout)
+
         self.stdout.write(self.style.SUCCESS('\n✅ Seed завершено!'))
         self.stdout.write(f'  Категорій: {len(categories)}')
         self.stdout.write(f'  Товарів: {Product.objects.count()}')
@@ -1,6 +1,7 @@
 import random
 from decimal import Decimal, ROUND_HALF_UP
 from datetime import timedelta
+from django.core.management import call_command
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 from store.models import Product, Category, Supplier, Order, OrderItem, Purchase, PurchaseItem, WriteOff
@@ -87,4 +88,7 @@ class Command(BaseCommand):
                     )
                     total_created += 1
 
-        self.stdout.write(self.style.SUCCESS(f'✅ Успішно додано {total_created} товарів!'))
\ No newline at end of file
+        self.stdout.write(self.style.SUCCESS(f'✅ Успішно додано {total_created} товарів!'))
+
+        # Масове видалення товарів обходить Product.delete — перебудовуємо вартість складу
+        call_command('verify_stock_valuation', fix=True, stdout=self.stdout)
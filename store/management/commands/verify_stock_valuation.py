@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from store.services import StockValuationService
+
+
+class Command(BaseCommand):
+    help = "Звіряє накопичену вартість складу (StockValuation) з фактичними залишками товарів"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help='Перебудувати підсумки при розбіжностях')
+
+    def handle(self, *args, **options):
+        drift = StockValuationService.verify(fix=options['fix'])
+        if not drift:
+            self.stdout.write(self.style.SUCCESS("✅ Вартість складу збігається з залишками"))
+            return
+
+        for row in drift:
+            self.stdout.write(self.style.WARNING(
+                f"Категорія {row['category_id']}, термін {row['expiry_date'] or '—'}: "
+                f"очікувано {row['expected'][0]} шт / {row['expected'][1]} грн, "
+                f"збережено {row['stored'][0]} шт / {row['stored'][1]} грн"
+            ))
+        if options['fix']:
+            self.stdout.write(self.style.SUCCESS(f"✅ Підсумки перебудовано ({len(drift)} розбіжностей)"))
+        else:
+            self.stdout.write(self.style.ERROR(f"Знайдено розбіжностей: {len(drift)} (запустіть з --fix)"))
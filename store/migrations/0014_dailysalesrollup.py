@@ -0,0 +1,35 @@
+# Generated by Django 5.2.9 on 2026-10-19 06:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0013_alter_order_created_at_alter_product_sku'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True, verbose_name='Дата')),
+                ('orders_count', models.PositiveIntegerField(default=0, verbose_name='Кількість чеків')),
+                ('items_sold', models.PositiveIntegerField(default=0, verbose_name='Продано одиниць')),
+                ('sales', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Виручка')),
+                ('profit', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Прибуток')),
+                ('writeoffs_count', models.PositiveIntegerField(default=0, verbose_name='Кількість списань')),
+                ('writeoff_loss', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Збитки від списань')),
+                ('returns_count', models.PositiveIntegerField(default=0, verbose_name='Кількість повернень')),
+                ('refund_total', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Сума повернень')),
+                ('return_loss', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Втрачений прибуток')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Оновлено')),
+            ],
+            options={
+                'verbose_name': 'Денні підсумки',
+                'verbose_name_plural': 'Денні підсумки',
+                'ordering': ['-date'],
+            },
+        ),
+    ]
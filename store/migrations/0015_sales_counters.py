@@ -0,0 +1,59 @@
+# Generated by Django 5.2.9 on 2026-10-19 06:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0014_dailysalesrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategorySalesCounter',
+            fields=[
+                ('category', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='sales_counter', serialize=False, to='store.category', verbose_name='Категорія')),
+                ('qty_sold', models.IntegerField(default=0, verbose_name='Продано одиниць')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Виручка')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Оновлено')),
+            ],
+            options={
+                'verbose_name': 'Лічильник продажів категорії',
+                'verbose_name_plural': 'Лічильники продажів категорій',
+                'indexes': [models.Index(fields=['-revenue'], name='store_catcounter_revenue_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ProductSalesCounter',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='sales_counter', serialize=False, to='store.product', verbose_name='Товар')),
+                ('qty_sold', models.IntegerField(default=0, verbose_name='Продано одиниць')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Виручка')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Оновлено')),
+            ],
+            options={
+                'verbose_name': 'Лічильник продажів товару',
+                'verbose_name_plural': 'Лічильники продажів товарів',
+                'indexes': [models.Index(fields=['-revenue'], name='store_prodcounter_revenue_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ProductDailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Дата')),
+                ('qty_sold', models.IntegerField(default=0, verbose_name='Продано одиниць')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Виручка')),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='store.category', verbose_name='Категорія')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='store.product', verbose_name='Товар')),
+            ],
+            options={
+                'verbose_name': 'Денні продажі товару',
+                'verbose_name_plural': 'Денні продажі товарів',
+                'indexes': [models.Index(fields=['date', 'category'], name='store_proddaily_date_idx')],
+                'constraints': [models.UniqueConstraint(fields=('product', 'date'), name='store_productdailysales_unique')],
+            },
+        ),
+    ]
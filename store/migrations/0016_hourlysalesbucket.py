@@ -0,0 +1,28 @@
+# Generated by Django 5.2.9 on 2026-10-19 06:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0015_sales_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HourlySalesBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Дата')),
+                ('hour', models.PositiveSmallIntegerField(verbose_name='Година')),
+                ('orders_count', models.PositiveIntegerField(default=0, verbose_name='Кількість чеків')),
+                ('sales', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Виручка')),
+            ],
+            options={
+                'verbose_name': 'Погодинні продажі',
+                'verbose_name_plural': 'Погодинні продажі',
+                'constraints': [models.UniqueConstraint(fields=('date', 'hour'), name='store_hourlysalesbucket_unique')],
+            },
+        ),
+    ]
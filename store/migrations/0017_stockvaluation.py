@@ -0,0 +1,46 @@
+# Generated by Django 5.2.9 on 2026-10-19 06:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import DecimalField, F, Sum
+
+
+def populate_stock_valuation(apps, schema_editor):
+    Product = apps.get_model('store', 'Product')
+    StockValuation = apps.get_model('store', 'StockValuation')
+    rows = Product.objects.values('category_id', 'expiry_date').annotate(
+        qty=Sum('quantity'),
+        value=Sum(F('quantity') * F('purchase_price'), output_field=DecimalField()),
+    )
+    StockValuation.objects.bulk_create([
+        StockValuation(category_id=row['category_id'], expiry_date=row['expiry_date'],
+                       quantity=row['qty'] or 0, value=row['value'] or 0)
+        for row in rows
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0016_hourlysalesbucket'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockValuation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('expiry_date', models.DateField(blank=True, null=True, verbose_name='Термін придатності')),
+                ('quantity', models.BigIntegerField(default=0, verbose_name='Кількість')),
+                ('value', models.DecimalField(decimal_places=2, default=0, max_digits=16, verbose_name='Собівартість')),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_valuations', to='store.category', verbose_name='Категорія')),
+            ],
+            options={
+                'verbose_name': 'Вартість складу',
+                'verbose_name_plural': 'Вартість складу',
+                'indexes': [models.Index(fields=['expiry_date'], name='store_stockval_expiry_idx')],
+                'constraints': [models.UniqueConstraint(fields=('category', 'expiry_date'), name='store_stockvaluation_unique')],
+            },
+        ),
+        migrations.RunPython(populate_stock_valuation, migrations.RunPython.noop),
+    ]
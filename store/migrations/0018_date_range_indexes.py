@@ -0,0 +1,27 @@
+# Generated by Django 5.2.9 on 2026-10-19 06:41
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0017_stockvaluation'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['created_at', 'total_price', 'total_profit'], name='store_order_created_totals_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='return',
+            index=models.Index(fields=['created_at'], name='store_return_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='writeoff',
+            index=models.Index(fields=['created_at'], name='store_writeoff_created_idx'),
+        ),
+    ]
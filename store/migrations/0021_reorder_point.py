@@ -0,0 +1,34 @@
+# Generated by Django 5.2.9 on 2026-10-19 07:18
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def populate_low_stock(apps, schema_editor):
+    Product = apps.get_model('store', 'Product')
+    Product.objects.filter(quantity__lte=F('reorder_point')).update(is_low_stock=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0020_product_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='is_low_stock',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Низький залишок'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='reorder_point',
+            field=models.PositiveIntegerField(default=5, verbose_name='Точка дозамовлення'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['is_low_stock', 'quantity', 'id'], name='store_product_low_stock_idx'),
+        ),
+        migrations.RunPython(populate_low_stock, migrations.RunPython.noop),
+    ]
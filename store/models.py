@@ -1,14 +1,21 @@
-from django.db import models, transaction
-from django.db.models import F
+from django.db import models, transaction, IntegrityError
+from django.conf import settings
+from django.db.models import F, OuterRef, Subquery, Sum
 from django.utils import timezone
 from django.core.validators import MinValueValidator
 from django.core.exceptions import ValidationError
 from decimal import Decimal
 
+from .events import publish_stock_change
+from . import fragments
+
 # Константи для назв груп користувачів
 GROUP_CASHIER = 'Cashiers'
 GROUP_MANAGER = 'Managers'
 
+# Точка дозамовлення нового товару (раніше — єдиний поріг низького залишку для всіх)
+DEFAULT_REORDER_POINT = 5
+
 
 class Supplier(models.Model):
     name = models.CharField(max_length=200, verbose_name="Постачальник")
@@ -36,6 +43,14 @@ class Category(models.Model):
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        fragments.bump_version(fragments.CATALOG)
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        fragments.bump_version(fragments.CATALOG)
+        return super().delete(*args, **kwargs)
+
     class Meta:
         verbose_name = "Категорія"
         verbose_name_plural = "Категорії"
@@ -94,6 +109,12 @@ class Product(models.Model):
     
     image = models.ImageField(upload_to='products/', blank=True, null=True, verbose_name="Фото товару")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата додавання")
+    # Товар «закінчується», коли залишок не більший за точку дозамовлення
+    reorder_point = models.PositiveIntegerField(default=DEFAULT_REORDER_POINT, verbose_name="Точка дозамовлення")
+    # Підтримується при кожній зміні залишку (save() і stock_changed()) — «що дозамовити» читається за індексом
+    is_low_stock = models.BooleanField(default=False, editable=False, verbose_name="Низький залишок")
+    # Оновлюється при save() (ціна, назва тощо); рух залишків через update() його не змінює
+    updated_at = models.DateTimeField(auto_now=True, db_index=True, verbose_name="Дата зміни")
 
     def __str__(self):
         return f"{self.name}"
@@ -110,6 +131,72 @@ class Product(models.Model):
                 'quantity': 'Кількість не може бути від\'ємною!'
             })
 
+    # Поля, від яких залежить вартість складу (StockValuation)
+    VALUATION_FIELDS = ('category_id', 'expiry_date', 'quantity', 'purchase_price')
+
+    def save(self, *args, **kwargs):
+        """Зберігає товар і переносить його вартість у StockValuation."""
+        update_fields = kwargs.get('update_fields')
+        self.is_low_stock = self.quantity <= self.reorder_point
+        if update_fields is not None and {'quantity', 'reorder_point'} & set(update_fields):
+            kwargs['update_fields'] = [*update_fields, 'is_low_stock']
+        with transaction.atomic():
+            fragments.bump_version(fragments.CATALOG)
+            old = None
+            if self.pk:
+                old = Product.objects.filter(pk=self.pk).values(*self.VALUATION_FIELDS).first()
+            super().save(*args, **kwargs)
+
+            new = {field: getattr(self, field) for field in self.VALUATION_FIELDS}
+            if old and update_fields is not None:
+                # Поля поза update_fields у БД не змінились
+                saved = {self._meta.get_field(name).attname for name in update_fields}
+                new = {field: (new[field] if field in saved else old[field]) for field in self.VALUATION_FIELDS}
+            if old != new:
+                if old:
+                    StockValuation.apply(old['category_id'], old['expiry_date'],
+                                         -old['quantity'], -old['quantity'] * old['purchase_price'])
+                StockValuation.apply(new['category_id'], new['expiry_date'],
+                                     new['quantity'], new['quantity'] * Decimal(str(new['purchase_price'])))
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            fragments.bump_version(fragments.CATALOG)
+            StockValuation.apply_product_delta(self, -self.quantity)
+            return super().delete(*args, **kwargs)
+
+    def stock_changed(self, old_quantity, new_quantity):
+        """
+        Після зміни залишку (в транзакції зміни): оновлює is_low_stock, якщо
+        залишок перетнув точку дозамовлення, і публікує подію залишку.
+        
+        Для змін через update() це єдиний додатковий запит, і лише при перетині.
+        """
+        low = new_quantity <= self.reorder_point
+        if low != self.is_low_stock:
+            Product.objects.filter(pk=self.pk).update(is_low_stock=low)
+            self.is_low_stock = low
+        publish_stock_change(self, old_quantity, new_quantity)
+
+    @classmethod
+    def stock_changed_many(cls, changes):
+        """
+        stock_changed для багатьох товарів: прапорці — не більше двох UPDATE.
+
+        Args:
+            changes: iterable[(product, old_quantity, new_quantity)]
+        """
+        flips = {True: [], False: []}
+        for product, old_quantity, new_quantity in changes:
+            low = new_quantity <= product.reorder_point
+            if low != product.is_low_stock:
+                flips[low].append(product.pk)
+                product.is_low_stock = low
+            publish_stock_change(product, old_quantity, new_quantity)
+        for low, ids in flips.items():
+            if ids:
+                cls.objects.filter(pk__in=ids).update(is_low_stock=low)
+
     # Метод, щоб в адмінці показувати маржу (націнку)
     def margin(self):
         if self.price and self.purchase_price:
@@ -117,9 +204,39 @@ class Product(models.Model):
         return 0
     margin.short_description = "Прибуток з одиниці"
 
+    # Одиниця фасування -> (множник до базової одиниці, підпис на ціннику)
+    UNIT_PRICE_BASE = {
+        'pcs': (Decimal('1'), 'шт'),
+        'kg': (Decimal('1'), 'кг'),
+        'g': (Decimal('1000'), 'кг'),
+        'l': (Decimal('1'), 'л'),
+        'ml': (Decimal('1000'), 'л'),
+    }
+
+    def unit_price(self):
+        """
+        Ціна за кг / л / шт для цінника.
+
+        Returns:
+            tuple | None - (Decimal ціна, 'кг'|'л'|'шт') або None, якщо фасування не вказане
+        """
+        if not self.weight_value or self.weight_unit not in self.UNIT_PRICE_BASE:
+            return None
+        factor, unit = self.UNIT_PRICE_BASE[self.weight_unit]
+        value = (self.price * factor / self.weight_value).quantize(Decimal('0.01'))
+        return value, unit
+
     class Meta:
         verbose_name = "Товар"
         verbose_name_plural = "Товари"
+        indexes = [
+            # Ключі курсорної пагінації списку товарів (id — розв'язувач нічиїх)
+            models.Index(fields=['name', 'id'], name='store_product_name_id_idx'),
+            models.Index(fields=['quantity', 'id'], name='store_product_qty_id_idx'),
+            models.Index(fields=['price', 'id'], name='store_product_price_id_idx'),
+            # Товари до дозамовлення: WHERE is_low_stock ORDER BY quantity
+            models.Index(fields=['is_low_stock', 'quantity', 'id'], name='store_product_low_stock_idx'),
+        ]
 
 
 class Purchase(models.Model):
@@ -148,15 +265,84 @@ class Purchase(models.Model):
         self.total_cost = total
         return total
 
-    def apply_to_stock_once(self):
-        """Якщо статус 'received' і ще не проведено — додаємо залишки по товарах."""
-        if self.received_applied:
-            return
+    def apply_to_stock_once(self, update_purchase_price=None):
+        """
+        Якщо статус 'received' і ще не проведено — додаємо залишки по товарах.
+
+        Рядок поставки блокується (SELECT ... FOR UPDATE) і received_applied
+        перевіряється вже під блокуванням: паралельне збереження (інший
+        адміністратор) дочекається коміту й нічого не проведе вдруге.
+
+        Args:
+            update_purchase_price: bool | None - записати unit_cost як нову ціну
+                закупівлі товарів (None — settings.PURCHASE_RECEIVE_UPDATES_PRICE)
+
+        Returns:
+            bool - True, якщо поставку проведено саме цим викликом
+        """
         with transaction.atomic():
-            for item in self.items.select_related('product'):
-                Product.objects.filter(id=item.product_id).update(quantity=F('quantity') + item.quantity)
-            self.received_applied = True
-            self.save(update_fields=['received_applied'])
+            locked = Purchase.objects.select_for_update().only('received_applied').get(pk=self.pk)
+            if not locked.received_applied:
+                Purchase.post_to_stock([self.pk], update_purchase_price)
+                Purchase.objects.filter(pk=self.pk).update(received_applied=True)
+            posted = not locked.received_applied
+        self.received_applied = True
+        return posted
+
+    @classmethod
+    def post_to_stock(cls, purchase_ids, update_purchase_price=None):
+        """
+        Додає позиції поставок до залишків одним UPDATE на всі товари.
+
+        Викликається в транзакції, коли поставки вже заблоковані й ще не проведені.
+        Якщо товар є в кількох позиціях, ціною закупівлі стає unit_cost
+        останньої з них.
+
+        Returns:
+            dict - {product_id: додана кількість}
+        """
+        if update_purchase_price is None:
+            update_purchase_price = getattr(settings, 'PURCHASE_RECEIVE_UPDATES_PRICE', False)
+        items = PurchaseItem.objects.filter(purchase_id__in=purchase_ids)
+        added = dict(items.values_list('product_id').annotate(qty=Sum('quantity')).order_by())
+        if not added:
+            return {}
+        costs = dict(items.order_by('purchase_id', 'id').values_list('product_id', 'unit_cost'))
+
+        # Блокування в порядку id (без взаємоблокувань) і старі значення для обліку вартості
+        products = list(Product.objects.select_for_update().filter(pk__in=added).order_by('pk'))
+
+        product_items = items.filter(product_id=OuterRef('pk')).order_by()
+        changes = {'quantity': F('quantity') + Subquery(
+            product_items.values('product_id').annotate(qty=Sum('quantity')).values('qty')
+        )}
+        if update_purchase_price:
+            changes['purchase_price'] = Subquery(
+                product_items.order_by('-purchase_id', '-id').values('unit_cost')[:1]
+            )
+        Product.objects.filter(pk__in=added).update(**changes)
+
+        # Вартість складу — одним записом на (категорія, термін придатності)
+        buckets = {}
+        stock_changes = []
+        for product in products:
+            old_quantity, old_price = product.quantity, product.purchase_price
+            product.quantity += added[product.pk]
+            if update_purchase_price:
+                product.purchase_price = costs[product.pk]
+            key = (product.category_id, product.expiry_date)
+            quantity, value = buckets.get(key, (0, Decimal('0')))
+            buckets[key] = (
+                quantity + added[product.pk],
+                value + product.quantity * product.purchase_price - old_quantity * old_price,
+            )
+            stock_changes.append((product, old_quantity, product.quantity))
+
+        fragments.bump_version(fragments.CATALOG)
+        for (category_id, expiry_date), (quantity, value) in sorted(buckets.items(), key=lambda b: (b[0][0], str(b[0][1]))):
+            StockValuation.apply(category_id, expiry_date, quantity, value)
+        Product.stock_changed_many(stock_changes)
+        return added
 
     class Meta:
         verbose_name = "Поставка"
@@ -194,9 +380,31 @@ class Order(models.Model):
     def __str__(self):
         return f"Чек №{self.id} від {self.created_at.strftime('%Y-%m-%d %H:%M')}"
 
+    def save(self, *args, **kwargs):
+        # Кешовані сторінки списку чеків застарівають після коміту
+        fragments.bump_version(fragments.RECEIPTS)
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        from .services import ReceiptService
+
+        fragments.bump_version(fragments.RECEIPTS)
+        order_id = self.pk
+        result = super().delete(*args, **kwargs)
+        # Після коміту: відкочене видалення має лишити кеш чинним
+        transaction.on_commit(lambda: ReceiptService.forget(order_id))
+        return result
+
     class Meta:
         verbose_name = "Чек"
         verbose_name_plural = "Чеки"
+        indexes = [
+            # Покриваючий індекс для денних підсумків: діапазон по даті + суми без звернення до таблиці
+            models.Index(fields=['created_at', 'total_price', 'total_profit'], name='store_order_created_totals_idx'),
+            # Ключі курсорної пагінації списку чеків
+            models.Index(fields=['total_price', 'id'], name='store_order_total_id_idx'),
+            models.Index(fields=['total_profit', 'id'], name='store_order_profit_id_idx'),
+        ]
 
 
 # 2. ТОВАР У ЧЕКУ (Рядок)
@@ -295,6 +503,7 @@ class WriteOff(models.Model):
     class Meta:
         verbose_name = "Списання"
         verbose_name_plural = "Списання"
+        indexes = [models.Index(fields=['created_at'], name='store_writeoff_created_idx')]
 
 
 class Return(models.Model):
@@ -357,6 +566,7 @@ class Return(models.Model):
         verbose_name = "Повернення"
         verbose_name_plural = "Повернення"
         ordering = ['-created_at']
+        indexes = [models.Index(fields=['created_at'], name='store_return_created_idx')]
 
 
 class ReturnItem(models.Model):
@@ -401,4 +611,150 @@ class ReturnItem(models.Model):
     
     class Meta:
         verbose_name = "Позиція повернення"
-        verbose_name_plural = "Позиції повернення"
\ No newline at end of file
+        verbose_name_plural = "Позиції повернення"
+
+# 4. ПРЕДАГРЕГОВАНА СТАТИСТИКА
+class DailySalesRollup(models.Model):
+    """Підсумки за локальний день (Europe/Kyiv): продажі, списання, повернення."""
+    date = models.DateField(unique=True, verbose_name="Дата")
+
+    orders_count = models.PositiveIntegerField(default=0, verbose_name="Кількість чеків")
+    items_sold = models.PositiveIntegerField(default=0, verbose_name="Продано одиниць")
+    sales = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Виручка")
+    profit = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Прибуток")
+
+    writeoffs_count = models.PositiveIntegerField(default=0, verbose_name="Кількість списань")
+    writeoff_loss = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Збитки від списань")
+
+    returns_count = models.PositiveIntegerField(default=0, verbose_name="Кількість повернень")
+    refund_total = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Сума повернень")
+    return_loss = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Втрачений прибуток")
+
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Оновлено")
+
+    def __str__(self):
+        return f"Підсумки за {self.date:%d.%m.%Y}"
+
+    class Meta:
+        verbose_name = "Денні підсумки"
+        verbose_name_plural = "Денні підсумки"
+        ordering = ['-date']
+
+
+# 5. ЛІЧИЛЬНИКИ ПРОДАЖІВ (оновлюються при продажу та поверненні)
+class ProductSalesCounter(models.Model):
+    """Продажі товару за весь час (нетто, з урахуванням повернень)."""
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name='sales_counter', verbose_name="Товар")
+    qty_sold = models.IntegerField(default=0, verbose_name="Продано одиниць")
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Виручка")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Оновлено")
+
+    def __str__(self):
+        return f"{self.product.name}: {self.qty_sold}"
+
+    class Meta:
+        verbose_name = "Лічильник продажів товару"
+        verbose_name_plural = "Лічильники продажів товарів"
+        indexes = [models.Index(fields=['-revenue'], name='store_prodcounter_revenue_idx')]
+
+
+class CategorySalesCounter(models.Model):
+    """Продажі категорії за весь час (нетто, з урахуванням повернень)."""
+    category = models.OneToOneField(Category, on_delete=models.CASCADE, primary_key=True, related_name='sales_counter', verbose_name="Категорія")
+    qty_sold = models.IntegerField(default=0, verbose_name="Продано одиниць")
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Виручка")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Оновлено")
+
+    def __str__(self):
+        return f"{self.category.name}: {self.qty_sold}"
+
+    class Meta:
+        verbose_name = "Лічильник продажів категорії"
+        verbose_name_plural = "Лічильники продажів категорій"
+        indexes = [models.Index(fields=['-revenue'], name='store_catcounter_revenue_idx')]
+
+
+class ProductDailySales(models.Model):
+    """Продажі товару за локальний день — для рейтингів за ковзне вікно."""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='daily_sales', verbose_name="Товар")
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='+', verbose_name="Категорія")
+    date = models.DateField(verbose_name="Дата")
+    qty_sold = models.IntegerField(default=0, verbose_name="Продано одиниць")
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Виручка")
+
+    def __str__(self):
+        return f"{self.product.name} {self.date:%d.%m.%Y}: {self.qty_sold}"
+
+    class Meta:
+        verbose_name = "Денні продажі товару"
+        verbose_name_plural = "Денні продажі товарів"
+        constraints = [models.UniqueConstraint(fields=['product', 'date'], name='store_productdailysales_unique')]
+        indexes = [models.Index(fields=['date', 'category'], name='store_proddaily_date_idx')]
+
+
+class HourlySalesBucket(models.Model):
+    """Продажі за годину локального часу — основа теплової карти навантаження."""
+    date = models.DateField(verbose_name="Дата")
+    hour = models.PositiveSmallIntegerField(verbose_name="Година")
+    orders_count = models.PositiveIntegerField(default=0, verbose_name="Кількість чеків")
+    sales = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Виручка")
+
+    def __str__(self):
+        return f"{self.date:%d.%m.%Y} {self.hour:02d}:00 — {self.orders_count}"
+
+    class Meta:
+        verbose_name = "Погодинні продажі"
+        verbose_name_plural = "Погодинні продажі"
+        constraints = [models.UniqueConstraint(fields=['date', 'hour'], name='store_hourlysalesbucket_unique')]
+
+
+
+# 6. ВАРТІСТЬ СКЛАДУ (накопичувальні підсумки)
+class StockValuation(models.Model):
+    """
+    Кількість і собівартість залишків у розрізі категорії та терміну придатності.
+    Оновлюється при кожній зміні кількості / ціни закупівлі товару, тож вартість
+    складу та потенційні втрати від прострочки читаються з кількох рядків.
+    """
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='stock_valuations', verbose_name="Категорія")
+    expiry_date = models.DateField(blank=True, null=True, verbose_name="Термін придатності")
+    quantity = models.BigIntegerField(default=0, verbose_name="Кількість")
+    value = models.DecimalField(max_digits=16, decimal_places=2, default=0, verbose_name="Собівартість")
+
+    @classmethod
+    def apply(cls, category_id, expiry_date, quantity, value):
+        """Додає (або віднімає) кількість і вартість у відповідний рядок."""
+        if not quantity and not value:
+            return
+        changes = {'quantity': F('quantity') + quantity, 'value': F('value') + value}
+        lookup = {'category_id': category_id, 'expiry_date': expiry_date}
+        if cls.objects.filter(**lookup).update(**changes):
+            return
+        with transaction.atomic():
+            # NULL у expiry_date не порушує UniqueConstraint (NULL-и різні), тож два
+            # паралельні перші записи «без терміну» створили б два рядки. Перший запис
+            # категорії серіалізуємо блокуванням її рядка і повторною спробою UPDATE
+            list(Category.objects.select_for_update().filter(pk=category_id).values_list('pk'))
+            if cls.objects.filter(**lookup).update(**changes):
+                return
+            try:
+                with transaction.atomic():
+                    cls.objects.create(**lookup, quantity=quantity, value=value)
+            except IntegrityError:
+                cls.objects.filter(**lookup).update(**changes)
+
+    @classmethod
+    def apply_product_delta(cls, product, quantity_delta):
+        """Зміна кількості товару без зміни ціни (продаж, повернення, поставка)."""
+        # Усі масові оновлення залишків (F-вирази) проходять тут — кешовані списки товарів застарівають
+        fragments.bump_version(fragments.CATALOG)
+        cls.apply(product.category_id, product.expiry_date, quantity_delta, quantity_delta * product.purchase_price)
+
+    def __str__(self):
+        return f"{self.category.name} / {self.expiry_date or 'без терміну'}: {self.value}"
+
+    class Meta:
+        verbose_name = "Вартість складу"
+        verbose_name_plural = "Вартість складу"
+        constraints = [models.UniqueConstraint(fields=['category', 'expiry_date'], name='store_stockvaluation_unique')]
+        indexes = [models.Index(fields=['expiry_date'], name='store_stockval_expiry_idx')]
@@ -0,0 +1,147 @@
+"""
+Keyset (курсорна) пагінація для списків менеджера.
+
+Замість OFFSET наступна сторінка вибирається умовою "після останнього рядка"
+за ключем сортування з id як стабільним розв'язувачем нічиїх:
+    (key, id) > (last_key, last_id)
+тож кожна сторінка — пошук за індексом, хоч би як глибоко в історію гортати.
+Загальна кількість рахується з обмеженням (APPROX_COUNT_CAP) — для великих
+таблиць показується "1000+".
+"""
+import base64
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.db.models import Q
+
+DEFAULT_PAGE_SIZE = 50
+APPROX_COUNT_CAP = 1000
+
+CURSOR_PARAM = 'cursor'
+
+
+def _encode_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def encode_cursor(value, pk, direction):
+    raw = json.dumps({'v': _encode_value(value), 'pk': pk, 'd': direction})
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Returns:
+        tuple | None - (значення ключа, pk, напрямок) або None для некоректного курсора
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        data = json.loads(raw)
+        if data['d'] not in ('next', 'prev'):
+            return None
+        return data['v'], data['pk'], data['d']
+    except (ValueError, TypeError, KeyError):
+        return None
+
+
+def _key_value(obj, key):
+    """Значення ключа з об'єкта; 'category__name' -> obj.category.name."""
+    for part in key.split('__'):
+        obj = getattr(obj, part)
+    return obj
+
+
+class KeysetPage:
+    """Сторінка результатів з курсорами сусідніх сторінок."""
+
+    def __init__(self, items, next_cursor, previous_cursor, count, count_is_exact, base_query):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.count = count
+        self.count_is_exact = count_is_exact
+        self.base_query = base_query
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+
+class KeysetPaginator:
+    """
+    Args:
+        queryset: QuerySet - відфільтрований (без сортування)
+        key: str - поле або анотація сортування (не NULL)
+        descending: bool - напрямок сортування
+        page_size: int - рядків на сторінку
+    """
+
+    def __init__(self, queryset, key, descending=False, page_size=DEFAULT_PAGE_SIZE):
+        self.queryset = queryset
+        self.key = key
+        self.descending = descending
+        self.page_size = page_size
+
+    def _ordered(self, reverse=False):
+        descending = self.descending != reverse
+        prefix = '-' if descending else ''
+        return self.queryset.order_by(f'{prefix}{self.key}', f'{prefix}pk'), descending
+
+    def _after(self, value, pk, descending):
+        op = 'lt' if descending else 'gt'
+        return Q(**{f'{self.key}__{op}': value}) | Q(**{self.key: value, f'pk__{op}': pk})
+
+    def approximate_count(self):
+        """(кількість рядків, але не більше APPROX_COUNT_CAP; чи вона точна)."""
+        count = self.queryset.order_by()[:APPROX_COUNT_CAP + 1].count()
+        return min(count, APPROX_COUNT_CAP), count <= APPROX_COUNT_CAP
+
+    def get_page(self, cursor=None, base_query=''):
+        decoded = decode_cursor(cursor) if cursor else None
+        backwards = decoded is not None and decoded[2] == 'prev'
+        qs, descending = self._ordered(reverse=backwards)
+        if decoded is not None:
+            qs = qs.filter(self._after(decoded[0], decoded[1], descending))
+
+        rows = list(qs[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if backwards:
+            rows.reverse()
+
+        # Після кроку назад наступна сторінка завжди існує (з неї прийшли);
+        # після кроку вперед — попередня існує, якщо курсор був
+        has_next = backwards or has_more
+        has_previous = has_more if backwards else decoded is not None
+
+        next_cursor = previous_cursor = None
+        if rows and has_next:
+            next_cursor = encode_cursor(_key_value(rows[-1], self.key), rows[-1].pk, 'next')
+        if rows and has_previous:
+            previous_cursor = encode_cursor(_key_value(rows[0], self.key), rows[0].pk, 'prev')
+
+        count, exact = self.approximate_count()
+        return KeysetPage(rows, next_cursor, previous_cursor, count, exact, base_query)
+
+
+def paginate_keyset(request, queryset, key, descending=False, page_size=DEFAULT_PAGE_SIZE):
+    """Сторінка для запиту: курсор з ?cursor=, решта параметрів зберігається в посиланнях."""
+    params = request.GET.copy()
+    cursor = params.pop(CURSOR_PARAM, [None])[-1]
+    paginator = KeysetPaginator(queryset, key, descending, page_size)
+    return paginator.get_page(cursor, params.urlencode())
@@ -0,0 +1,110 @@
+"""
+Реєстр шрифтів і стилів ReportLab для PDF (чеки, етикетки).
+
+Шрифт з кирилицею шукається один раз на процес: спочатку settings.PDF_FONT_PATH,
+потім каталог store/fonts/ (туди можна покласти TTF разом із застосунком),
+далі системні шрифти Linux/Windows. Стилі абзаців і таблиць створюються один
+раз і перевикористовуються — ReportLab їх не змінює під час побудови документа.
+"""
+import logging
+import os
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+from reportlab.lib import colors
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.platypus import TableStyle
+
+logger = logging.getLogger(__name__)
+
+FONT_NAME = 'ReceiptSans'
+FONT_NAME_BOLD = 'ReceiptSans-Bold'
+FALLBACK_FONT = 'Helvetica'
+FALLBACK_FONT_BOLD = 'Helvetica-Bold'
+
+BUNDLED_FONTS_DIR = Path(__file__).resolve().parent / 'fonts'
+
+# (звичайний, жирний) — перший знайдений звичайний шрифт виграє
+FONT_CANDIDATES = [
+    ('DejaVuSans.ttf', 'DejaVuSans-Bold.ttf'),
+    ('/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf', '/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf'),
+    ('/usr/share/fonts/TTF/DejaVuSans.ttf', '/usr/share/fonts/TTF/DejaVuSans-Bold.ttf'),
+    ('/usr/share/fonts/dejavu/DejaVuSans.ttf', '/usr/share/fonts/dejavu/DejaVuSans-Bold.ttf'),
+    ('/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf',
+     '/usr/share/fonts/truetype/liberation/LiberationSans-Bold.ttf'),
+    ('/usr/share/fonts/truetype/noto/NotoSans-Regular.ttf', '/usr/share/fonts/truetype/noto/NotoSans-Bold.ttf'),
+    (r'C:\Windows\Fonts\arial.ttf', r'C:\Windows\Fonts\arialbd.ttf'),
+    (r'C:\Windows\Fonts\tahoma.ttf', r'C:\Windows\Fonts\tahomabd.ttf'),
+]
+
+
+def _candidates():
+    configured = getattr(settings, 'PDF_FONT_PATH', None)
+    if configured:
+        yield configured, getattr(settings, 'PDF_FONT_BOLD_PATH', None) or configured
+    for regular, bold in FONT_CANDIDATES:
+        if not os.path.isabs(regular):
+            regular, bold = BUNDLED_FONTS_DIR / regular, BUNDLED_FONTS_DIR / bold
+        yield regular, bold
+
+
+@lru_cache(maxsize=None)
+def register_fonts():
+    """
+    Реєструє шрифт з кирилицею (один раз на процес).
+
+    Returns:
+        tuple - (звичайний, жирний) імена шрифтів для ReportLab
+    """
+    for regular, bold in _candidates():
+        if not os.path.exists(regular):
+            continue
+        try:
+            pdfmetrics.registerFont(TTFont(FONT_NAME, str(regular)))
+        except Exception as e:
+            logger.warning(f"Cannot register PDF font {regular}: {e}")
+            continue
+        bold_name = FONT_NAME
+        if bold and os.path.exists(bold):
+            try:
+                pdfmetrics.registerFont(TTFont(FONT_NAME_BOLD, str(bold)))
+                bold_name = FONT_NAME_BOLD
+            except Exception as e:
+                logger.warning(f"Cannot register PDF bold font {bold}: {e}")
+        return FONT_NAME, bold_name
+
+    logger.warning("No Cyrillic TTF font found for PDF; set PDF_FONT_PATH or put DejaVuSans.ttf into store/fonts/")
+    return FALLBACK_FONT, FALLBACK_FONT_BOLD
+
+
+class ReceiptStyles:
+    """Готові стилі чека 80 мм."""
+
+    def __init__(self, font, bold):
+        self.font = font
+        self.bold = bold
+        self.title = ParagraphStyle(
+            'ReceiptTitle', fontName=bold, fontSize=12, leading=14,
+            textColor=colors.black, alignment=1, spaceAfter=5,
+        )
+        self.normal = ParagraphStyle(
+            'ReceiptNormal', fontName=font, fontSize=8, leading=10, alignment=1,
+        )
+        # Таблиця позицій: шапка, рядки, підсумок в останньому рядку
+        self.items_table = TableStyle([
+            ('FONTSIZE', (0, 0), (-1, -1), 7),
+            ('FONTNAME', (0, 0), (-1, -1), font),
+            ('FONTNAME', (0, -1), (-1, -1), bold),
+            ('ALIGN', (0, 0), (0, -1), 'LEFT'),
+            ('ALIGN', (1, 0), (-1, -1), 'RIGHT'),
+            ('LINEBELOW', (0, 0), (-1, 0), 0.5, colors.black),
+            ('LINEBELOW', (0, -1), (-1, -1), 0.5, colors.black),
+        ])
+
+
+@lru_cache(maxsize=None)
+def receipt_styles():
+    return ReceiptStyles(*register_fonts())
@@ -0,0 +1,97 @@
+"""
+Масовий експорт чеків за період: ZIP з окремими PDF або один багатосторінковий PDF.
+
+Окремі PDF рендеряться пачками у процесах-воркерах і зберігаються у
+content-addressed сховищі ReceiptService (повторний експорт їх не рендерить).
+ZIP збирається потоково — у пам'яті одночасно лише один чек.
+Як і rollups.py, модуль виконується у воркерах, тому моделі імпортуються
+всередині функцій.
+"""
+from concurrent.futures import ProcessPoolExecutor
+
+from django.db import connections
+
+from . import zipstream
+from .rollups import init_worker
+
+EXPORT_CHUNK_SIZE = 50
+
+
+def order_ids(date_from, date_to):
+    """id чеків за локальні дні [date_from, date_to] у хронологічному порядку."""
+    from .models import Order
+    from .utils import local_date_q
+
+    return list(
+        Order.objects.filter(local_date_q('created_at', date_from, date_to))
+        .order_by('created_at', 'id')
+        .values_list('id', flat=True)
+    )
+
+
+def chunks(ids, size=EXPORT_CHUNK_SIZE):
+    return [ids[i:i + size] for i in range(0, len(ids), size)]
+
+
+def render_chunk(ids):
+    """Рендерить (або знаходить готові) PDF пачки чеків. Returns: list[(id, шлях)]."""
+    from .services import ReceiptService
+
+    return [(order_id, str(ReceiptService.get_receipt_pdf_path(order_id))) for order_id in ids]
+
+
+def rendered_paths(ids, workers=1, progress=None):
+    """
+    Шляхи до PDF чеків у порядку ids; відсутні рендеряться пулом процесів.
+
+    Args:
+        progress: callable | None - progress(готово, всього)
+    """
+    total = len(ids)
+    done = 0
+
+    def results():
+        if workers <= 1:
+            for chunk in chunks(ids):
+                yield render_chunk(chunk)
+            return
+        # Дочірні процеси не повинні успадкувати відкриті з'єднання батьківського
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+            # map зберігає порядок пачок; результати — лише шляхи, не вміст
+            yield from pool.map(render_chunk, chunks(ids))
+
+    for chunk_result in results():
+        yield from chunk_result
+        done += len(chunk_result)
+        if progress:
+            progress(done, total)
+
+
+def iter_zip(paths):
+    """Потоково віддає ZIP з файлами receipt_<id>.pdf."""
+    return zipstream.iter_zip((f'receipt_{order_id}.pdf', path) for order_id, path in paths)
+
+
+def write_zip(ids, target, workers=1, progress=None):
+    with open(target, 'wb') as f:
+        for data in iter_zip(rendered_paths(ids, workers, progress)):
+            f.write(data)
+
+
+def write_pdf(ids, target, progress=None):
+    """Один багатосторінковий PDF; чеки читаються пачками з позиціями."""
+    from .models import Order
+    from .services import ReceiptService
+
+    def orders():
+        done = 0
+        for chunk in chunks(ids):
+            batch = Order.objects.filter(id__in=chunk).prefetch_related('items__product').in_bulk()
+            for order_id in chunk:
+                yield batch[order_id]
+            done += len(chunk)
+            if progress:
+                progress(done, len(ids))
+
+    ReceiptService.write_receipts_pdf(orders(), target)
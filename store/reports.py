@@ -0,0 +1,78 @@
+"""
+Паралельне виконання незалежних звітних запитів.
+
+Кожен воркер пулу працює зі своїм з'єднанням до БД (у Django з'єднання прив'язані
+до потоку) і закриває його після задачі. На SQLite, всередині транзакції або
+з потоку самого пулу запити виконуються послідовно.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, connections
+from django.db.models.query import QuerySet
+
+DEFAULT_MAX_WORKERS = 4
+
+_executor = None
+_executor_lock = threading.Lock()
+_local = threading.local()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'REPORT_MAX_WORKERS', DEFAULT_MAX_WORKERS),
+                thread_name_prefix='report',
+            )
+        return _executor
+
+
+def _evaluate(task):
+    """Виконує задачу: QuerySet матеріалізується у список, callable викликається."""
+    if isinstance(task, QuerySet):
+        return list(task)
+    return task()
+
+
+def _run_in_worker(task):
+    _local.in_worker = True
+    try:
+        return _evaluate(task)
+    finally:
+        # З'єднання цього потоку не повинно жити довше за задачу
+        connections.close_all()
+
+
+def can_run_parallel():
+    if connection.vendor == 'sqlite':
+        return False
+    # Інші потоки не бачать незакомічених даних поточної транзакції
+    if connection.in_atomic_block:
+        return False
+    return not getattr(_local, 'in_worker', False)
+
+
+def run_in_background(task):
+    """Запускає задачу в пулі без очікування результату."""
+    return _get_executor().submit(_run_in_worker, task)
+
+
+def run_parallel(tasks):
+    """
+    Виконує незалежні запити паралельно.
+
+    Args:
+        tasks: dict - {name: QuerySet | callable}
+
+    Returns:
+        dict - {name: результат} (QuerySet повертається як list)
+    """
+    if len(tasks) < 2 or not can_run_parallel():
+        return {name: _evaluate(task) for name, task in tasks.items()}
+
+    executor = _get_executor()
+    futures = {name: executor.submit(_run_in_worker, task) for name, task in tasks.items()}
+    return {name: future.result() for name, future in futures.items()}
@@ -0,0 +1,165 @@
+"""
+Розрахунок денних підсумків (DailySalesRollup) по місячних чанках.
+
+Функції цього модуля виконуються і в основному процесі, і у процесах-воркерах
+команди backfill_rollups. Моделі імпортуються всередині функцій, бо при
+spawn-старті воркер імпортує модуль раніше, ніж відпрацює django.setup().
+"""
+from calendar import monthrange
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+ITERATOR_CHUNK_SIZE = 2000
+
+ROLLUP_FIELDS = [
+    'orders_count', 'items_sold', 'sales', 'profit',
+    'writeoffs_count', 'writeoff_loss',
+    'returns_count', 'refund_total', 'return_loss',
+]
+
+
+def init_worker():
+    """Ініціалізація процесу-воркера (з'єднання з БД відкриється ліниво)."""
+    import django
+    django.setup()
+
+
+def month_bounds(year, month):
+    """Перший день місяця та перший день наступного місяця."""
+    first = date(year, month, 1)
+    return first, first + timedelta(days=monthrange(year, month)[1])
+
+
+def month_chunks(first_day, last_day):
+    """Список (рік, місяць) від first_day до last_day включно."""
+    chunks = []
+    year, month = first_day.year, first_day.month
+    while (year, month) <= (last_day.year, last_day.month):
+        chunks.append((year, month))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return chunks
+
+
+def _aware_range(start_day, end_day):
+    """Напіввідкритий діапазон [start, end) у локальному часовому поясі."""
+    tz = timezone.get_default_timezone()
+    return (
+        timezone.make_aware(datetime.combine(start_day, time.min), tz),
+        timezone.make_aware(datetime.combine(end_day, time.min), tz),
+    )
+
+
+def compute_month(year, month):
+    """
+    Рахує підсумки по кожному завершеному дню місяця потоковим читанням (.iterator()).
+
+    Сьогоднішній рядок не перераховується: його в цей момент інкрементно
+    оновлюють продажі, списання й повернення (SalesCounterService.record_day),
+    і перезапис загубив би паралельні зміни.
+
+    Returns:
+        tuple - (year, month, list[dict]) з рядком на кожен завершений день
+        місяця, включно з днями без продажів (так видно, що місяць пораховано повністю)
+    """
+    from .models import Order, OrderItem, WriteOff, Return, ReturnItem
+
+    tz = timezone.get_default_timezone()
+    start_day, end_day = month_bounds(year, month)
+    start, end = _aware_range(start_day, end_day)
+
+    def local_day(value):
+        return timezone.localtime(value, tz).date()
+
+    days = defaultdict(lambda: {
+        'orders_count': 0, 'items_sold': 0,
+        'sales': Decimal('0'), 'profit': Decimal('0'),
+        'writeoffs_count': 0, 'writeoff_loss': Decimal('0'),
+        'returns_count': 0, 'refund_total': Decimal('0'), 'return_loss': Decimal('0'),
+    })
+
+    orders = Order.objects.filter(created_at__gte=start, created_at__lt=end).values_list(
+        'created_at', 'total_price', 'total_profit'
+    )
+    for created_at, total_price, total_profit in orders.iterator(chunk_size=ITERATOR_CHUNK_SIZE):
+        row = days[local_day(created_at)]
+        row['orders_count'] += 1
+        row['sales'] += total_price
+        row['profit'] += total_profit
+
+    items = OrderItem.objects.filter(order__created_at__gte=start, order__created_at__lt=end).values_list(
+        'order__created_at', 'quantity'
+    )
+    for created_at, quantity in items.iterator(chunk_size=ITERATOR_CHUNK_SIZE):
+        days[local_day(created_at)]['items_sold'] += quantity
+
+    writeoffs = WriteOff.objects.filter(created_at__gte=start, created_at__lt=end).values_list(
+        'created_at', 'quantity', 'purchase_price'
+    )
+    for created_at, quantity, purchase_price in writeoffs.iterator(chunk_size=ITERATOR_CHUNK_SIZE):
+        row = days[local_day(created_at)]
+        row['writeoffs_count'] += 1
+        row['writeoff_loss'] += quantity * purchase_price
+
+    returns = Return.objects.filter(created_at__gte=start, created_at__lt=end).values_list('created_at', flat=True)
+    for created_at in returns.iterator(chunk_size=ITERATOR_CHUNK_SIZE):
+        days[local_day(created_at)]['returns_count'] += 1
+
+    return_items = ReturnItem.objects.filter(
+        return_instance__created_at__gte=start, return_instance__created_at__lt=end
+    ).values_list('return_instance__created_at', 'quantity', 'unit_price', 'purchase_price')
+    for created_at, quantity, unit_price, purchase_price in return_items.iterator(chunk_size=ITERATOR_CHUNK_SIZE):
+        row = days[local_day(created_at)]
+        row['refund_total'] += quantity * unit_price
+        row['return_loss'] += quantity * (unit_price - purchase_price)
+
+    rows = []
+    day = start_day
+    while day < min(end_day, timezone.localdate()):
+        rows.append({'date': day, **days[day]})
+        day += timedelta(days=1)
+    return year, month, rows
+
+
+def write_rows(rows):
+    """Ідемпотентний upsert рядків DailySalesRollup одним bulk-запитом."""
+    from .models import DailySalesRollup
+
+    objs = [DailySalesRollup(**row) for row in rows]
+    options = {'update_conflicts': True, 'update_fields': ROLLUP_FIELDS + ['updated_at']}
+    # MySQL (ON DUPLICATE KEY UPDATE) не приймає явний список unique_fields
+    if connection.features.supports_update_conflicts_with_target:
+        options['unique_fields'] = ['date']
+    with transaction.atomic():
+        DailySalesRollup.objects.bulk_create(objs, batch_size=500, **options)
+    return len(objs)
+
+
+def refresh_recent():
+    """Перераховує місяць, що містить учорашній день (фонова задача планувальника)."""
+    yesterday = timezone.localdate() - timedelta(days=1)
+    return write_rows(compute_month(yesterday.year, yesterday.month)[2])
+
+
+def is_month_complete(year, month):
+    """
+    Місяць вважається готовим, якщо для кожного його дня є рядок і всі вони
+    пораховані вже після кінця місяця.
+
+    Рядки, створені в самому місяці інкрементним обліком, можуть бути неповними
+    (наприклад, день розгортання), тож такий місяць рахується ще раз.
+    """
+    from django.db.models import Count, Min
+
+    from .models import DailySalesRollup
+
+    start_day, end_day = month_bounds(year, month)
+    stats = DailySalesRollup.objects.filter(date__gte=start_day, date__lt=end_day).aggregate(
+        days=Count('id'), computed_at=Min('updated_at'),
+    )
+    if stats['days'] != (end_day - start_day).days:
+        return False
+    return stats['computed_at'] >= _aware_range(end_day, end_day)[0]
@@ -2,35 +2,109 @@
 Сервісний шар для бізнес-логіки.
 Thin Views, Fat Services - складна логіка виноситься сюди.
 """
-from decimal import Decimal
-from django.db import transaction
+from decimal import Decimal, InvalidOperation
+from datetime import timedelta
+from functools import partial
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction, IntegrityError
+from django.db.models import Sum, Count, Max, Q, F, DateField, DecimalField, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Trunc, TruncDate, ExtractHour, ExtractIsoWeekDay
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django.template.loader import render_to_string
 from io import BytesIO
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.units import cm, mm
 from reportlab.pdfgen import canvas
-from reportlab.lib import colors
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.platypus import Frame, SimpleDocTemplate, Table, Paragraph, Spacer
+import hashlib
 import os
-from .models import Product, Supplier, Purchase, PurchaseItem, Order, OrderItem
+import tempfile
+from pathlib import Path
+from .models import (
+    Product, Supplier, Purchase, PurchaseItem, Order, OrderItem, Return, ReturnItem,
+    ProductSalesCounter, CategorySalesCounter, ProductDailySales, HourlySalesBucket, StockValuation,
+    DailySalesRollup,
+)
+from . import jobs
+from .events import publish_order
+from .pdf import receipt_styles
+from . import escpos
+from . import forecasting
+from . import rollups
+from .utils import local_day_q, local_midnight
 
 
 class PurchaseService:
     """Сервіс для роботи з поставками."""
     
     @staticmethod
+    def parse_expected_date(value):
+        """Дата з datetime-local / ISO рядка (без зони — локальний час) або None."""
+        if not value:
+            return None
+        try:
+            parsed = parse_datetime(str(value).replace('Z', '+00:00'))
+        except ValueError:
+            return None
+        if parsed and timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed, timezone.get_current_timezone())
+        return parsed
+    
+    @staticmethod
+    def validate_items(items_data):
+        """
+        Перевіряє позиції в пам'яті; всі товари читаються одним запитом.
+        
+        Returns:
+            tuple - (list[(product, quantity, unit_cost)], list[назви пропущених товарів])
+        """
+        product_ids = set()
+        for item in items_data:
+            try:
+                product_ids.add(int(item['product_id']))
+            except (KeyError, TypeError, ValueError):
+                continue
+        products = Product.objects.select_related('supplier').in_bulk(product_ids)
+        
+        lines = []
+        skipped = []
+        for item in items_data:
+            try:
+                product = products.get(int(item['product_id']))
+            except (KeyError, TypeError, ValueError):
+                continue
+            if product is None:
+                continue
+            try:
+                quantity = Decimal(str(item['quantity']))
+                unit_cost = item.get('unit_cost')
+                unit_cost = Decimal(str(unit_cost if unit_cost is not None else product.purchase_price))
+            except (KeyError, InvalidOperation, ValueError):
+                skipped.append(product.name)
+                continue
+            # Кількість — ціле додатне число, ціна — не від'ємна
+            if quantity <= 0 or quantity != quantity.to_integral_value() or unit_cost < 0:
+                skipped.append(product.name)
+                continue
+            lines.append((product, int(quantity), unit_cost))
+        return lines, skipped
+    
+    @classmethod
     @transaction.atomic
-    def create_purchase_from_items(items_data, expected_dates_data=None):
+    def create_purchase_from_items(cls, items_data, expected_dates_data=None, supplier=None):
         """
         Створює поставки, групуючи товари по постачальниках.
         
+        Товари читаються одним запитом, позиції кожної поставки вставляються
+        одним bulk_create, сума рахується в тому ж проході — кількість запитів
+        не залежить від кількості рядків.
+        
         Args:
             items_data: list[dict] - [{product_id, quantity, unit_cost}, ...]
             expected_dates_data: dict - {supplier_id: datetime_string, ...}
+            supplier: Supplier | None - усі позиції в одну поставку цього постачальника
             
         Returns:
             list[dict] - Інформація про створені поставки
@@ -38,84 +112,43 @@ class PurchaseService:
         if not items_data:
             return []
         
+        lines, skipped_items = cls.validate_items(items_data)
+        
         # Групуємо товари по постачальниках
         supplier_groups = {}
-        skipped_items = []
-        for item in items_data:
-            try:
-                product = Product.objects.select_related('supplier').get(id=item['product_id'])
-                supplier_id = product.supplier_id
-
-                # Пропускаємо товари без призначеного постачальника, щоб уникнути помилки NULL
-                if supplier_id is None:
-                    skipped_items.append(product.name)
-                    continue
-
-                # Валідації кількості та ціни
-                quantity = int(item['quantity'])
-                unit_cost = item.get('unit_cost')
-                unit_cost_decimal = Decimal(str(unit_cost if unit_cost is not None else product.purchase_price))
-                if quantity <= 0:
-                    skipped_items.append(product.name)
-                    continue
-                
-                if supplier_id not in supplier_groups:
-                    supplier_groups[supplier_id] = {
-                        'supplier': product.supplier,
-                        'items': []
-                    }
-                
-                supplier_groups[supplier_id]['items'].append({
-                    'product': product,
-                    'quantity': quantity,
-                    'unit_cost': unit_cost_decimal
-                })
-            except (Product.DoesNotExist, KeyError, ValueError, Decimal.InvalidOperation):
-                # Якщо продукт відсутній або дані некоректні, пропускаємо
+        for product, quantity, unit_cost in lines:
+            target = supplier or product.supplier
+            # Пропускаємо товари без призначеного постачальника, щоб уникнути помилки NULL
+            if target is None:
+                skipped_items.append(product.name)
                 continue
+            group = supplier_groups.setdefault(target.id, {'supplier': target, 'items': [], 'total': Decimal('0')})
+            group['items'].append((product, quantity, unit_cost))
+            group['total'] += quantity * unit_cost
         
         # Створюємо поставки для кожного постачальника
         created_purchases = []
         for supplier_id, group_data in supplier_groups.items():
-            supplier = group_data['supplier']
-            items = group_data['items']
-            
-            # Очікувана дата для цього постачальника
             expected_date = None
-            if expected_dates_data and str(supplier_id) in expected_dates_data:
-                try:
-                    expected_date = timezone.datetime.fromisoformat(
-                        expected_dates_data[str(supplier_id)].replace('Z', '+00:00')
-                    )
-                except (ValueError, AttributeError):
-                    pass
+            if expected_dates_data:
+                expected_date = cls.parse_expected_date(expected_dates_data.get(str(supplier_id)))
             
-            # Створюємо поставку
             purchase = Purchase.objects.create(
-                supplier=supplier,
+                supplier=group_data['supplier'],
                 expected_date=expected_date,
-                status='draft'
+                status=Purchase.Status.DRAFT,
+                total_cost=group_data['total'],
             )
-            
-            # Додаємо позиції
-            total_cost = Decimal('0')
-            for item_data in items:
-                PurchaseItem.objects.create(
-                    purchase=purchase,
-                    product=item_data['product'],
-                    quantity=item_data['quantity'],
-                    unit_cost=item_data['unit_cost']
-                )
-                total_cost += item_data['quantity'] * item_data['unit_cost']
-            
-            purchase.total_cost = total_cost
-            purchase.save(update_fields=['total_cost'])
+            PurchaseItem.objects.bulk_create([
+                PurchaseItem(purchase=purchase, product=product, quantity=quantity, unit_cost=unit_cost)
+                for product, quantity, unit_cost in group_data['items']
+            ], batch_size=500)
             
             created_purchases.append({
                 'id': purchase.id,
-                'supplier': supplier.name,
-                'items': len(items),
-                'total': float(total_cost)
+                'supplier': group_data['supplier'].name,
+                'items': len(group_data['items']),
+                'total': float(group_data['total'])
             })
         
         # Якщо були пропущені товари, додаємо службовий запис для відображення у повідомленні
@@ -129,6 +162,110 @@ class PurchaseService:
             })
         
         return created_purchases
+    
+    REORDER_JOB = 'reorder_suggestions'
+    
+    @staticmethod
+    def create_reorder_purchases(supplier_id=None, expected_dates_data=None):
+        """
+        Створює чернетки поставок за свіжим прогнозом дозамовлення.
+        
+        Args:
+            supplier_id: int | None - лише для цього постачальника
+            
+        Returns:
+            list[dict] - як у create_purchase_from_items
+        """
+        items = forecasting.purchase_items(forecasting.reorder_suggestions(), supplier_id)
+        created = PurchaseService.create_purchase_from_items(items, expected_dates_data)
+        jobs.expire(PurchaseService.REORDER_JOB)
+        return created
+
+    # Результати receive_purchases для кожної поставки
+    RECEIVED = 'received'
+    ALREADY_RECEIVED = 'already_received'
+    CANCELLED = 'cancelled'
+    NOT_FOUND = 'not_found'
+
+    @staticmethod
+    def receive_purchases(purchase_ids, update_purchase_price=None):
+        """
+        Позначає поставки отриманими і проводить їх на склад однією транзакцією.
+
+        Кількість запитів не залежить від кількості поставок: поставки
+        блокуються одним SELECT ... FOR UPDATE, суми позицій рахуються одним
+        GROUP BY, статус, total_cost і received_applied записуються одним
+        UPDATE, а залишки — одним Purchase.post_to_stock на всі поставки.
+        Скасовані та вже проведені поставки пропускаються.
+
+        Args:
+            purchase_ids: iterable[int]
+            update_purchase_price: bool | None - як у Purchase.apply_to_stock_once
+
+        Returns:
+            list[dict] - у порядку purchase_ids: [{id, result, items, quantity, total_cost}]
+        """
+        ids = list(dict.fromkeys(int(purchase_id) for purchase_id in purchase_ids))
+        if not ids:
+            return []
+
+        with transaction.atomic():
+            # Блокування в порядку id — паралельний прийом тих самих поставок чекає на коміт
+            locked = {
+                row['id']: row for row in Purchase.objects.select_for_update()
+                .filter(pk__in=ids).order_by('pk').values('id', 'status', 'received_applied')
+            }
+            to_receive = [
+                purchase_id for purchase_id, row in locked.items()
+                if not row['received_applied'] and row['status'] != Purchase.Status.CANCELLED
+            ]
+            line_total = F('quantity') * F('unit_cost')
+            totals = {
+                row['purchase_id']: row for row in PurchaseItem.objects.filter(purchase_id__in=to_receive)
+                .values('purchase_id').annotate(
+                    items=Count('id'),
+                    qty=Sum('quantity'),
+                    total=Sum(line_total, output_field=DecimalField(max_digits=12, decimal_places=2)),
+                ).order_by()
+            }
+            if to_receive:
+                total_cost = Subquery(
+                    PurchaseItem.objects.filter(purchase_id=OuterRef('pk')).values('purchase_id')
+                    .annotate(total=Sum(line_total, output_field=DecimalField(max_digits=12, decimal_places=2)))
+                    .values('total')
+                )
+                Purchase.objects.filter(pk__in=to_receive).update(
+                    status=Purchase.Status.RECEIVED,
+                    received_applied=True,
+                    total_cost=Coalesce(total_cost, Value(Decimal('0'))),
+                )
+                Purchase.post_to_stock(to_receive, update_purchase_price)
+
+        if to_receive:
+            # Відкриті поставки і дата останньої доставки змінились
+            jobs.expire(PurchaseService.REORDER_JOB)
+            jobs.expire(SupplierService.STATS_JOB)
+
+        results = []
+        for purchase_id in ids:
+            row = locked.get(purchase_id)
+            if row is None:
+                result = PurchaseService.NOT_FOUND
+            elif row['received_applied']:
+                result = PurchaseService.ALREADY_RECEIVED
+            elif row['status'] == Purchase.Status.CANCELLED:
+                result = PurchaseService.CANCELLED
+            else:
+                result = PurchaseService.RECEIVED
+            total = totals.get(purchase_id, {})
+            results.append({
+                'id': purchase_id,
+                'result': result,
+                'items': total.get('items', 0),
+                'quantity': total.get('qty') or 0,
+                'total_cost': float(total.get('total') or 0),
+            })
+        return results
 
 
 class OrderService:
@@ -155,6 +292,7 @@ class OrderService:
         order = Order.objects.create()
         total_price = Decimal('0')
         total_profit = Decimal('0')
+        sold_lines = []
         
         for item in cart_items:
             try:
@@ -180,6 +318,8 @@ class OrderService:
                 # Списуємо товар
                 product.quantity -= quantity
                 product.save(update_fields=['quantity'])
+                product.stock_changed(product.quantity + quantity, product.quantity)
+                sold_lines.append((product, quantity, product.price))
                 
                 # Рахуємо суми
                 item_total = quantity * product.price
@@ -195,71 +335,754 @@ class OrderService:
         order.total_profit = total_profit
         order.save(update_fields=['total_price', 'total_profit'])
         
+        SalesCounterService.record_order(order, sold_lines)
+        publish_order(order, sum(qty for _, qty, _ in sold_lines))
+        
         return order
 
 
-class SupplierService:
-    """Сервіс для роботи з постачальниками."""
+class StatsService:
+    """Сервіс для агрегованої статистики продажів."""
+    
+    PERIODS = ('day', 'week', 'month')
+    MIN_DAYS = 7
+    MAX_DAYS = 365
+    DEFAULT_DAYS = 30
+    
+    @staticmethod
+    def _bucket_start(day, period):
+        """Початок бакета (день / понеділок тижня / перше число місяця)."""
+        if period == 'week':
+            return day - timedelta(days=day.weekday())
+        if period == 'month':
+            return day.replace(day=1)
+        return day
+    
+    @staticmethod
+    def _next_bucket(day, period):
+        if period == 'week':
+            return day + timedelta(days=7)
+        if period == 'month':
+            return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+        return day + timedelta(days=1)
     
     @staticmethod
-    def get_suppliers_with_stats():
+    def _bucket_label(day, period):
+        if period == 'month':
+            return day.strftime('%m.%Y')
+        return day.strftime('%d.%m')
+    
+    @classmethod
+    def get_sales_timeline(cls, days=DEFAULT_DAYS, period='day'):
+        """
+        Продажі, прибуток і кількість чеків по бакетах одним GROUP BY.
+        
+        Межі бакетів рахуються у локальному часовому поясі (Europe/Kyiv),
+        порожні бакети заповнюються нулями.
+        
+        Args:
+            days: int - діапазон у днях (обмежується 7..365)
+            period: str - 'day' | 'week' | 'month'
+            
+        Returns:
+            dict - {labels, sales, profit, orders, days, period}
+        """
+        if period not in cls.PERIODS:
+            period = 'day'
+        days = max(cls.MIN_DAYS, min(cls.MAX_DAYS, int(days)))
+        
+        tz = timezone.get_default_timezone()
+        today = timezone.localdate(timezone=tz)
+        start_date = today - timedelta(days=days - 1)
+        start_dt = local_midnight(start_date)
+        
+        rows = (
+            Order.objects.filter(created_at__gte=start_dt)
+            .annotate(bucket=Trunc('created_at', period, output_field=DateField(), tzinfo=tz))
+            .values('bucket')
+            .annotate(sales=Sum('total_price'), profit=Sum('total_profit'), orders=Count('id'))
+            .order_by('bucket')
+        )
+        by_bucket = {row['bucket']: row for row in rows}
+        
+        labels, sales, profit, orders = [], [], [], []
+        bucket = cls._bucket_start(start_date, period)
+        while bucket <= today:
+            row = by_bucket.get(bucket, {})
+            labels.append(cls._bucket_label(bucket, period))
+            sales.append(float(row.get('sales') or 0))
+            profit.append(float(row.get('profit') or 0))
+            orders.append(row.get('orders') or 0)
+            bucket = cls._next_bucket(bucket, period)
+        
+        return {
+            'labels': labels,
+            'sales': sales,
+            'profit': profit,
+            'orders': orders,
+            'days': days,
+            'period': period,
+        }
+
+
+    WEEKDAYS = ['Пн', 'Вт', 'Ср', 'Чт', 'Пт', 'Сб', 'Нд']
+    HEATMAP_DEFAULT_DAYS = 90
+    HEATMAP_MAX_DAYS = 366
+    
+    @classmethod
+    def get_sales_heatmap(cls, date_from=None, date_to=None):
         """
-        Повертає список постачальників зі статистикою товарів.
+        Виручка, кількість чеків і середній чек по годинах × днях тижня.
+        
+        Рахується з погодинних бакетів (HourlySalesBucket), а не з Order.
         
         Returns:
-            list[dict] - Постачальники з кількістю товарів та низьким залишком
+            dict - матриці 7×24 (рядок = день тижня, Пн..Нд)
         """
-        suppliers = Supplier.objects.all().order_by('name')
-        result = []
+        date_to = date_to or timezone.localdate()
+        if not date_from or date_from > date_to:
+            date_from = date_to - timedelta(days=cls.HEATMAP_DEFAULT_DAYS - 1)
+        date_from = max(date_from, date_to - timedelta(days=cls.HEATMAP_MAX_DAYS - 1))
+        
+        revenue = [[0.0] * 24 for _ in range(7)]
+        orders = [[0] * 24 for _ in range(7)]
+        avg_check = [[0.0] * 24 for _ in range(7)]
+        
+        rows = HourlySalesBucket.objects.filter(date__gte=date_from, date__lte=date_to).annotate(
+            weekday=ExtractIsoWeekDay('date')
+        ).values('weekday', 'hour').annotate(n=Sum('orders_count'), total=Sum('sales'))
+        for row in rows:
+            day, hour = row['weekday'] - 1, row['hour']
+            revenue[day][hour] = float(row['total'] or 0)
+            orders[day][hour] = row['n'] or 0
+            avg_check[day][hour] = round(revenue[day][hour] / orders[day][hour], 2) if orders[day][hour] else 0.0
         
-        for supplier in suppliers:
-            products = supplier.products.all()
-            products_count = products.count()
-            low_stock_count = products.filter(quantity__lte=5).count()
+        return {
+            'weekdays': cls.WEEKDAYS,
+            'hours': list(range(24)),
+            'revenue': revenue,
+            'orders': orders,
+            'avg_check': avg_check,
+            'date_from': date_from.isoformat(),
+            'date_to': date_to.isoformat(),
+        }
+
+
+class SalesCounterService:
+    """
+    Інкрементні лічильники продажів по товарах і категоріях.
+    
+    Оновлюються в тій самій транзакції, що й чек/повернення, тож рейтинги
+    (топ товарів/категорій) читаються з невеликих таблиць, а не з OrderItem.
+    """
+    
+    @staticmethod
+    def _bump(model, lookup, defaults=None, **increments):
+        """Атомарно додає значення до полів рядка лічильника, створюючи його за потреби."""
+        changes = {field: F(field) + value for field, value in increments.items()}
+        if model.objects.filter(**lookup).update(**changes):
+            return
+        try:
+            with transaction.atomic():
+                model.objects.create(**lookup, **(defaults or {}), **increments)
+        except IntegrityError:
+            # Рядок щойно створила паралельна транзакція
+            model.objects.filter(**lookup).update(**changes)
+    
+    @classmethod
+    def record(cls, lines, sign=1, day=None):
+        """
+        Args:
+            lines: iterable of (product, quantity, unit_price)
+            sign: 1 для продажу, -1 для повернення
+            day: локальна дата (за замовчуванням — сьогодні)
+        """
+        day = day or timezone.localdate()
+        per_product = {}
+        per_category = {}
+        for product, quantity, unit_price in lines:
+            qty = sign * int(quantity)
+            revenue = qty * unit_price
+            p_qty, p_rev, _ = per_product.get(product.id, (0, Decimal('0'), product.category_id))
+            per_product[product.id] = (p_qty + qty, p_rev + revenue, product.category_id)
+            c_qty, c_rev = per_category.get(product.category_id, (0, Decimal('0')))
+            per_category[product.category_id] = (c_qty + qty, c_rev + revenue)
+        
+        # Фіксований порядок оновлень зменшує ризик взаємоблокувань
+        for product_id, (qty, revenue, category_id) in sorted(per_product.items()):
+            cls._bump(ProductSalesCounter, {'product_id': product_id}, qty_sold=qty, revenue=revenue)
+            cls._bump(ProductDailySales, {'product_id': product_id, 'date': day},
+                      defaults={'category_id': category_id}, qty_sold=qty, revenue=revenue)
+        for category_id, (qty, revenue) in sorted(per_category.items()):
+            cls._bump(CategorySalesCounter, {'category_id': category_id}, qty_sold=qty, revenue=revenue)
+    
+    @classmethod
+    def record_sale(cls, lines, day=None):
+        cls.record(lines, sign=1, day=day)
+    
+    @classmethod
+    def record_day(cls, moment, **increments):
+        """Додає значення до денних підсумків (DailySalesRollup) за локальну дату moment."""
+        cls._bump(DailySalesRollup, {'date': timezone.localtime(moment).date()}, **increments)
+    
+    @classmethod
+    def record_order(cls, order, lines):
+        """Облік нового чека: погодинний бакет, денні підсумки, лічильники товарів і категорій."""
+        local = timezone.localtime(order.created_at)
+        cls._bump(HourlySalesBucket, {'date': local.date(), 'hour': local.hour},
+                  orders_count=1, sales=order.total_price)
+        cls.record_day(order.created_at, orders_count=1, items_sold=sum(qty for _, qty, _ in lines),
+                       sales=order.total_price, profit=order.total_profit)
+        cls.record_sale(lines, day=local.date())
+    
+    @classmethod
+    def record_return(cls, lines, day=None):
+        cls.record(lines, sign=-1, day=day)
+    
+    @classmethod
+    def record_return_totals(cls, return_obj):
+        """Облік повернення в денних підсумках (позиції вже створені)."""
+        cls.record_day(return_obj.created_at, returns_count=1,
+                       refund_total=return_obj.get_total_refund(), return_loss=return_obj.get_total_loss())
+    
+    @classmethod
+    def record_writeoff(cls, writeoff):
+        cls.record_day(writeoff.created_at, writeoffs_count=1, writeoff_loss=writeoff.get_total_loss())
+    
+    @staticmethod
+    def _window_start(days):
+        return timezone.localdate() - timedelta(days=days - 1)
+    
+    @classmethod
+    def top_products(cls, limit=10, days=None):
+        """Топ товарів за виручкою: за весь час або за останні `days` днів."""
+        if days:
+            rows = ProductDailySales.objects.filter(date__gte=cls._window_start(days)).values(
+                'product__name'
+            ).annotate(qty=Sum('qty_sold'), total=Sum('revenue')).order_by('-total')[:limit]
+        else:
+            rows = ProductSalesCounter.objects.values('product__name').annotate(
+                qty=F('qty_sold'), total=F('revenue')
+            ).order_by('-revenue')[:limit]
+        return [
+            {'name': row['product__name'], 'qty': row['qty'], 'revenue': float(row['total'] or 0)}
+            for row in rows
+        ]
+    
+    @classmethod
+    def top_categories(cls, limit=5, days=None):
+        """Топ категорій за виручкою: за весь час або за останні `days` днів."""
+        if days:
+            rows = ProductDailySales.objects.filter(date__gte=cls._window_start(days)).values(
+                'category__name'
+            ).annotate(qty=Sum('qty_sold'), total=Sum('revenue')).order_by('-total')[:limit]
+        else:
+            rows = CategorySalesCounter.objects.values('category__name').annotate(
+                qty=F('qty_sold'), total=F('revenue')
+            ).order_by('-revenue')[:limit]
+        return [
+            {'name': row['category__name'] or 'Без категорії', 'qty': row['qty'], 'revenue': float(row['total'] or 0)}
+            for row in rows
+        ]
+    
+    @staticmethod
+    @transaction.atomic
+    def rebuild():
+        """
+        Повністю перераховує лічильники та погодинні бакети з історії чеків і повернень.
+        
+        Returns:
+            int - кількість рядків денних продажів
+        """
+        tz = timezone.get_default_timezone()
+        daily = {}
+        
+        def add(rows, sign):
+            for row in rows:
+                key = (row['product_id'], row['day'])
+                qty, revenue, _ = daily.get(key, (0, Decimal('0'), row['product__category_id']))
+                daily[key] = (qty + sign * row['qty'], revenue + sign * (row['revenue'] or 0), row['product__category_id'])
+        
+        add(OrderItem.objects.annotate(day=TruncDate('order__created_at', tzinfo=tz)).values(
+            'product_id', 'product__category_id', 'day'
+        ).annotate(qty=Sum('quantity'), revenue=Sum(F('quantity') * F('price'), output_field=DecimalField())), 1)
+        add(ReturnItem.objects.annotate(day=TruncDate('return_instance__created_at', tzinfo=tz)).values(
+            'product_id', 'product__category_id', 'day'
+        ).annotate(qty=Sum('quantity'), revenue=Sum(F('quantity') * F('unit_price'), output_field=DecimalField())), -1)
+        
+        products = {}
+        categories = {}
+        for (product_id, _day), (qty, revenue, category_id) in daily.items():
+            p_qty, p_rev = products.get(product_id, (0, Decimal('0')))
+            products[product_id] = (p_qty + qty, p_rev + revenue)
+            c_qty, c_rev = categories.get(category_id, (0, Decimal('0')))
+            categories[category_id] = (c_qty + qty, c_rev + revenue)
+        
+        hourly = Order.objects.annotate(
+            day=TruncDate('created_at', tzinfo=tz),
+            hour=ExtractHour('created_at', tzinfo=tz),
+        ).values('day', 'hour').annotate(orders=Count('id'), total=Sum('total_price'))
+        hourly_buckets = [
+            HourlySalesBucket(date=row['day'], hour=row['hour'], orders_count=row['orders'], sales=row['total'] or 0)
+            for row in hourly
+        ]
+        
+        HourlySalesBucket.objects.all().delete()
+        ProductDailySales.objects.all().delete()
+        ProductSalesCounter.objects.all().delete()
+        CategorySalesCounter.objects.all().delete()
+        HourlySalesBucket.objects.bulk_create(hourly_buckets, batch_size=1000)
+        ProductDailySales.objects.bulk_create([
+            ProductDailySales(product_id=product_id, category_id=category_id, date=day, qty_sold=qty, revenue=revenue)
+            for (product_id, day), (qty, revenue, category_id) in daily.items()
+        ], batch_size=1000)
+        ProductSalesCounter.objects.bulk_create([
+            ProductSalesCounter(product_id=product_id, qty_sold=qty, revenue=revenue)
+            for product_id, (qty, revenue) in products.items()
+        ], batch_size=1000)
+        CategorySalesCounter.objects.bulk_create([
+            CategorySalesCounter(category_id=category_id, qty_sold=qty, revenue=revenue)
+            for category_id, (qty, revenue) in categories.items()
+        ], batch_size=1000)
+        return len(daily)
+
+
+class StockValuationService:
+    """Читання та звірка накопичувальної вартості складу (StockValuation)."""
+    
+    @staticmethod
+    def _sum(qs):
+        return qs.aggregate(total=Sum('value'))['total'] or Decimal('0')
+    
+    @classmethod
+    def total_value(cls):
+        """Собівартість усіх залишків."""
+        return cls._sum(StockValuation.objects.all())
+    
+    @staticmethod
+    def by_category():
+        """list[dict] - вартість залишків по категоріях (за спаданням)."""
+        return list(StockValuation.objects.values('category_id', 'category__name').annotate(
+            quantity=Sum('quantity'), value=Sum('value')
+        ).order_by('-value'))
+    
+    @classmethod
+    def expiry_value(cls, date_from=None, date_to=None):
+        """Собівартість залишків з терміном придатності у [date_from, date_to]."""
+        qs = StockValuation.objects.filter(expiry_date__isnull=False)
+        if date_from:
+            qs = qs.filter(expiry_date__gte=date_from)
+        if date_to:
+            qs = qs.filter(expiry_date__lte=date_to)
+        return cls._sum(qs)
+    
+    @staticmethod
+    def _actual_rows():
+        rows = Product.objects.values('category_id', 'expiry_date').annotate(
+            qty=Sum('quantity'),
+            value=Sum(F('quantity') * F('purchase_price'), output_field=DecimalField()),
+        )
+        return {
+            (row['category_id'], row['expiry_date']): (row['qty'] or 0, row['value'] or Decimal('0'))
+            for row in rows
+        }
+    
+    @classmethod
+    def verify(cls, fix=False):
+        """
+        Звіряє накопичені підсумки з фактичними залишками Product.
+        
+        Args:
+            fix: якщо True — при розбіжностях таблиця перебудовується
             
-            result.append({
+        Returns:
+            list[dict] - розбіжності {category_id, expiry_date, expected, stored}
+        """
+        actual = cls._actual_rows()
+        stored = {}
+        for row in StockValuation.objects.values('category_id', 'expiry_date').annotate(
+            qty=Sum('quantity'), total=Sum('value')
+        ):
+            stored[(row['category_id'], row['expiry_date'])] = (row['qty'] or 0, row['total'] or Decimal('0'))
+        
+        empty = (0, Decimal('0'))
+        drift = [
+            {'category_id': key[0], 'expiry_date': key[1],
+             'expected': actual.get(key, empty), 'stored': stored.get(key, empty)}
+            for key in sorted(set(actual) | set(stored), key=str)
+            if actual.get(key, empty) != stored.get(key, empty)
+        ]
+        if drift and fix:
+            with transaction.atomic():
+                StockValuation.objects.all().delete()
+                StockValuation.objects.bulk_create([
+                    StockValuation(category_id=category_id, expiry_date=expiry_date, quantity=qty, value=value)
+                    for (category_id, expiry_date), (qty, value) in actual.items()
+                ], batch_size=1000)
+        return drift
+
+
+class DashboardService:
+    """
+    Секції сторінки аналітики. Кожна секція рахується і кешується окремо
+    (зі своїм TTL), тож повільна секція не блокує решту.
+    """
+    
+    JOB_PREFIX = 'dashboard:'
+    SOON_EXPIRY_DAYS = 14
+    
+    # Назва секції -> TTL у секундах (можна перевизначити через settings.DASHBOARD_SECTION_TTL)
+    SECTION_TTL = {
+        'today': 30,
+        'totals': 300,
+        'stock': 60,
+        'suppliers': 600,
+        'purchases': 120,
+        'returns': 60,
+        'expiry': 600,
+        'top_products': 300,
+        'top_categories': 300,
+    }
+    
+    @classmethod
+    def sections(cls):
+        return list(cls.SECTION_TTL)
+    
+    @classmethod
+    def get_ttl(cls, name):
+        overrides = getattr(settings, 'DASHBOARD_SECTION_TTL', {})
+        return overrides.get(name, cls.SECTION_TTL[name])
+    
+    @classmethod
+    def register_jobs(cls):
+        """Реєструє секції як фонові задачі (інтервал оновлення = TTL секції)."""
+        for name in cls.sections():
+            jobs.register(
+                cls.JOB_PREFIX + name,
+                getattr(cls, f'_section_{name}'),
+                partial(cls.get_ttl, name),
+            )
+    
+    @classmethod
+    def get_section(cls, name):
+        """
+        Повертає дані секції: прогріті планувальником, застарілі (з фоновим
+        перерахунком) або пораховані в запиті.
+        
+        Raises:
+            KeyError - невідома секція
+        """
+        if name not in cls.SECTION_TTL:
+            raise KeyError(name)
+        return jobs.read(cls.JOB_PREFIX + name)
+    
+    @classmethod
+    def get_sections(cls, names=None):
+        """
+        Повертає кілька секцій одразу; відсутні в кеші рахуються паралельно.
+        
+        Returns:
+            dict - {назва секції: дані}
+        """
+        names = names or cls.sections()
+        data = jobs.read_many([cls.JOB_PREFIX + name for name in names])
+        return {name: data[cls.JOB_PREFIX + name] for name in names}
+    
+    @staticmethod
+    def _money_sum(expression, **extra):
+        return Sum(expression, output_field=DecimalField(), **extra)
+    
+    @staticmethod
+    def _section_today():
+        today = timezone.localdate()
+        agg = Order.objects.filter(local_day_q('created_at', today)).aggregate(
+            orders=Count('id'),
+            sales=Sum('total_price'),
+            profit=Sum('total_profit'),
+        )
+        sales = agg['sales'] or Decimal('0')
+        orders = agg['orders']
+        return {
+            'sales': float(sales),
+            'profit': float(agg['profit'] or 0),
+            'orders': orders,
+            'avg_check': float(sales / orders) if orders else 0.0,
+        }
+    
+    @staticmethod
+    def _closed_days(**fields):
+        """
+        Суми денних підсумків за дні до сьогодні. Поточний день у DailySalesRollup
+        ще наповнюється, тож секції додають його з живих таблиць.
+        """
+        agg = DailySalesRollup.objects.filter(date__lt=timezone.localdate()).aggregate(
+            **{name: Sum(field) for name, field in fields.items()}
+        )
+        return {name: value or 0 for name, value in agg.items()}
+    
+    @classmethod
+    def _section_totals(cls):
+        past = cls._closed_days(orders='orders_count', sales='sales', profit='profit')
+        agg = Order.objects.filter(local_day_q('created_at', timezone.localdate())).aggregate(
+            orders=Count('id'),
+            sales=Sum('total_price'),
+            profit=Sum('total_profit'),
+        )
+        sales = past['sales'] + (agg['sales'] or Decimal('0'))
+        orders = past['orders'] + agg['orders']
+        return {
+            'orders': orders,
+            'sales': float(sales),
+            'profit': float(past['profit'] + (agg['profit'] or 0)),
+            'avg_check': float(sales / orders) if orders else 0.0,
+        }
+    
+    @classmethod
+    def _section_stock(cls):
+        agg = Product.objects.aggregate(
+            total=Count('id'),
+            low=Count('id', filter=Q(is_low_stock=True)),
+            out=Count('id', filter=Q(quantity=0)),
+        )
+        return {
+            'low_stock': agg['low'],
+            'out_of_stock': agg['out'],
+            'good_stock': agg['total'] - agg['low'] - agg['out'],
+            'total_products': agg['total'],
+            'total_stock_value': float(StockValuationService.total_value()),
+        }
+    
+    @staticmethod
+    def _section_suppliers():
+        return {
+            'supplier_count': Supplier.objects.count(),
+            'suppliers_active': Supplier.objects.filter(products__isnull=False).distinct().count(),
+        }
+    
+    @staticmethod
+    def _section_purchases():
+        counts = {status: 0 for status in Purchase.Status.values}
+        for row in Purchase.objects.values('status').annotate(n=Count('id')):
+            counts[row['status']] = row['n']
+        return {**counts, 'total': sum(counts.values())}
+    
+    @classmethod
+    def _section_returns(cls):
+        today = timezone.localdate()
+        past = cls._closed_days(refund='refund_total', count='returns_count')
+        today_refund = ReturnItem.objects.filter(local_day_q('return_instance__created_at', today)).aggregate(
+            total=cls._money_sum(F('quantity') * F('unit_price')),
+        )['total'] or 0
+        today_count = Return.objects.filter(local_day_q('created_at', today)).count()
+        return {
+            'total_refund': float(past['refund'] + today_refund),
+            'today_refund': float(today_refund),
+            'count': past['count'] + today_count,
+            'today_count': today_count,
+        }
+    
+    @classmethod
+    def _section_expiry(cls):
+        threshold = timezone.localdate() + timedelta(days=cls.SOON_EXPIRY_DAYS)
+        return {
+            'potential_loss': float(StockValuationService.expiry_value(date_to=threshold)),
+            'soon_days': cls.SOON_EXPIRY_DAYS,
+        }
+    
+    @staticmethod
+    def _section_top_products():
+        return {'items': SalesCounterService.top_products(limit=10)}
+    
+    @staticmethod
+    def _section_top_categories():
+        return {'items': SalesCounterService.top_categories(limit=5)}
+
+
+class SupplierService:
+    """Сервіс для роботи з постачальниками."""
+    
+    STATS_JOB = 'supplier_stats'
+    
+    # Поставки, які ще не проведені і не скасовані
+    OPEN_PURCHASE_STATUSES = (Purchase.Status.DRAFT, Purchase.Status.ORDERED)
+    
+    @classmethod
+    def get_suppliers_with_stats(cls):
+        """
+        Повертає список постачальників зі статистикою — одним SQL-запитом.
+        
+        Метрики товарів рахуються через JOIN з групуванням, метрики поставок —
+        корельованими підзапитами (другий JOIN розмножив би рядки товарів).
+        Дата поставки — очікувана дата отриманої поставки, а якщо її не
+        вказали — дата створення.
+        
+        Returns:
+            list[dict] - Постачальники з кількістю товарів, низьким залишком,
+            вартістю залишку (за ціною закупівлі), кількістю відкритих поставок
+            та датою останньої поставки
+        """
+        purchases = Purchase.objects.filter(supplier=OuterRef('pk')).order_by().values('supplier')
+        open_purchases = (
+            purchases.filter(status__in=cls.OPEN_PURCHASE_STATUSES)
+            .annotate(count=Count('id')).values('count')
+        )
+        last_delivery = (
+            purchases.filter(status=Purchase.Status.RECEIVED)
+            .annotate(last=Max(Coalesce('expected_date', 'created_at'))).values('last')
+        )
+        money = DecimalField(max_digits=14, decimal_places=2)
+        
+        suppliers = Supplier.objects.annotate(
+            products_count=Count('products'),
+            low_stock_count=Count('products', filter=Q(products__is_low_stock=True)),
+            stock_value=Coalesce(
+                Sum(F('products__quantity') * F('products__purchase_price'), output_field=money),
+                Value(Decimal('0')), output_field=money,
+            ),
+            open_purchases_count=Coalesce(Subquery(open_purchases, output_field=IntegerField()), 0),
+            last_delivery_at=Subquery(last_delivery),
+        ).order_by('name')
+        
+        return [
+            {
                 'id': supplier.id,
                 'name': supplier.name,
                 'email': supplier.email or '',
                 'phone': supplier.phone or '',
-                'products_count': products_count,
-                'low_stock_count': low_stock_count
-            })
-        
-        return result
+                'products_count': supplier.products_count,
+                'low_stock_count': supplier.low_stock_count,
+                'stock_value': supplier.stock_value,
+                'open_purchases_count': supplier.open_purchases_count,
+                'last_delivery_at': supplier.last_delivery_at,
+            }
+            for supplier in suppliers
+        ]
 
 
 class ReceiptService:
     """Сервіс для генерування чеків у HTML та PDF форматі."""
     
+    # Збільшити при зміні вигляду чека — старі кешовані рендери перестануть використовуватись
+    RENDER_VERSION = 2
+    HTML_CACHE_PREFIX = 'receipt:html:'
+    HTML_CACHE_TIMEOUT = 30 * 24 * 3600
+    # Каталог PDF у MEDIA_ROOT: blobs/<sha256[:2]>/<sha256>.pdf + індекс by-order/v<версія>/<id>
+    PDF_STORE_DIR = 'receipts'
+    
+    @classmethod
+    def _html_key(cls, order_id):
+        return f'{cls.HTML_CACHE_PREFIX}v{cls.RENDER_VERSION}:{order_id}'
+    
+    @classmethod
+    def _escpos_key(cls, order_id, codepage):
+        return f'receipt:escpos:v{cls.RENDER_VERSION}:{codepage}:{order_id}'
+    
     @staticmethod
-    def _register_unicode_fonts():
+    def _ensure_exists(order_id):
         """
-        Реєструємо Unicode шрифти для PDF.
-        Використовуємо вбудовані системні шрифти.
+        Кешований рендер віддається лише для наявного чека: видалення через
+        QuerySet.delete() (масова дія адмінки) не проходить через Order.delete.
         """
-        try:
-            # Спробуємо знайти системні шрифти Windows для Unicode підтримки
-            font_paths = [
-                r"C:\Windows\Fonts\arial.ttf",
-                r"C:\Windows\Fonts\Calibri.ttf",
-                r"C:\Windows\Fonts\Tahoma.ttf",
-            ]
+        if not Order.objects.filter(id=order_id).exists():
+            raise Order.DoesNotExist(f"Чек {order_id} не знайдено")
+    
+    @classmethod
+    def forget(cls, order_id):
+        """Прибирає кешовані рендери видаленого чека (PDF-блоби спільні — лишаються)."""
+        cache.delete_many([cls._html_key(order_id)] + [
+            cls._escpos_key(order_id, codepage) for codepage in escpos.CODEPAGES
+        ])
+        index = cls._pdf_store() / 'by-order' / f'v{cls.RENDER_VERSION}' / str(order_id)
+        index.unlink(missing_ok=True)
+    
+    @classmethod
+    def get_receipt_html(cls, order_id):
+        """
+        HTML чека з кешу (чеки не змінюються після створення).
+        
+        Returns:
+            dict - {html, total, created_at}
             
-            for font_path in font_paths:
-                if os.path.exists(font_path):
-                    # Реєструємо шрифт
-                    font_name = os.path.basename(font_path).replace('.ttf', '')
-                    try:
-                        pdfmetrics.registerFont(TTFont(font_name, font_path))
-                        return font_name
-                    except Exception:
-                        continue
-        except Exception:
+        Raises:
+            Order.DoesNotExist - чек не знайдено
+        """
+        key = cls._html_key(order_id)
+        data = cache.get(key)
+        if data is not None:
+            cls._ensure_exists(order_id)
+        else:
+            order = Order.objects.get(id=order_id)
+            data = {
+                'html': cls.generate_receipt_html(order),
+                'total': float(order.total_price),
+                'created_at': order.created_at.strftime('%d.%m.%Y %H:%M:%S'),
+            }
+            cache.set(key, data, cls.HTML_CACHE_TIMEOUT)
+        return data
+    
+    @classmethod
+    def get_receipt_escpos(cls, order_id):
+        """
+        Чек для термопринтера (ESC/POS, кілька сотень байтів), з кешу.
+        
+        Raises:
+            Order.DoesNotExist - чек не знайдено
+        """
+        codepage = getattr(settings, 'ESCPOS_CODEPAGE', 'cp1251')
+        key = cls._escpos_key(order_id, codepage)
+        data = cache.get(key)
+        if data is not None:
+            cls._ensure_exists(order_id)
+        else:
+            order = Order.objects.get(id=order_id)
+            data = escpos.render_receipt(order, order.items.select_related('product'), codepage)
+            cache.set(key, data, cls.HTML_CACHE_TIMEOUT)
+        return data
+    
+    @classmethod
+    def _pdf_store(cls):
+        return Path(settings.MEDIA_ROOT) / cls.PDF_STORE_DIR
+    
+    @staticmethod
+    def _write_atomic(path, data):
+        """Запис через тимчасовий файл: читач ніколи не побачить недописаний файл."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+    
+    @classmethod
+    def get_receipt_pdf_path(cls, order_id):
+        """
+        Шлях до PDF чека у content-addressed сховищі; рендерить лише при першому запиті.
+        
+        Raises:
+            Order.DoesNotExist - чек не знайдено
+        """
+        store = cls._pdf_store()
+        index = store / 'by-order' / f'v{cls.RENDER_VERSION}' / str(order_id)
+        try:
+            blob = store / 'blobs' / index.read_text().strip()
+            if blob.exists():
+                cls._ensure_exists(order_id)
+                return blob
+        except FileNotFoundError:
             pass
         
-        # Якщо не вдалось зареєструвати, повертаємо ім'я стандартного шрифту
-        return 'Helvetica'
+        order = Order.objects.get(id=order_id)
+        data = cls.generate_receipt_pdf(order).getvalue()
+        digest = hashlib.sha256(data).hexdigest()
+        relative = f'{digest[:2]}/{digest}.pdf'
+        blob = store / 'blobs' / relative
+        if not blob.exists():
+            cls._write_atomic(blob, data)
+        cls._write_atomic(index, relative.encode())
+        return blob
     
     @staticmethod
     def generate_receipt_html(order):
@@ -322,74 +1145,48 @@ class ReceiptService:
         
         return html_content
     
+    RECEIPT_PAGE_SIZE = (80 * mm, 200 * mm)
+    
+    @classmethod
+    def _receipt_doc(cls, target):
+        """Документ формату чека (як для теплового принтера)."""
+        return SimpleDocTemplate(
+            target,
+            pagesize=cls.RECEIPT_PAGE_SIZE,
+            rightMargin=5*mm,
+            leftMargin=5*mm,
+            topMargin=5*mm,
+            bottomMargin=5*mm,
+            # Детермінований вивід (без дати створення та випадкового ID) — однаковий чек дає однакові байти
+            invariant=True
+        )
+    
     @staticmethod
-    def generate_receipt_pdf(order):
+    def receipt_elements(order, items=None):
         """
-        Генерує PDF чека з підтримкою Unicode символів.
+        Flowable-елементи одного чека.
         
         Args:
             order: Order - об'єкт замовлення
-            
-        Returns:
-            BytesIO - PDF файл у вигляді байтів
+            items: iterable[OrderItem] | None - позиції (якщо вже завантажені)
         """
-        from reportlab.pdfbase.pdfmetrics import registerFont
-        from reportlab.lib.styles import ParagraphStyle
-        
-        # Реєструємо шрифт для Unicode
-        font_name = ReceiptService._register_unicode_fonts()
-        
-        # Визначаємо розміри для чека (як для теплового принтера)
-        width = 80 * mm
-        height = 200 * mm
+        # Шрифт і стилі реєструються один раз на процес (store.pdf)
+        styles = receipt_styles()
+        if items is None:
+            items = order.items.select_related('product')
         
-        # Створюємо PDF
-        buffer = BytesIO()
-        doc = SimpleDocTemplate(
-            buffer,
-            pagesize=(width, height),
-            rightMargin=5*mm,
-            leftMargin=5*mm,
-            topMargin=5*mm,
-            bottomMargin=5*mm
-        )
-        
-        # Стилі з Unicode підтримкою
-        styles = getSampleStyleSheet()
-        
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=12,
-            textColor=colors.black,
-            alignment=1,  # центрування
-            spaceAfter=5,
-            fontName=font_name
-        )
-        
-        normal_style = ParagraphStyle(
-            'CustomNormal',
-            parent=styles['Normal'],
-            fontSize=8,
-            leading=10,
-            alignment=1,
-            fontName=font_name
-        )
-        
-        # Елементи для PDF
         elements = []
         
         # Заголовок (без emoji для сумісності з шрифтами)
-        elements.append(Paragraph("КАССА", title_style))
-        elements.append(Paragraph(f"Чек №{order.id}", normal_style))
+        elements.append(Paragraph("КАССА", styles.title))
+        elements.append(Paragraph(f"Чек №{order.id}", styles.normal))
         elements.append(Paragraph(
             order.created_at.strftime('%d.%m.%Y %H:%M:%S'),
-            normal_style
+            styles.normal
         ))
         elements.append(Spacer(1, 0.3*cm))
         
         # Таблиця товарів
-        items = order.items.select_related('product')
         table_data = [['Товар', 'К-во', 'Ціна', 'Сума']]
         
         for item in items:
@@ -406,45 +1203,69 @@ class ReceiptService:
         # Додаємо рядок з сумою (без символу ₴ для сумісності)
         table_data.append(['', '', 'РАЗОМ:', f"{order.total_price:.2f} грн"])
         
-        # Стиль таблиці
         table = Table(table_data, colWidths=[2.5*cm, 1*cm, 1.2*cm, 1.2*cm])
-        table.setStyle(TableStyle([
-            ('FONTSIZE', (0, 0), (-1, -1), 7),
-            ('FONTNAME', (0, 0), (-1, -1), font_name),
-            ('ALIGN', (0, 0), (0, -1), 'LEFT'),
-            ('ALIGN', (1, 0), (-1, -1), 'RIGHT'),
-            ('LINEBELOW', (0, 0), (-1, 0), 0.5, colors.black),
-            ('LINEBELOW', (0, -1), (-1, -1), 0.5, colors.black),
-        ]))
+        table.setStyle(styles.items_table)
         
         elements.append(table)
         elements.append(Spacer(1, 0.3*cm))
         
         # Нижній текст (без emoji для сумісності з шрифтами)
-        elements.append(Paragraph("Дякуємо за покупку!", normal_style))
+        elements.append(Paragraph("Дякуємо за покупку!", styles.normal))
+        return elements
+    
+    @classmethod
+    def generate_receipt_pdf(cls, order):
+        """
+        Генерує PDF чека з підтримкою Unicode символів.
         
-        # Будуємо PDF
-        try:
-            doc.build(elements)
-        except Exception as e:
-            # Якщо виникла помилка, спробуємо без кастомного шрифту
-            doc = SimpleDocTemplate(
-                buffer,
-                pagesize=(width, height),
-                rightMargin=5*mm,
-                leftMargin=5*mm,
-                topMargin=5*mm,
-                bottomMargin=5*mm
-            )
-            
-            # Переробляємо стилі зі стандартним шрифтом
-            title_style.fontName = 'Helvetica'
-            normal_style.fontName = 'Helvetica'
+        Args:
+            order: Order - об'єкт замовлення
             
-            doc.build(elements)
+        Returns:
+            BytesIO - PDF файл у вигляді байтів
+        """
+        buffer = BytesIO()
+        cls._receipt_doc(buffer).build(cls.receipt_elements(order))
         
         # Повертаємо буфер на початок
         buffer.seek(0)
         return buffer
+    
+    @classmethod
+    def write_receipts_pdf(cls, orders, target):
+        """
+        Багатосторінковий PDF: кожен чек з нової сторінки.
+        
+        Args:
+            orders: iterable[Order] - з попередньо завантаженими items__product
+            target: str | file - шлях або файловий об'єкт
+        """
+        # Без SimpleDocTemplate.build: він тримає flowables усіх чеків до кінця.
+        # Тут кожен чек одразу малюється на свою сторінку і відпускається
+        width, height = cls.RECEIPT_PAGE_SIZE
+        c = canvas.Canvas(target, pagesize=cls.RECEIPT_PAGE_SIZE, invariant=1)
+        for order in orders:
+            elements = cls.receipt_elements(order, order.items.all())
+            while elements:
+                frame = Frame(5*mm, 5*mm, width - 10*mm, height - 10*mm)
+                remaining = len(elements)
+                frame.addFromList(elements, c)
+                if len(elements) == remaining:
+                    # Елемент не вміщується навіть на порожню сторінку — пропускаємо, щоб не зациклитись
+                    elements.pop(0)
+                c.showPage()
+        c.save()
 
 
+def register_report_jobs():
+    """Фонові звітні задачі (виконує команда run_report_scheduler)."""
+    DashboardService.register_jobs()
+    jobs.register(SupplierService.STATS_JOB, SupplierService.get_suppliers_with_stats, 600)
+    jobs.register(PurchaseService.REORDER_JOB, forecasting.reorder_suggestions, 3600)
+    # Звірка накопиченої вартості складу; результат — кількість розбіжностей.
+    # Лише звірка: перебудова таблиці паралельно з продажами може загубити зміни,
+    # тому виправлення запускається вручну (verify_stock_valuation --fix)
+    jobs.register('stock_valuation_check', lambda: len(StockValuationService.verify()), 3600)
+    # Перерахунок місяця, що містить учорашній день: виправляє неповний рядок дня
+    # розгортання та зміни, внесені в історію заднім числом
+    jobs.register('daily_rollups', rollups.refresh_recent, 3600)
@@ -0,0 +1,38 @@
+// Часткове оновлення списків менеджера: сортування, фільтр і пагінація
+// підвантажують лише таблицю (заголовок X-Fragment), без навігації та фільтрів.
+(function () {
+    const container = document.querySelector('[data-fragment-list]');
+    if (!container) return;
+
+    function load(url, push) {
+        container.classList.add('opacity-50');
+        fetch(url, {headers: {'X-Fragment': '1'}})
+            .then(response => {
+                if (!response.ok) throw new Error(response.status);
+                return response.text();
+            })
+            .then(html => {
+                container.innerHTML = html;
+                if (push) history.pushState({fragment: true}, '', url);
+            })
+            .catch(() => { window.location.href = url; })
+            .finally(() => container.classList.remove('opacity-50'));
+    }
+
+    container.addEventListener('click', function (e) {
+        const link = e.target.closest('a[href^="?"]');
+        if (!link || e.ctrlKey || e.metaKey || e.shiftKey) return;
+        e.preventDefault();
+        load(link.href, true);
+    });
+
+    document.querySelectorAll('form[data-fragment-filter]').forEach(form => {
+        form.addEventListener('submit', function (e) {
+            e.preventDefault();
+            const params = new URLSearchParams(new FormData(form));
+            load('?' + params.toString(), true);
+        });
+    });
+
+    window.addEventListener('popstate', () => load(window.location.href, false));
+})();
@@ -1,32 +1,72 @@
+import asyncio
 import json
+import shutil
+import tempfile
+import threading
+import zipfile
+import time
 from datetime import timedelta
 from decimal import Decimal
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest.mock import patch
 
 from django.contrib.auth.models import Group, User
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models.query import QuerySet
 from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
+import numpy as np
 
 from .models import (
 	Category,
+	DailySalesRollup,
+	HourlySalesBucket,
 	Order,
 	OrderItem,
 	Product,
+	ProductDailySales,
+	ProductSalesCounter,
 	Purchase,
 	PurchaseItem,
 	Return,
+	ReturnItem,
+	StockValuation,
 	Supplier,
 	WriteOff,
 	GROUP_CASHIER,
 	GROUP_MANAGER,
 )
 from .forms import SupplierForm, WriteOffForm
-from .services import OrderService, PurchaseService, ReceiptService
+from . import escpos
+from . import forecasting
+from .events import broadcaster, format_sse, publish_on_commit
+from . import jobs
+from . import labels
+from .pagination import KeysetPaginator
+from .pdf import FALLBACK_FONT, FONT_NAME, FONT_NAME_BOLD, receipt_styles, register_fonts
+from .reports import run_parallel
+from .utils import local_day_q, local_day_range
+from .services import (
+	DashboardService,
+	OrderService,
+	PurchaseService,
+	ReceiptService,
+	SalesCounterService,
+	StatsService,
+	StockValuationService,
+	SupplierService,
+)
 
 
 class BaseStoreTestCase(TestCase):
 	def setUp(self):
+		cache.clear()
 		# Roles used by the role_required decorator in views
 		self.cashiers_group, _ = Group.objects.get_or_create(name=GROUP_CASHIER)
 		self.managers_group, _ = Group.objects.get_or_create(name=GROUP_MANAGER)
@@ -52,6 +92,12 @@ class BaseStoreTestCase(TestCase):
 		defaults.update(kwargs)
 		return Product.objects.create(**defaults)
 
+	def stock_updates(self, queries):
+		"""UPDATE залишків серед захоплених запитів (лапки імен — як у поточній БД)."""
+		quote = connection.ops.quote_name
+		prefix = f"UPDATE {quote('store_product')} SET {quote('quantity')}"
+		return [q for q in queries if q["sql"].startswith(prefix)]
+
 
 class ModelValidationTests(BaseStoreTestCase):
 	def test_product_price_not_below_purchase_price(self):
@@ -117,6 +163,64 @@ class ServiceTests(BaseStoreTestCase):
 		self.assertEqual(len(created), 3)  # two purchases + skipped info
 		self.assertTrue(any(entry.get("skipped") for entry in created))
 
+	def test_purchase_creation_query_count_is_constant(self):
+		supplier_b = Supplier.objects.create(name="Beta")
+		products = [self.make_product(name=f"P{i}", supplier=self.supplier if i % 2 else supplier_b) for i in range(60)]
+		items = [{"product_id": p.id, "quantity": 3, "unit_cost": "2.00"} for p in products]
+		items.append({"product_id": products[0].id, "quantity": "1.5"})
+
+		with CaptureQueriesContext(connection) as queries:
+			created = PurchaseService.create_purchase_from_items(items, {str(self.supplier.id): "2026-01-05T09:30"})
+		# товари + (поставка + позиції) на кожного постачальника + savepoint
+		self.assertLessEqual(len(queries), 7)
+
+		purchases = {entry["supplier"]: entry for entry in created}
+		self.assertEqual(purchases[self.supplier.name]["items"], 30)
+		self.assertEqual(purchases[self.supplier.name]["total"], 180.0)
+		self.assertEqual(purchases["Пропущені товари"]["skipped"], ["P0"])
+		purchase = Purchase.objects.get(id=purchases[self.supplier.name]["id"])
+		self.assertEqual(purchase.total_cost, Decimal("180.00"))
+		self.assertEqual(timezone.localtime(purchase.expected_date).hour, 9)
+
+	def test_low_stock_flag_follows_reorder_point(self):
+		product = self.make_product(quantity=5, reorder_point=3)
+		self.assertFalse(product.is_low_stock)
+
+		OrderService.create_order_from_cart([{"product_id": product.id, "quantity": 2}])
+		self.assertEqual(list(Product.objects.filter(is_low_stock=True)), [product])
+
+		purchase = Purchase.objects.create(supplier=self.supplier, status=Purchase.Status.RECEIVED)
+		PurchaseItem.objects.create(purchase=purchase, product=product, quantity=10, unit_cost=Decimal("5.00"))
+		purchase.apply_to_stock_once()
+		product.refresh_from_db()
+		self.assertEqual((product.quantity, product.is_low_stock), (13, False))
+
+		product.reorder_point = 20
+		product.save(update_fields=["reorder_point"])
+		self.assertTrue(Product.objects.get(id=product.id).is_low_stock)
+
+	def test_supplier_stats_single_query(self):
+		supplier_b = Supplier.objects.create(name="Beta")
+		self.make_product(name="A", quantity=2, purchase_price=Decimal("5.00"))
+		self.make_product(name="B", quantity=10, purchase_price=Decimal("1.50"))
+		delivered = timezone.now() - timedelta(days=3)
+		Purchase.objects.create(supplier=self.supplier, status=Purchase.Status.RECEIVED, expected_date=delivered)
+		Purchase.objects.create(supplier=self.supplier, status=Purchase.Status.ORDERED)
+		Purchase.objects.create(supplier=self.supplier, status=Purchase.Status.DRAFT)
+
+		with CaptureQueriesContext(connection) as queries:
+			stats = {row["name"]: row for row in SupplierService.get_suppliers_with_stats()}
+		self.assertEqual(len(queries), 1)
+
+		acme = stats[self.supplier.name]
+		self.assertEqual(acme["products_count"], 2)
+		self.assertEqual(acme["low_stock_count"], 1)
+		self.assertEqual(acme["stock_value"], Decimal("25.00"))
+		self.assertEqual(acme["open_purchases_count"], 2)
+		self.assertEqual(acme["last_delivery_at"], delivered)
+		self.assertEqual((stats[supplier_b.name]["products_count"], stats[supplier_b.name]["open_purchases_count"]), (0, 0))
+		self.assertIsNone(stats[supplier_b.name]["last_delivery_at"])
+
 
 class ViewTests(BaseStoreTestCase):
 	def setUp(self):
@@ -148,6 +252,31 @@ class ViewTests(BaseStoreTestCase):
 		self.assertEqual(product.quantity, 2)
 		self.assertEqual(Order.objects.count(), 1)
 
+	def test_product_picker_filters_and_pages(self):
+		other = Supplier.objects.create(name="Other")
+		for i in range(35):
+			self.make_product(name=f"Milk {i}", quantity=i)
+		self.make_product(name="Loose", supplier=None, sku="LOOSE-1", quantity=100)
+		self.make_product(name="Foreign", supplier=other)
+		self.login_manager()
+		url = reverse("api_product_picker")
+
+		first = self.client.get(url, {"supplier": self.supplier.id}).json()
+		self.assertEqual(len(first["products"]), 30)
+		self.assertEqual([p["stock"] for p in first["products"][:3]], [0, 1, 2])
+		rest = self.client.get(url, {"supplier": self.supplier.id, "cursor": first["next_cursor"]}).json()
+		self.assertEqual(rest["products"][-1]["name"], "Loose")
+		self.assertIsNone(rest["next_cursor"])
+		self.assertNotIn("Foreign", [p["name"] for p in first["products"] + rest["products"]])
+
+		low = self.client.get(url, {"supplier": self.supplier.id, "low_stock": "1"}).json()
+		self.assertEqual(len(low["products"]), 6)
+		found = self.client.get(url, {"supplier": self.supplier.id, "q": "loose"}).json()
+		self.assertEqual([p["sku"] for p in found["products"]], ["LOOSE-1"])
+
+		page = self.client.get(reverse("suppliers_list"))
+		self.assertNotContains(page, "Milk 1")
+
 	def test_process_return_creates_records_and_restocks(self):
 		product = self.make_product(quantity=5, price=Decimal("10.00"), purchase_price=Decimal("4.00"))
 		order = Order.objects.create(total_price=Decimal("10.00"), total_profit=Decimal("6.00"))
@@ -169,6 +298,26 @@ class ViewTests(BaseStoreTestCase):
 		product.refresh_from_db()
 		self.assertEqual(product.quantity, 6)  # restocked by 1
 
+	def test_process_return_uses_fresh_low_stock_flag(self):
+		product = self.make_product(quantity=10, reorder_point=5)
+		order = Order.objects.create(total_price=Decimal("50.00"), total_profit=Decimal("25.00"))
+		OrderItem.objects.create(order=order, product=product, quantity=5, price=product.price, purchase_price=product.purchase_price)
+		create_return = Return.objects.create
+
+		def concurrent_sale(**kwargs):
+			# Поки оформлюється повернення, паралельний продаж опускає залишок нижче точки дозамовлення
+			OrderService.create_order_from_cart([{"product_id": product.id, "quantity": 9}])
+			return create_return(**kwargs)
+
+		self.login_cashier()
+		url = reverse("process_return", args=[order.id])
+		payload = {"reason": "other", "items": [{"product_id": product.id, "quantity": 5}]}
+		with patch.object(Return.objects, "create", side_effect=concurrent_sale):
+			response = self.client.post(url, data=json.dumps(payload), content_type="application/json")
+		self.assertEqual(response.status_code, 200)
+		product.refresh_from_db()
+		self.assertEqual((product.quantity, product.is_low_stock), (6, False))
+
 	def test_process_return_rejects_over_returning(self):
 		product = self.make_product(quantity=3)
 		order = Order.objects.create(total_price=Decimal("5.00"), total_profit=Decimal("2.00"))
@@ -209,6 +358,46 @@ class ViewTests(BaseStoreTestCase):
 		self.assertEqual(Purchase.objects.count(), 1)
 		self.assertEqual(PurchaseItem.objects.count(), 1)
 
+	def test_receive_purchases_posts_all_in_one_update(self):
+		apple = self.make_product(name="Apple", quantity=1, purchase_price=Decimal("4.00"))
+		pear = self.make_product(name="Pear", quantity=0, purchase_price=Decimal("4.00"))
+		purchases = [Purchase.objects.create(supplier=self.supplier, status="ordered") for _ in range(3)]
+		for purchase in purchases:
+			PurchaseItem.objects.bulk_create([
+				PurchaseItem(purchase=purchase, product=apple, quantity=2, unit_cost=Decimal("5.00")),
+				PurchaseItem(purchase=purchase, product=pear, quantity=3, unit_cost=Decimal("6.00")),
+			])
+		cancelled = Purchase.objects.create(supplier=self.supplier, status="cancelled")
+		ids = [p.id for p in purchases] + [cancelled.id, 999999]
+
+		self.login_manager()
+		url = reverse("receive_purchases")
+		with CaptureQueriesContext(connection) as queries:
+			response = self.client.post(url, data=json.dumps({"purchase_ids": ids}), content_type="application/json")
+		self.assertEqual(response.status_code, 200)
+		data = response.json()
+		self.assertEqual(data["received"], 3)
+		self.assertEqual(
+			[entry["result"] for entry in data["purchases"]],
+			["received"] * 3 + ["cancelled", "not_found"],
+		)
+		self.assertEqual(data["purchases"][0]["quantity"], 5)
+		self.assertEqual(data["purchases"][0]["total_cost"], 28.0)
+		self.assertEqual(len(self.stock_updates(queries)), 1)
+
+		self.assertEqual(Product.objects.get(id=apple.id).quantity, 7)
+		self.assertEqual(Product.objects.get(id=pear.id).quantity, 9)
+		self.assertEqual(
+			set(Purchase.objects.filter(id__in=ids[:3]).values_list("status", "received_applied", "total_cost")),
+			{("received", True, Decimal("28.00"))},
+		)
+		self.assertEqual(StockValuationService.verify(), [])
+
+		# Повторний прийом нічого не додає
+		again = self.client.post(url, data=json.dumps({"purchase_ids": ids[:1]}), content_type="application/json").json()
+		self.assertEqual(again["purchases"][0]["result"], "already_received")
+		self.assertEqual(Product.objects.get(id=apple.id).quantity, 7)
+
 	def test_writeoff_create_reduces_stock(self):
 		product = self.make_product(quantity=5)
 		self.login_manager()
@@ -224,6 +413,35 @@ class ViewTests(BaseStoreTestCase):
 		self.assertEqual(product.quantity, 3)
 		self.assertEqual(WriteOff.objects.count(), 1)
 
+	def test_writeoff_create_rechecks_stock_under_lock(self):
+		product = self.make_product(quantity=5)
+		form_save = WriteOffForm.save
+		sold = []
+
+		def concurrent_sale(form, *args, **kwargs):
+			# Форма вже перевірила залишок, а паралельний продаж встигає його зменшити
+			OrderService.create_order_from_cart([{"product_id": product.id, "quantity": sold.pop()}])
+			return form_save(form, *args, **kwargs)
+
+		self.login_manager()
+		url = reverse("writeoff_create")
+		payload = {"product": product.id, "quantity": 4, "reason": WriteOff.Reason.DAMAGE}
+		with patch.object(WriteOffForm, "save", autospec=True, side_effect=concurrent_sale):
+			sold.append(1)
+			self.assertEqual(self.client.post(url, data=payload).status_code, 302)
+			product.refresh_from_db()
+			self.assertEqual(product.quantity, 0)
+
+			product.quantity = 5
+			product.save()
+			sold.append(3)
+			response = self.client.post(url, data=payload)
+		self.assertEqual(response.status_code, 200)
+		self.assertIn("quantity", response.context["form"].errors)
+		product.refresh_from_db()
+		self.assertEqual((product.quantity, WriteOff.objects.count()), (2, 1))
+		self.assertEqual(StockValuationService.verify(), [])
+
 	def test_expired_products_view_lists_expired_and_soon(self):
 		today = timezone.localdate()
 		expired = self.make_product(name="Old", quantity=2, expiry_date=today - timedelta(days=1))
@@ -245,10 +463,24 @@ class ViewTests(BaseStoreTestCase):
 		self.login_manager()
 		response = self.client.get(reverse("stats_dashboard"))
 		self.assertEqual(response.status_code, 200)
-		ctx = response.context
-		self.assertGreaterEqual(ctx["total_orders"], 1)
-		self.assertGreater(ctx["total_sales"], 0)
-		self.assertGreaterEqual(ctx["returns_count"], 1)
+		self.assertIn("totals", response.context["sections"])
+
+		totals = self.client.get(reverse("api_dashboard_section", args=["totals"])).json()
+		self.assertGreaterEqual(totals["orders"], 1)
+		self.assertGreater(totals["sales"], 0)
+		returns = self.client.get(reverse("api_dashboard_section", args=["returns"])).json()
+		self.assertGreaterEqual(returns["count"], 1)
+
+	def test_dashboard_sections_are_cached_independently(self):
+		self.login_manager()
+		for name in DashboardService.sections():
+			response = self.client.get(reverse("api_dashboard_section", args=[name]))
+			self.assertEqual(response.status_code, 200, name)
+
+		Order.objects.create(total_price=Decimal("5.00"), total_profit=Decimal("1.00"))
+		with self.assertNumQueries(0):
+			DashboardService.get_section("totals")
+		self.assertEqual(self.client.get(reverse("api_dashboard_section", args=["nope"])).status_code, 404)
 
 	def test_api_charts_endpoints(self):
 		product = self.make_product(price=Decimal("8.00"), purchase_price=Decimal("3.00"))
@@ -259,6 +491,8 @@ class ViewTests(BaseStoreTestCase):
 		order.total_profit = product.price - product.purchase_price
 		order.save()
 
+		SalesCounterService.rebuild()
+
 		self.login_manager()
 		sales = self.client.get(reverse("api_sales_chart_data"))
 		self.assertEqual(sales.status_code, 200)
@@ -272,6 +506,424 @@ class ViewTests(BaseStoreTestCase):
 		self.assertEqual(profit.status_code, 200)
 
 
+	def test_api_chart_timeline_single_query_and_range(self):
+		Order.objects.create(total_price=Decimal("12.00"), total_profit=Decimal("4.00"))
+		Order.objects.create(total_price=Decimal("8.00"), total_profit=Decimal("2.00"))
+
+		self.login_manager()
+		url = reverse("api_chart_data")
+		with self.assertNumQueries(1):
+			data = StatsService.get_sales_timeline(days=90, period="day")
+		self.assertEqual(len(data["labels"]), 90)
+		self.assertEqual(data["sales"][-1], 20.0)
+		self.assertEqual(data["profit"][-1], 6.0)
+		self.assertEqual(data["orders"][-1], 2)
+
+		response = self.client.get(url + "?days=5000&period=month")
+		self.assertEqual(response.status_code, 200)
+		payload = response.json()
+		self.assertEqual(payload["days"], 365)
+		self.assertEqual(payload["period"], "month")
+		self.assertEqual(sum(payload["orders"]), 2)
+
+		weekly = self.client.get(url + "?days=1&period=week").json()
+		self.assertEqual(weekly["days"], 7)
+		self.assertEqual(sum(weekly["sales"]), 20.0)
+
+
+class RollupTests(BaseStoreTestCase):
+	def test_backfill_rollups_is_idempotent(self):
+		today = timezone.localdate()
+		yesterday = today - timedelta(days=1)
+		noon = local_day_range(yesterday)[0] + timedelta(hours=12)
+		product = self.make_product(quantity=10, price=Decimal("10.00"), purchase_price=Decimal("4.00"))
+		order = Order.objects.create(created_at=noon, total_price=Decimal("20.00"), total_profit=Decimal("12.00"))
+		OrderItem.objects.create(order=order, product=product, quantity=2, price=product.price, purchase_price=product.purchase_price)
+		writeoff = WriteOff.objects.create(product=product, quantity=1, reason=WriteOff.Reason.DAMAGE, purchase_price=Decimal("4.00"))
+		WriteOff.objects.filter(pk=writeoff.pk).update(created_at=noon)
+
+		call_command("backfill_rollups", workers=1, stdout=StringIO())
+		call_command("backfill_rollups", workers=1, stdout=StringIO())
+
+		row = DailySalesRollup.objects.get(date=yesterday)
+		self.assertEqual(row.orders_count, 1)
+		self.assertEqual(row.items_sold, 2)
+		self.assertEqual(row.sales, Decimal("20.00"))
+		self.assertEqual(row.writeoff_loss, Decimal("4.00"))
+		# Сьогоднішній рядок веде інкрементний облік, backfill його не перезаписує
+		self.assertEqual(DailySalesRollup.objects.filter(date__month=yesterday.month, date__year=yesterday.year).count(),
+			yesterday.day)
+		self.assertFalse(DailySalesRollup.objects.filter(date__gte=today).exists())
+
+	def test_sales_writeoffs_and_returns_update_todays_rollup(self):
+		product = self.make_product(quantity=10, price=Decimal("10.00"), purchase_price=Decimal("4.00"))
+		order = OrderService.create_order_from_cart([{"product_id": product.id, "quantity": 3}])
+
+		self.client.login(username="manager", password="pass")
+		self.client.post(reverse("writeoff_create"), {"product": product.id, "quantity": 2, "reason": WriteOff.Reason.DAMAGE})
+		payload = {"reason": "other", "items": [{"product_id": product.id, "quantity": 1}]}
+		response = self.client.post(reverse("process_return", args=[order.id]), data=json.dumps(payload), content_type="application/json")
+		self.assertEqual(response.status_code, 200)
+
+		row = DailySalesRollup.objects.get(date=timezone.localdate())
+		self.assertEqual((row.orders_count, row.items_sold, row.sales, row.profit), (1, 3, Decimal("30.00"), Decimal("18.00")))
+		self.assertEqual((row.writeoffs_count, row.writeoff_loss), (1, Decimal("8.00")))
+		self.assertEqual((row.returns_count, row.refund_total, row.return_loss), (1, Decimal("10.00"), Decimal("6.00")))
+
+	def test_dashboard_reads_closed_days_from_rollup(self):
+		yesterday = timezone.localdate() - timedelta(days=1)
+		DailySalesRollup.objects.create(date=yesterday, orders_count=3, sales=Decimal("100.00"), profit=Decimal("40.00"),
+			returns_count=1, refund_total=Decimal("5.00"))
+		Order.objects.create(total_price=Decimal("20.00"), total_profit=Decimal("6.00"))
+
+		totals = DashboardService._section_totals()
+		self.assertEqual((totals["orders"], totals["sales"], totals["profit"]), (4, 120.0, 46.0))
+		returns = DashboardService._section_returns()
+		self.assertEqual((returns["count"], returns["total_refund"], returns["today_count"]), (1, 5.0, 0))
+
+	def test_month_computed_before_its_end_is_recomputed(self):
+		today = timezone.localdate()
+		last_month = today.replace(day=1) - timedelta(days=1)
+		month_end = local_day_range(today.replace(day=1))[0]
+		call_command("backfill_rollups", workers=1, since=f"{last_month:%Y-%m}", stdout=StringIO())
+		# Минулий місяць пораховано ще до його кінця, а продаж з'явився вже після того запуску
+		DailySalesRollup.objects.filter(date__lte=last_month).update(updated_at=month_end - timedelta(hours=1))
+		Order.objects.create(created_at=month_end - timedelta(minutes=5), total_price=Decimal("7.00"), total_profit=Decimal("3.00"))
+
+		call_command("backfill_rollups", workers=1, since=f"{last_month:%Y-%m}", stdout=StringIO())
+		self.assertEqual(DailySalesRollup.objects.get(date=last_month).sales, Decimal("7.00"))
+
+		# Після перерахунку місяць готовий і більше не рахується
+		with patch("store.rollups.compute_month", return_value=(today.year, today.month, [])) as compute:
+			call_command("backfill_rollups", workers=1, since=f"{last_month:%Y-%m}", stdout=StringIO())
+		self.assertEqual([call.args for call in compute.call_args_list], [(today.year, today.month)])
+
+
+class ReportExecutionTests(BaseStoreTestCase):
+	def test_run_parallel_serial_on_sqlite(self):
+		self.make_product(quantity=3)
+		results = run_parallel({
+			"products": Product.objects.all(),
+			"count": lambda: Product.objects.count(),
+		})
+		self.assertEqual(len(results["products"]), 1)
+		self.assertEqual(results["count"], 1)
+
+	def test_run_parallel_uses_worker_threads(self):
+		with patch("store.reports.can_run_parallel", return_value=True):
+			results = run_parallel({
+				"a": lambda: threading.current_thread().name,
+				"b": lambda: threading.current_thread().name,
+			})
+		self.assertTrue(all(name.startswith("report") for name in results.values()))
+
+	def test_dashboard_get_sections_fills_cache(self):
+		data = DashboardService.get_sections(["stock", "purchases"])
+		self.assertEqual(set(data), {"stock", "purchases"})
+		with self.assertNumQueries(0):
+			DashboardService.get_sections(["stock", "purchases"])
+
+	def test_scheduler_warms_jobs_and_stale_values_are_revalidated(self):
+		# Кеш тестів — LocMemCache: без спільного кешу планувальник не запускається
+		with self.assertRaises(CommandError):
+			call_command("run_report_scheduler", "--once", stdout=StringIO())
+
+		out = StringIO()
+		with patch("store.jobs.is_shared_cache", return_value=True):
+			call_command("run_report_scheduler", "--once", "--only", "supplier_stats", "dashboard:stock", stdout=out)
+		self.assertIn("supplier_stats", out.getvalue())
+		self.assertEqual(jobs.stats("supplier_stats")["runs"], 1)
+		self.assertIn("last_success", jobs.stats("dashboard:stock"))
+
+		with self.assertNumQueries(0):
+			self.assertEqual(jobs.read("supplier_stats")[0]["name"], self.supplier.name)
+
+		Supplier.objects.create(name="Another supplier")
+		# Планувальник "відстав": значення застаріле, читання запускає перерахунок
+		with patch("store.jobs.time.time", return_value=time.time() + 3600), \
+				patch("store.jobs.can_run_parallel", return_value=True), \
+				patch("store.jobs.run_in_background") as background:
+			stale = jobs.read("supplier_stats")
+		self.assertEqual(len(stale), 1)
+		background.call_args.args[0]()
+		self.assertEqual(len(jobs.read("supplier_stats")), 2)
+		self.assertEqual(jobs.stats("supplier_stats")["runs"], 2)
+
+
+class SalesCounterTests(BaseStoreTestCase):
+	def test_counters_follow_checkout_and_return(self):
+		product = self.make_product(quantity=10, price=Decimal("10.00"), purchase_price=Decimal("4.00"))
+		order = OrderService.create_order_from_cart([{"product_id": product.id, "quantity": 3}])
+
+		counter = ProductSalesCounter.objects.get(product=product)
+		self.assertEqual(counter.qty_sold, 3)
+		self.assertEqual(counter.revenue, Decimal("30.00"))
+
+		self.client.login(username="cashier", password="pass")
+		payload = {"reason": "other", "items": [{"product_id": product.id, "quantity": 1}]}
+		self.client.post(reverse("process_return", args=[order.id]), data=json.dumps(payload), content_type="application/json")
+
+		counter.refresh_from_db()
+		self.assertEqual(counter.qty_sold, 2)
+		self.assertEqual(SalesCounterService.top_categories(), [{"name": "Food", "qty": 2, "revenue": 20.0}])
+		self.assertEqual(SalesCounterService.top_products(days=7)[0]["qty"], 2)
+
+	def test_rebuild_matches_incremental_counters(self):
+		product = self.make_product(quantity=10)
+		OrderService.create_order_from_cart([{"product_id": product.id, "quantity": 2}])
+		before = SalesCounterService.top_products()
+
+		SalesCounterService.rebuild()
+		self.assertEqual(SalesCounterService.top_products(), before)
+		self.assertEqual(ProductDailySales.objects.count(), 1)
+
+	def test_heatmap_reads_hourly_buckets(self):
+		product = self.make_product(quantity=10, price=Decimal("10.00"), purchase_price=Decimal("4.00"))
+		order = OrderService.create_order_from_cart([{"product_id": product.id, "quantity": 2}])
+		OrderService.create_order_from_cart([{"product_id": product.id, "quantity": 1}])
+		local = timezone.localtime(order.created_at)
+		self.assertEqual(HourlySalesBucket.objects.get(date=local.date(), hour=local.hour).orders_count, 2)
+
+		self.client.login(username="manager", password="pass")
+		data = self.client.get(reverse("api_sales_heatmap")).json()
+		day = local.isoweekday() - 1
+		self.assertEqual(data["orders"][day][local.hour], 2)
+		self.assertEqual(data["revenue"][day][local.hour], 30.0)
+		self.assertEqual(data["avg_check"][day][local.hour], 15.0)
+
+		SalesCounterService.rebuild()
+		self.assertEqual(HourlySalesBucket.objects.get().sales, Decimal("30.00"))
+
+
+class StockValuationTests(BaseStoreTestCase):
+	def test_valuation_follows_every_stock_change(self):
+		product = self.make_product(quantity=10, price=Decimal("10.00"), purchase_price=Decimal("4.00"))
+		self.assertEqual(StockValuationService.total_value(), Decimal("40.00"))
+
+		order = OrderService.create_order_from_cart([{"product_id": product.id, "quantity": 2}])
+		self.assertEqual(StockValuationService.total_value(), Decimal("32.00"))
+
+		self.client.login(username="cashier", password="pass")
+		payload = {"reason": "other", "items": [{"product_id": product.id, "quantity": 1}]}
+		self.client.post(reverse("process_return", args=[order.id]), data=json.dumps(payload), content_type="application/json")
+		self.assertEqual(StockValuationService.total_value(), Decimal("36.00"))
+
+		product.refresh_from_db()
+		product.purchase_price = Decimal("5.00")
+		product.expiry_date = timezone.localdate()
+		product.save()
+		self.assertEqual(StockValuationService.total_value(), Decimal("45.00"))
+		self.assertEqual(StockValuationService.expiry_value(date_to=timezone.localdate()), Decimal("45.00"))
+
+		purchase = Purchase.objects.create(supplier=self.supplier, status="received")
+		PurchaseItem.objects.create(purchase=purchase, product=product, quantity=2, unit_cost=Decimal("5.00"))
+		purchase.apply_to_stock_once()
+		self.assertEqual(StockValuationService.total_value(), Decimal("55.00"))
+		self.assertEqual(StockValuationService.verify(), [])
+
+		self.assertEqual(StockValuationService.by_category()[0]["value"], Decimal("55.00"))
+
+		spare = self.make_product(name="Spare", quantity=1, purchase_price=Decimal("3.00"))
+		spare.delete()
+		self.assertEqual(StockValuationService.total_value(), Decimal("55.00"))
+
+	def test_purchase_posting_is_single_statement_and_idempotent(self):
+		products = [self.make_product(name=f"P{i}", quantity=1, purchase_price=Decimal("4.00")) for i in range(20)]
+		purchase = Purchase.objects.create(supplier=self.supplier, status="received")
+		PurchaseItem.objects.bulk_create(
+			[PurchaseItem(purchase=purchase, product=p, quantity=5, unit_cost=Decimal("6.00")) for p in products]
+			+ [PurchaseItem(purchase=purchase, product=products[0], quantity=1, unit_cost=Decimal("7.00"))]
+		)
+
+		with CaptureQueriesContext(connection) as queries:
+			self.assertTrue(purchase.apply_to_stock_once(update_purchase_price=True))
+		self.assertEqual(len(self.stock_updates(queries)), 1)
+
+		# Повторне збереження (інший адміністратор зі старою копією) нічого не проводить
+		stale = Purchase.objects.get(id=purchase.id)
+		stale.received_applied = False
+		self.assertFalse(stale.apply_to_stock_once())
+
+		first = Product.objects.get(id=products[0].id)
+		self.assertEqual((first.quantity, first.purchase_price), (7, Decimal("7.00")))
+		self.assertEqual(Product.objects.get(id=products[1].id).purchase_price, Decimal("6.00"))
+		self.assertEqual(StockValuationService.verify(), [])
+
+	def test_concurrent_first_writes_without_expiry_share_one_row(self):
+		StockValuation.apply(self.category.id, None, 1, Decimal("2.00"))
+		update = QuerySet.update
+		stale = []
+
+		def first_update_misses_row(queryset, **kwargs):
+			# Другий запис почався до коміту першого: його перший UPDATE рядка ще не бачить
+			if not stale:
+				stale.append(True)
+				return 0
+			return update(queryset, **kwargs)
+
+		with patch.object(QuerySet, "update", first_update_misses_row):
+			StockValuation.apply(self.category.id, None, 3, Decimal("6.00"))
+		rows = list(StockValuation.objects.filter(category=self.category, expiry_date=None).values_list("quantity", "value"))
+		self.assertEqual(rows, [(4, Decimal("8.00"))])
+
+	def test_verify_detects_and_fixes_drift(self):
+		self.make_product(quantity=3, purchase_price=Decimal("2.00"))
+		Product.objects.update(quantity=5)  # обхід Product.save
+		self.assertEqual(len(StockValuationService.verify()), 1)
+		StockValuationService.verify(fix=True)
+		self.assertEqual(StockValuationService.total_value(), Decimal("10.00"))
+		self.assertEqual(StockValuationService.verify(), [])
+
+
+class EventStreamTests(BaseStoreTestCase):
+	def test_sale_events_published_after_commit(self):
+		product = self.make_product(quantity=6)
+		with self.captureOnCommitCallbacks() as callbacks:
+			order = OrderService.create_order_from_cart([{"product_id": product.id, "quantity": 2}])
+
+		# Крім подій, після коміту виконуються й інші колбеки (версії фрагментів)
+		published = [callback for callback in callbacks
+			if callback.__qualname__.startswith(publish_on_commit.__qualname__ + ".")]
+
+		async def collect():
+			queue = broadcaster.subscribe()
+			try:
+				for callback in published:
+					callback()
+				return [await asyncio.wait_for(queue.get(), 1) for _ in published]
+			finally:
+				broadcaster.unsubscribe(queue)
+
+		events = asyncio.run(collect())
+		self.assertEqual([event[1] for event in events], ["stock", "order"])
+		self.assertEqual(events[0][2]["qty"], 4)
+		self.assertEqual(events[0][2]["crossed"], "low")
+		self.assertEqual(events[1][2]["id"], order.id)
+		self.assertIn("event: order", format_sse(events[1]))
+		# Маржа — лише в потоці менеджера
+		self.assertIn('"profit"', format_sse(events[1]))
+		self.assertNotIn('"profit"', format_sse(events[1], manager=False))
+
+		async def replay():
+			queue = broadcaster.subscribe(last_event_id=events[0][0])
+			broadcaster.unsubscribe(queue)
+			return queue.get_nowait()
+
+		self.assertEqual(asyncio.run(replay())[0], events[1][0])
+
+	def test_stream_requires_login(self):
+		response = self.client.get(reverse("event_stream"))
+		self.assertEqual(response.status_code, 403)
+
+
+class KeysetPaginationTests(BaseStoreTestCase):
+	def test_walks_forward_and_back_across_ties(self):
+		for total in ["5.00", "7.00", "7.00", "7.00", "9.00", "1.00", "7.00"]:
+			Order.objects.create(total_price=Decimal(total))
+		expected = list(Order.objects.order_by("-total_price", "-id").values_list("id", flat=True))
+		paginator = KeysetPaginator(Order.objects.all(), "total_price", descending=True, page_size=3)
+
+		pages = [paginator.get_page()]
+		while pages[-1].has_next:
+			pages.append(paginator.get_page(pages[-1].next_cursor))
+		self.assertEqual([o.id for page in pages for o in page], expected)
+		self.assertEqual([len(page) for page in pages], [3, 3, 1])
+		self.assertFalse(pages[0].has_previous)
+		self.assertEqual((pages[0].count, pages[0].count_is_exact), (7, True))
+
+		back = paginator.get_page(pages[-1].previous_cursor)
+		self.assertEqual([o.id for o in back], [o.id for o in pages[1]])
+		self.assertTrue(back.has_next)
+		self.assertEqual([o.id for o in paginator.get_page(back.previous_cursor)], [o.id for o in pages[0]])
+
+	def test_products_list_pages_by_nullable_sku(self):
+		for i in range(60):
+			self.make_product(name=f"P{i:02d}", sku=None if i % 2 else f"S{i:02d}")
+		self.client.login(username="manager", password="pass")
+		first = self.client.get(reverse("manager_products_list") + "?sort=sku").context["products"]
+		second = self.client.get(reverse("manager_products_list") + f"?sort=sku&cursor={first.next_cursor}").context["products"]
+		self.assertEqual((len(first), len(second)), (50, 10))
+		self.assertFalse(second.has_next)
+		self.assertEqual(len({p.id for p in first} | {p.id for p in second}), 60)
+		self.assertIn("sort=sku", second.base_query)
+
+
+class FragmentTests(BaseStoreTestCase):
+	def test_products_fragment_is_cached_until_catalog_changes(self):
+		product = self.make_product(name="Cached apple")
+		self.client.login(username="manager", password="pass")
+		url = reverse("manager_products_list") + "?sort=quantity"
+
+		first = self.client.get(url, HTTP_X_FRAGMENT="1")
+		self.assertContains(first, "Cached apple")
+		self.assertNotContains(first, "Усі категорії")
+
+		with CaptureQueriesContext(connection) as cached:
+			self.client.get(url, HTTP_X_FRAGMENT="1")
+		self.assertFalse(any("store_product" in q["sql"] for q in cached.captured_queries))
+
+		with self.captureOnCommitCallbacks(execute=True):
+			product.name = "Renamed apple"
+			product.save()
+		self.assertContains(self.client.get(url, HTTP_X_FRAGMENT="1"), "Renamed apple")
+
+	def test_receipts_page_embeds_fragment(self):
+		Order.objects.create(total_price=Decimal("12.34"))
+		self.client.login(username="manager", password="pass")
+		response = self.client.get(reverse("manager_receipts_list"))
+		self.assertContains(response, "12,34")
+		self.assertContains(response, "data-fragment-list")
+
+
+class DateRangeTests(BaseStoreTestCase):
+	def test_local_day_range_is_half_open_kyiv_midnight(self):
+		day = timezone.localdate()
+		start, end = local_day_range(day, day)
+		self.assertEqual(timezone.localtime(start).date(), day)
+		self.assertEqual(timezone.localtime(start).hour, 0)
+		self.assertEqual(end - start, timedelta(days=1))
+		self.assertEqual(local_day_range(None, None), (None, None))
+		with self.assertRaises(ValueError):
+			local_day_range("not-a-date")
+
+	def test_day_filter_respects_local_midnight(self):
+		day = timezone.localdate()
+		start, end = local_day_range(day, day)
+		inside = Order.objects.create(created_at=start)
+		Order.objects.create(created_at=start - timedelta(seconds=1))
+		Order.objects.create(created_at=end)
+		self.assertEqual(list(Order.objects.filter(local_day_q("created_at", day))), [inside])
+
+	def test_receipts_list_ignores_invalid_dates(self):
+		Order.objects.create(total_price=Decimal("1.00"))
+		self.client.login(username="cashier", password="pass")
+		response = self.client.get(reverse("receipts_list_cashier") + "?date_from=bad&date_to=")
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual(len(response.context["orders"]), 1)
+
+	def test_receipts_list_query_count_does_not_grow_with_orders(self):
+		product = self.make_product(quantity=100)
+		self.client.login(username="cashier", password="pass")
+
+		def add_order_with_return():
+			order = OrderService.create_order_from_cart([{"product_id": product.id, "quantity": 3}])
+			ret = Return.objects.create(order=order, processed_by=self.cashier)
+			ReturnItem.objects.create(return_instance=ret, product=product, quantity=2, unit_price=product.price, purchase_price=product.purchase_price)
+			return order
+
+		add_order_with_return()
+		with CaptureQueriesContext(connection) as small:
+			self.client.get(reverse("receipts_list_cashier"))
+		for _ in range(4):
+			add_order_with_return()
+		with CaptureQueriesContext(connection) as large:
+			response = self.client.get(reverse("receipts_list_cashier"))
+
+		self.assertEqual(len(small), len(large))
+		first = response.context["orders"][0]
+		self.assertTrue(first.has_returns)
+		self.assertEqual((first.items_count, first.total_returned), (1, 2))
+
 class ReceiptServiceTests(BaseStoreTestCase):
 	def test_generate_receipt_html_contains_totals(self):
 		product = self.make_product(quantity=2, price=Decimal("9.00"), purchase_price=Decimal("4.00"))
@@ -283,6 +935,235 @@ class ReceiptServiceTests(BaseStoreTestCase):
 		self.assertIn(f"Чек №{order.id}", html)
 		self.assertIn("18.00", html)
 
+	def test_rendered_receipts_are_reused(self):
+		product = self.make_product(quantity=2)
+		order = OrderService.create_order_from_cart([{"product_id": product.id, "quantity": 1}])
+
+		self.assertEqual(ReceiptService.get_receipt_html(order.id)["total"], 10.0)
+		# Кеш-хіт — лише перевірка, що чек не видалено
+		with self.assertNumQueries(1):
+			ReceiptService.get_receipt_html(order.id)
+
+		with tempfile.TemporaryDirectory() as media, self.settings(MEDIA_ROOT=media):
+			path = ReceiptService.get_receipt_pdf_path(order.id)
+			self.assertTrue(path.read_bytes().startswith(b"%PDF"))
+			# Кириличний TTF вбудовано у файл (а не Helvetica без кирилиці)
+			if register_fonts()[0] == FONT_NAME:
+				self.assertIn(b"FontFile2", path.read_bytes())
+			with self.assertNumQueries(1):
+				self.assertEqual(ReceiptService.get_receipt_pdf_path(order.id), path)
+
+			# Без індексу рендер повторюється, але вміст (і адреса) той самий
+			shutil.rmtree(Path(media) / "receipts" / "by-order")
+			self.assertEqual(ReceiptService.get_receipt_pdf_path(order.id), path)
+
+			self.client.login(username="cashier", password="pass")
+			response = self.client.get(reverse("receipt_download_pdf", args=[order.id]))
+			self.assertEqual(b"".join(response.streaming_content), path.read_bytes())
+
+	def test_deleted_receipt_is_not_served_from_cache(self):
+		product = self.make_product(quantity=2)
+		order = OrderService.create_order_from_cart([{"product_id": product.id, "quantity": 1}])
+		with tempfile.TemporaryDirectory() as media, self.settings(MEDIA_ROOT=media):
+			ReceiptService.get_receipt_html(order.id)
+			ReceiptService.get_receipt_pdf_path(order.id)
+			index = Path(media) / "receipts" / "by-order" / f"v{ReceiptService.RENDER_VERSION}" / str(order.id)
+			self.assertTrue(index.exists())
+
+			with self.captureOnCommitCallbacks(execute=True):
+				Order.objects.get(id=order.id).delete()
+			self.assertFalse(index.exists())
+			with self.assertRaises(Order.DoesNotExist):
+				ReceiptService.get_receipt_html(order.id)
+
+			# Масове видалення оминає Order.delete — кеш лишається, але не віддається
+			other = OrderService.create_order_from_cart([{"product_id": product.id, "quantity": 1}])
+			ReceiptService.get_receipt_pdf_path(other.id)
+			Order.objects.filter(id=other.id).delete()
+			self.client.login(username="cashier", password="pass")
+			self.assertEqual(self.client.get(reverse("receipt_download_pdf", args=[other.id])).status_code, 404)
+
+
+class PdfFontTests(BaseStoreTestCase):
+	def setUp(self):
+		super().setUp()
+		register_fonts.cache_clear()
+		receipt_styles.cache_clear()
+		# Після тесту реєстр знову знайде справжній шрифт
+		self.addCleanup(register_fonts.cache_clear)
+		self.addCleanup(receipt_styles.cache_clear)
+
+	def test_cyrillic_font_registered_once_per_process(self):
+		with self.settings(PDF_FONT_PATH=__file__), patch("store.pdf.TTFont"), \
+				patch("store.pdf.pdfmetrics.registerFont") as register:
+			self.assertEqual(register_fonts(), (FONT_NAME, FONT_NAME_BOLD))
+			register_fonts()
+			styles = receipt_styles()
+			self.assertIs(receipt_styles(), styles)
+		# Звичайний і жирний — по одному разу
+		self.assertEqual(register.call_count, 2)
+		self.assertEqual((styles.normal.fontName, styles.title.fontName), (FONT_NAME, FONT_NAME_BOLD))
+
+	def test_falls_back_to_helvetica_without_font(self):
+		with patch("store.pdf._candidates", return_value=[("/nonexistent/DejaVuSans.ttf", None)]), \
+				self.assertLogs("store.pdf", "WARNING"):
+			self.assertEqual(receipt_styles().font, FALLBACK_FONT)
+
+
+class EscPosTests(BaseStoreTestCase):
+	def test_receipt_bytes_layout_and_codepage(self):
+		product = self.make_product(name="Хліб український", quantity=5, price=Decimal("25.50"))
+		order = OrderService.create_order_from_cart([{"product_id": product.id, "quantity": 2}])
+
+		data = ReceiptService.get_receipt_escpos(order.id)
+		self.assertTrue(data.startswith(escpos.INIT + b"\x1bt\x2e"))
+		self.assertTrue(data.endswith(escpos.FEED_AND_CUT))
+		self.assertIn("Хліб український".encode("cp1251"), data)
+		total_line = next(line for line in data.split(b"\n") if "РАЗОМ".encode("cp1251") in line)
+		self.assertTrue(total_line.endswith("51.00 грн".encode("cp1251")))
+		self.assertLess(len(data), 1024)
+
+		legacy = escpos.render_receipt(order, order.items.all(), codepage="cp866")
+		self.assertIn("Хлiб український".encode("cp866"), legacy)
+
+		self.client.login(username="cashier", password="pass")
+		response = self.client.get(reverse("receipt_download_escpos", args=[order.id]))
+		self.assertEqual(response.content, data)
+		self.assertEqual(self.client.get(reverse("receipt_download_escpos", args=[order.id + 100])).status_code, 404)
+
+
+class ReceiptExportTests(BaseStoreTestCase):
+	def test_export_day_as_zip_and_pdf(self):
+		product = self.make_product(quantity=10)
+		orders = [OrderService.create_order_from_cart([{"product_id": product.id, "quantity": 1}]) for _ in range(3)]
+		day = timezone.localdate().isoformat()
+
+		with tempfile.TemporaryDirectory() as media, self.settings(MEDIA_ROOT=media):
+			out = Path(media) / "day.zip"
+			call_command("export_receipts", day, "--workers", "1", "--output", str(out), stdout=StringIO())
+			with zipfile.ZipFile(out) as archive:
+				self.assertEqual(archive.namelist(), [f"receipt_{o.id}.pdf" for o in orders])
+				self.assertTrue(archive.read(f"receipt_{orders[0].id}.pdf").startswith(b"%PDF"))
+
+			pdf = Path(media) / "day.pdf"
+			call_command("export_receipts", day, "--format", "pdf", "--output", str(pdf), stdout=StringIO())
+			self.assertEqual(pdf.read_bytes().count(b"/Type /Page\n"), 3)
+
+			self.client.login(username="manager", password="pass")
+			response = self.client.get(reverse("manager_receipts_export") + f"?date_from={day}")
+			with zipfile.ZipFile(BytesIO(b"".join(response.streaming_content))) as archive:
+				self.assertEqual(len(archive.namelist()), 3)
+
+	def test_large_period_is_exported_in_background(self):
+		product = self.make_product(quantity=10)
+		for _ in range(3):
+			OrderService.create_order_from_cart([{"product_id": product.id, "quantity": 1}])
+		day = timezone.localdate().isoformat()
+		self.client.login(username="manager", password="pass")
+
+		with tempfile.TemporaryDirectory() as media, self.settings(MEDIA_ROOT=media), \
+				patch("store.views.RECEIPT_EXPORT_INLINE_MAX", 2), \
+				patch("store.exports.subprocess.Popen") as popen:
+			response = self.client.get(reverse("manager_receipts_export") + f"?date_from={day}")
+			name = response.url.rstrip("/").rsplit("/", 1)[-1]
+			command = popen.call_args.args[0]
+			self.assertEqual(command[2:5], ["export_receipts", day, day])
+			output = Path(command[-1])
+			self.assertEqual(output.name, name)
+
+			self.assertEqual(self.client.get(response.url).status_code, 202)
+			# Те, що зробив би фоновий процес
+			call_command(*command[2:], "--workers", "1", stdout=StringIO())
+			download = self.client.get(response.url)
+			self.assertEqual(download.status_code, 200)
+			with zipfile.ZipFile(BytesIO(b"".join(download.streaming_content))) as archive:
+				self.assertEqual(len(archive.namelist()), 3)
+
+			self.assertEqual(self.client.get(reverse("manager_export", args=["settings.py"])).status_code, 404)
+
+	def test_export_rejects_bad_period(self):
+		self.client.login(username="manager", password="pass")
+		response = self.client.get(reverse("manager_receipts_export") + "?date_from=2025-01-01&date_to=2025-03-01")
+		self.assertEqual(response.status_code, 400)
+
+
+class LabelTests(BaseStoreTestCase):
+	def test_unit_price(self):
+		product = self.make_product(price=Decimal("45.00"), weight_value=Decimal("500"), weight_unit="g")
+		self.assertEqual(product.unit_price(), (Decimal("90.00"), "кг"))
+		self.assertIsNone(self.make_product(weight_value=None).unit_price())
+
+	def test_non_ascii_sku_gets_no_barcode(self):
+		self.assertTrue(labels.can_encode("4820000000017"))
+		self.assertFalse(labels.can_encode("АБВ-12"))
+		product = self.make_product(sku="АБВ-12")
+		with patch.object(labels, "_barcode") as barcode:
+			self.assertTrue(labels.render_part([product.id]).startswith(b"%PDF"))
+		barcode.assert_not_called()
+
+	def test_filters_and_sheets(self):
+		other = Category.objects.create(name="Other")
+		products = [self.make_product(name=f"Item {i:02d}", sku=f"48200{i:08d}") for i in range(labels.LABELS_PER_SHEET + 1)]
+		self.make_product(name="Elsewhere", category=other)
+		Product.objects.filter(id=products[0].id).update(updated_at=timezone.now() - timedelta(days=10))
+
+		ids = labels.product_ids(category_id=self.category.id)
+		self.assertEqual(ids, [p.id for p in products])
+		since = labels.product_ids(category_id=self.category.id, changed_since=timezone.localdate() - timedelta(days=1))
+		self.assertNotIn(products[0].id, since)
+
+		pdf = labels.render_part(ids)
+		self.assertEqual(pdf.count(b"/Type /Page\n"), 2)
+		# Однаковий набір -> однаковий PDF
+		self.assertEqual(pdf, labels.render_part(ids))
+
+		# Більше однієї частини — фонова команда print_labels замість рендеру в запиті
+		with tempfile.TemporaryDirectory() as media, self.settings(MEDIA_ROOT=media), \
+				patch.object(labels, "PART_SIZE", labels.LABELS_PER_SHEET), \
+				patch("store.exports.subprocess.Popen") as popen:
+			self.client.login(username="manager", password="pass")
+			response = self.client.get(reverse("manager_labels") + f"?category={self.category.id}")
+			self.assertRedirects(response, response.url, target_status_code=202)
+			command = popen.call_args.args[0]
+			self.assertEqual(command[2:7], ["print_labels", "--format", "zip", "--category", str(self.category.id)])
+
+			call_command(*command[2:], "--workers", "1", stdout=StringIO())
+			download = self.client.get(response.url)
+			with zipfile.ZipFile(BytesIO(b"".join(download.streaming_content))) as archive:
+				self.assertEqual(archive.namelist(), ["labels_001.pdf", "labels_002.pdf"])
+
+
+class ForecastingTests(BaseStoreTestCase):
+	def test_fit_learns_weekly_pattern(self):
+		week = np.array([1, 1, 1, 1, 1, 8, 8], dtype=float)
+		sales = np.vstack([np.tile(week, 12), np.zeros(84)])
+		level, season, sigma = forecasting.fit(sales)
+		predicted = forecasting.forecast(level, season, 7, offset=84)
+		np.testing.assert_allclose(predicted[0], week, atol=0.5)
+		self.assertEqual(predicted[1].sum(), 0)
+
+	def test_reorder_suggestions_feed_purchases(self):
+		today = timezone.localdate()
+		selling = self.make_product(name="Milk", quantity=1, purchase_price=Decimal("20.00"))
+		self.make_product(name="Idle", quantity=0)
+		ProductDailySales.objects.bulk_create([
+			ProductDailySales(product=selling, category=self.category, date=today - timedelta(days=d), qty_sold=4, revenue=40)
+			for d in range(1, 85)
+		])
+		purchase = Purchase.objects.create(supplier=self.supplier, status=Purchase.Status.ORDERED)
+		PurchaseItem.objects.create(purchase=purchase, product=selling, quantity=5, unit_cost=Decimal("20.00"))
+
+		with self.settings(REORDER_LEAD_TIME_DAYS=3, REORDER_REVIEW_DAYS=7):
+			[group] = forecasting.reorder_suggestions()
+			self.assertEqual(group["supplier_id"], self.supplier.id)
+			[item] = group["items"]
+			# 10 днів по 4 шт. мінус залишок і вже замовлене
+			self.assertEqual((item["reorder_point"], item["quantity"]), (12, 34))
+
+			created = PurchaseService.create_reorder_purchases()
+		self.assertEqual(created[0]["total"], 680.0)
+		self.assertEqual(PurchaseItem.objects.filter(purchase_id=created[0]["id"]).get().quantity, 34)
+
 
 class FormTests(BaseStoreTestCase):
 	def test_supplier_form_unique_name(self):
@@ -8,9 +8,14 @@ urlpatterns = [
     path('manager/', RedirectView.as_view(pattern_name='manager_dashboard', permanent=False)),
     path('manager/dashboard/', views.manager_dashboard, name='manager_dashboard'),
     path('manager/receipts/', views.manager_receipts_list, name='manager_receipts_list'),
+    path('manager/receipts/export/', views.manager_receipts_export, name='manager_receipts_export'),
+    path('manager/exports/<str:name>/', views.manager_export, name='manager_export'),
     path('manager/products/', views.manager_products_list, name='manager_products_list'),
+    path('manager/products/labels/', views.manager_labels, name='manager_labels'),
     path('manager/suppliers/', views.suppliers_list, name='suppliers_list'),
     path('manager/stats/', views.stats_dashboard, name='stats_dashboard'),
+    path('api/stats/<slug:section>/', views.api_dashboard_section, name='api_dashboard_section'),
+    path('api/events/', views.event_stream, name='event_stream'),
     
     # Списання
     path('manager/writeoffs/', views.writeoffs_list, name='writeoffs_list'),
@@ -22,8 +27,13 @@ urlpatterns = [
     # API для пошуку
     path('api/search/', views.search_products, name='search_products'),
     path('api/purchases/draft/', views.create_purchase_draft, name='create_purchase_draft'),
+    path('api/purchases/receive/', views.receive_purchases, name='receive_purchases'),
+    path('api/products/picker/', views.api_product_picker, name='api_product_picker'),
+    path('api/purchases/suggestions/', views.api_reorder_suggestions, name='api_reorder_suggestions'),
     
     # API для графіків статистики
+    path('api/charts/timeline/', views.api_chart_data, name='api_chart_data'),
+    path('api/charts/heatmap/', views.api_sales_heatmap, name='api_sales_heatmap'),
     path('api/charts/sales/', views.api_sales_chart_data, name='api_sales_chart_data'),
     path('api/charts/categories/', views.api_category_chart_data, name='api_category_chart_data'),
     path('api/charts/profit/', views.api_profit_chart_data, name='api_profit_chart_data'),
@@ -39,6 +49,7 @@ urlpatterns = [
     # Чеки (Receipts)
     path('receipt/<int:order_id>/details/', views.receipt_details, name='receipt_details'),
     path('receipt/<int:order_id>/download-pdf/', views.receipt_download_pdf, name='receipt_download_pdf'),
+    path('receipt/<int:order_id>/escpos/', views.receipt_download_escpos, name='receipt_download_escpos'),
     
     # Чеки для касира (перегляд та повернення)
     path('receipts/', views.receipts_list_cashier, name='receipts_list_cashier'),
@@ -1,5 +1,8 @@
+from datetime import date, datetime, time, timedelta
 from functools import wraps
 from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
 from django.shortcuts import redirect
 from django.urls import reverse
 from .models import GROUP_CASHIER, GROUP_MANAGER
@@ -63,3 +66,57 @@ def role_required(required_role_level, allow_higher=True):
         return _wrapped_view
 
     return decorator
+
+
+
+# === ДІАПАЗОНИ ДАТ ===
+# Фільтри виду created_at__date=... з USE_TZ перетворюються на CONVERT_TZ/DATE() по кожному
+# рядку і не використовують індекс. Натомість будуємо напіввідкриті діапазони [start, end)
+# за локальною північчю (Europe/Kyiv), які БД виконує як index range scan.
+
+def _as_date(value):
+    if value is None or value == '':
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value), '%Y-%m-%d').date()
+
+
+def local_midnight(day):
+    """Початок локального дня як aware datetime."""
+    return timezone.make_aware(datetime.combine(day, time.min), timezone.get_default_timezone())
+
+
+def local_day_range(date_from, date_to=None):
+    """
+    Напіввідкритий діапазон [start, end) для локальних днів date_from..date_to включно.
+
+    Args:
+        date_from / date_to: date, datetime або рядок 'YYYY-MM-DD'; None — без межі
+
+    Raises:
+        ValueError - рядок не у форматі YYYY-MM-DD
+    """
+    start_day = _as_date(date_from)
+    end_day = _as_date(date_to)
+    start = local_midnight(start_day) if start_day else None
+    end = local_midnight(end_day + timedelta(days=1)) if end_day else None
+    return start, end
+
+
+def local_date_q(field, date_from=None, date_to=None):
+    """Q-умова field ∈ [date_from, date_to] за локальними днями (межі можна не вказувати)."""
+    start, end = local_day_range(date_from, date_to)
+    q = Q()
+    if start:
+        q &= Q(**{f'{field}__gte': start})
+    if end:
+        q &= Q(**{f'{field}__lt': end})
+    return q
+
+
+def local_day_q(field, day):
+    """Q-умова для одного локального дня (заміна field__date=day)."""
+    return local_date_q(field, day, day)
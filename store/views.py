@@ -1,19 +1,36 @@
 from django.shortcuts import render, get_object_or_404, redirect
-from django.http import JsonResponse, HttpResponse
+from django.template.loader import render_to_string
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse, FileResponse, Http404
+from django.core.handlers.asgi import ASGIRequest
+from asgiref.sync import sync_to_async
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.db.models import Q, F, Sum, DecimalField
+from django.db.models import Q, F, Sum, Count, Exists, OuterRef, Subquery, Value, DecimalField
+from django.db.models.functions import Coalesce
+from django.core.paginator import Paginator
 from django.db import transaction, models
 from django.utils import timezone
-from django.utils.dateparse import parse_datetime
 from decimal import Decimal, InvalidOperation
 from datetime import timedelta
+import asyncio
 import json
 import logging
-from .models import Product, Category, Order, OrderItem, Supplier, Purchase, PurchaseItem, WriteOff, Return, ReturnItem
+from .models import Product, Category, Order, OrderItem, Supplier, WriteOff, Return, ReturnItem, StockValuation
 from .forms import SupplierForm, PurchaseItemForm, WriteOffForm
-from .services import PurchaseService, OrderService, SupplierService, ReceiptService
-from .utils import role_required, ROLE_CASHIER, ROLE_MANAGER
+from .services import PurchaseService, OrderService, SupplierService, ReceiptService, StatsService, DashboardService, SalesCounterService, StockValuationService
+from .utils import role_required, get_role_level, ROLE_CASHIER, ROLE_MANAGER, local_date_q, local_day_q
+from .reports import run_parallel
+from .pagination import paginate_keyset
+from . import exports
+from . import receipt_export
+from . import labels
+from . import fragments
+from .fragments import cached_fragment, wants_fragment
+from . import jobs
+from .events import (
+    broadcaster, format_sse, publish_on_commit, publish_order,
+    EVENT_RETURN, EVENT_WRITEOFF,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -206,6 +223,7 @@ def cart_checkout(request, category_id):
             order = Order.objects.create()
             total = Decimal('0')
             profit = Decimal('0')
+            sold_lines = []
             
             for pid, qty in cart.items():
                 try:
@@ -226,8 +244,11 @@ def cart_checkout(request, category_id):
                         Product.objects.filter(id=p.id).update(
                             quantity=F('quantity') - qty_int
                         )
+                        StockValuation.apply_product_delta(p, -qty_int)
+                        p.stock_changed(p.quantity, p.quantity - qty_int)
                         total += p.price * qty_int
                         profit += (p.price - p.purchase_price) * qty_int
+                        sold_lines.append((p, qty_int, p.price))
                     else:
                         logger.warning(f"Insufficient quantity for product {p.id}: {p.quantity} < {qty_int}")
                         messages.warning(request, f"Товар '{p.name}' відсутній у потрібній кількості")
@@ -238,6 +259,8 @@ def cart_checkout(request, category_id):
             order.total_price = total
             order.total_profit = profit
             order.save()
+            SalesCounterService.record_order(order, sold_lines)
+            publish_order(order, sum(qty for _, qty, _ in sold_lines))
             
             # Очищення кошика
             del request.session['cart']
@@ -268,17 +291,21 @@ def manager_dashboard(request):
 
     today = timezone.localdate()
 
-    orders_today = Order.objects.filter(created_at__date=today)
-    agg = orders_today.aggregate(
-        cash=Sum('total_price'),
-        profit=Sum('total_profit')
-    )
+    results = run_parallel({
+        'agg': lambda: Order.objects.filter(local_day_q('created_at', today)).aggregate(
+            cash=Sum('total_price'),
+            profit=Sum('total_profit')
+        ),
+        'low_stock': Product.objects.filter(is_low_stock=True).select_related('category').order_by('quantity', 'name')[:20],
+        'latest_orders': Order.objects.order_by('-created_at').prefetch_related('items__product')[:10],
+    })
+    agg = results['agg']
 
     cash_today = agg['cash'] or Decimal('0')
     profit_today = agg['profit'] or Decimal('0')
 
-    low_stock = Product.objects.filter(quantity__lte=5).select_related('category').order_by('quantity', 'name')[:20]
-    latest_orders = Order.objects.order_by('-created_at').prefetch_related('items__product')[:10]
+    low_stock = results['low_stock']
+    latest_orders = results['latest_orders']
 
     return render(request, 'store/manager_dashboard.html', {
         'cash_today': cash_today,
@@ -312,57 +339,46 @@ def create_purchase_draft(request):
 
     supplier = get_object_or_404(Supplier, id=supplier_id)
 
-    expected_date = None
-    if expected_raw:
-        parsed = parse_datetime(expected_raw)
-        if parsed:
-            if timezone.is_naive(parsed):
-                parsed = timezone.make_aware(parsed, timezone.get_current_timezone())
-            expected_date = parsed
-
-    purchase = Purchase.objects.create(
-        supplier=supplier,
-        status='draft',
-        expected_date=expected_date,
+    created = PurchaseService.create_purchase_from_items(
+        items, {str(supplier.id): expected_raw}, supplier=supplier,
     )
+    purchase = next((entry for entry in created if entry['id']), None)
+    if purchase is None:
+        return JsonResponse({'status': 'error', 'message': 'Не вдалося додати жодну позицію'}, status=400)
+    jobs.expire(PurchaseService.REORDER_JOB)
 
-    total = Decimal('0')
-    created_count = 0
+    return JsonResponse({'status': 'success', 'purchase_id': purchase['id'], 'total_cost': purchase['total']})
 
-    for item in items:
-        pid = item.get('product_id')
-        qty_raw = item.get('quantity')
-        cost_raw = item.get('unit_cost')
 
-        if not pid or qty_raw is None:
-            continue
+@login_required
+@role_required(ROLE_MANAGER)
+def receive_purchases(request):
+    """
+    Масовий прийом поставок: {"purchase_ids": [...], "update_purchase_price": bool?}.
 
-        try:
-            product = Product.objects.get(id=int(pid))
-            qty = Decimal(str(qty_raw))
-            if qty <= 0:
-                continue
-            unit_cost = Decimal(str(cost_raw if cost_raw is not None else product.purchase_price))
-        except (Product.DoesNotExist, InvalidOperation, ValueError):
-            continue
+    Усі поставки проводяться однією транзакцією; у відповіді — результат
+    для кожної (received / already_received / cancelled / not_found).
+    """
+    if request.method != 'POST':
+        return JsonResponse({'status': 'error', 'message': 'Метод не дозволений'}, status=405)
 
-        PurchaseItem.objects.create(
-            purchase=purchase,
-            product=product,
-            quantity=qty,
-            unit_cost=unit_cost,
-        )
-        created_count += 1
-        total += qty * unit_cost
+    try:
+        payload = json.loads(request.body.decode('utf-8'))
+        purchase_ids = [int(purchase_id) for purchase_id in payload.get('purchase_ids') or []]
+    except (json.JSONDecodeError, UnicodeDecodeError, AttributeError, TypeError, ValueError):
+        return JsonResponse({'status': 'error', 'message': 'Невірний формат даних'}, status=400)
+    if not purchase_ids:
+        return JsonResponse({'status': 'error', 'message': 'Оберіть поставки'}, status=400)
 
-    if created_count == 0:
-        purchase.delete()
-        return JsonResponse({'status': 'error', 'message': 'Не вдалося додати жодну позицію'}, status=400)
+    update_price = payload.get('update_purchase_price')
+    results = PurchaseService.receive_purchases(
+        purchase_ids, None if update_price is None else bool(update_price),
+    )
+    received = sum(1 for result in results if result['result'] == PurchaseService.RECEIVED)
+    return JsonResponse({'status': 'success', 'received': received, 'purchases': results})
 
-    purchase.total_cost = total
-    purchase.save(update_fields=['total_cost'])
 
-    return JsonResponse({'status': 'success', 'purchase_id': purchase.id, 'total_cost': float(total)})
+RECEIPT_SORT_KEYS = {'id': 'id', 'date': 'created_at', 'total': 'total_price', 'profit': 'total_profit'}
 
 
 @login_required
@@ -370,129 +386,280 @@ def create_purchase_draft(request):
 def manager_receipts_list(request):
     """Сторінка списку всіх чеків з фільтром за датою та сортуванням."""
     from .models import Order
-    qs = Order.objects.all()
 
     # Фільтр за датою: ?date=YYYY-MM-DD
     date_str = request.GET.get('date')
-    if date_str:
-        try:
-            target = timezone.datetime.fromisoformat(date_str)
-            qs = qs.filter(created_at__date=target.date())
-        except Exception:
-            pass
-
     # Сортування: ?sort=id|date|total|profit
     sort = request.GET.get('sort', 'date')
     order = request.GET.get('order', 'desc')
+    if sort not in RECEIPT_SORT_KEYS:
+        sort = 'date'
+
+    def render_table():
+        qs = Order.objects.all()
+        if date_str:
+            try:
+                target = timezone.datetime.fromisoformat(date_str)
+                qs = qs.filter(local_day_q('created_at', target.date()))
+            except Exception:
+                pass
+
+        qs = qs.prefetch_related('items__product')
+        return render_to_string('store/partials/receipts_table.html', {
+            'orders': paginate_keyset(request, qs, RECEIPT_SORT_KEYS[sort], descending=(order != 'asc')),
+            'date': date_str or '',
+            'current_sort': sort,
+            'current_order': order,
+        })
 
-    if sort == 'id':
-        qs = qs.order_by('id' if order == 'asc' else '-id')
-    elif sort == 'total':
-        qs = qs.order_by('total_price' if order == 'asc' else '-total_price')
-    elif sort == 'profit':
-        qs = qs.order_by('total_profit' if order == 'asc' else '-total_profit')
-    else:  # date
-        qs = qs.order_by('created_at' if order == 'asc' else '-created_at')
-
-    # Пагінація проста: ?page=1
-    page = request.GET.get('page')
-    try:
-        page = int(page) if page else 1
-    except ValueError:
-        page = 1
-    page_size = 50
-    start = (page - 1) * page_size
-    end = start + page_size
-
-    orders = qs[start:end]
+    table_html = cached_fragment(request, 'receipts', fragments.RECEIPTS, render_table)
+    if wants_fragment(request):
+        return HttpResponse(table_html)
 
     return render(request, 'store/manager_receipts_list.html', {
-        'orders': orders,
-        'page': page,
+        'table_html': table_html,
         'date': date_str or '',
-        'current_sort': sort,
-        'current_order': order,
     })
 
 
+RECEIPT_EXPORT_MAX_DAYS = 31
+# Скільки чеків рендерити прямо у запиті; більші періоди — фоновою командою export_receipts
+RECEIPT_EXPORT_INLINE_MAX = receipt_export.EXPORT_CHUNK_SIZE
+
+
+@login_required
+@role_required(ROLE_MANAGER)
+def manager_receipts_export(request):
+    """
+    ZIP з PDF усіх чеків за період (?date_from=YYYY-MM-DD&date_to=YYYY-MM-DD).
+
+    Невеликий архів віддається потоково (вже відрендерені чеки беруться з
+    диска). Більший період експортує команда export_receipts окремим процесом
+    з паралельним рендером, а користувач переходить на сторінку експорту.
+    """
+    try:
+        date_from = timezone.datetime.strptime(request.GET.get('date_from', ''), '%Y-%m-%d').date()
+        date_to = timezone.datetime.strptime(request.GET.get('date_to') or date_from.isoformat(), '%Y-%m-%d').date()
+    except ValueError:
+        return HttpResponse('Вкажіть період у форматі YYYY-MM-DD', status=400)
+    if not 0 <= (date_to - date_from).days < RECEIPT_EXPORT_MAX_DAYS:
+        return HttpResponse(f'Період має бути від 1 до {RECEIPT_EXPORT_MAX_DAYS} днів', status=400)
+
+    ids = receipt_export.order_ids(date_from, date_to)
+    if len(ids) > RECEIPT_EXPORT_INLINE_MAX:
+        name = exports.start(
+            'export_receipts', [date_from.isoformat(), date_to.isoformat(), '--format', 'zip'],
+            f'receipts_{date_from}_{date_to}', 'zip',
+        )
+        return redirect('manager_export', name=name)
+
+    response = StreamingHttpResponse(
+        receipt_export.iter_zip(receipt_export.rendered_paths(ids)),
+        content_type='application/zip',
+    )
+    response['Content-Disposition'] = f'attachment; filename="receipts_{date_from}_{date_to}.zip"'
+    return response
+
+
+@login_required
+@role_required(ROLE_MANAGER)
+def manager_export(request, name):
+    """Сторінка фонового експорту: прогрес, помилка або готовий файл."""
+    found = exports.status(name)
+    if found is None:
+        raise Http404('Експорт не знайдено')
+    state, detail = found
+    if state == exports.READY:
+        return FileResponse(open(detail, 'rb'), as_attachment=True, filename=name)
+    return render(request, 'store/manager_export.html', {
+        'name': name,
+        'state': state,
+        'detail': detail,
+    }, status=202 if state == exports.RUNNING else 500)
+
+
 @login_required
 @role_required(ROLE_MANAGER)
 def manager_products_list(request):
     """Сторінка списку товарів з сортуванням та фільтром по категорії."""
     from .models import Product, Category
 
-    qs = Product.objects.select_related('category').all()
-
     # Фільтр за категорією: ?category=<id>
     category_id = request.GET.get('category')
-    if category_id:
-        try:
-            qs = qs.filter(category_id=int(category_id))
-        except ValueError:
-            pass
-
-    # Сортування: ?sort=quantity|name|price|profit
+    # Сортування: ?sort=quantity|name|price|profit|category|sku
+    # Індекси курсора є лише для name, quantity і price. Маржа (вираз), назва
+    # категорії (JOIN) і артикул (COALESCE) сортуються без індексу: кожна сторінка
+    # перебирає й сортує відфільтрований каталог повністю
     sort = request.GET.get('sort', 'name')
     order = request.GET.get('order', 'asc')
 
-    if sort == 'quantity':
-        qs = qs.order_by('quantity' if order == 'asc' else '-quantity')
-    elif sort == 'price':
-        qs = qs.order_by('price' if order == 'asc' else '-price')
-    elif sort == 'profit':
-        # маржа = price - purchase_price (сортуємо за нею)
-        from django.db.models import F, ExpressionWrapper, DecimalField
-        margin = ExpressionWrapper(F('price') - F('purchase_price'), output_field=DecimalField(max_digits=10, decimal_places=2))
-        qs = qs.annotate(margin=margin).order_by('margin' if order == 'asc' else '-margin')
-    elif sort == 'category':
-        qs = qs.order_by('category__name' if order == 'asc' else '-category__name')
-    elif sort == 'sku':
-        qs = qs.order_by('sku' if order == 'asc' else '-sku')
-    else:
-        qs = qs.order_by('name' if order == 'asc' else '-name')
+    def render_table():
+        qs = Product.objects.select_related('category').all()
+        if category_id:
+            try:
+                qs = qs.filter(category_id=int(category_id))
+            except ValueError:
+                pass
+
+        if sort == 'profit':
+            # маржа = price - purchase_price (сортуємо за нею)
+            from django.db.models import F, ExpressionWrapper, DecimalField
+            margin = ExpressionWrapper(F('price') - F('purchase_price'), output_field=DecimalField(max_digits=10, decimal_places=2))
+            qs = qs.annotate(margin=margin)
+            key = 'margin'
+        elif sort == 'sku':
+            # Артикул може бути NULL — для курсора потрібен порівнюваний ключ
+            qs = qs.annotate(sku_key=Coalesce('sku', Value('')))
+            key = 'sku_key'
+        else:
+            key = {'quantity': 'quantity', 'price': 'price', 'category': 'category__name'}.get(sort, 'name')
+
+        return render_to_string('store/partials/products_table.html', {
+            'products': paginate_keyset(request, qs, key, descending=(order == 'desc')),
+            'current_category': category_id,
+            'current_sort': sort,
+            'current_order': order,
+        })
+
+    table_html = cached_fragment(request, 'products', fragments.CATALOG, render_table)
+    # Сортування, фільтр і сторінки — лише таблиця, без навігації та списку категорій
+    if wants_fragment(request):
+        return HttpResponse(table_html)
 
     categories = Category.objects.all().order_by('name')
+    suppliers = Supplier.objects.all().order_by('name')
 
     return render(request, 'store/manager_products_list.html', {
-        'products': qs[:500],
+        'table_html': table_html,
         'categories': categories,
+        'suppliers': suppliers,
         'current_category': category_id,
-        'current_sort': sort,
-        'current_order': order,
     })
 
 
+@login_required
+@role_required(ROLE_MANAGER)
+def manager_labels(request):
+    """
+    Цінники зі штрихкодами (?category=&supplier=&changed_since=YYYY-MM-DD).
+
+    До labels.PART_SIZE товарів — один PDF прямо у відповіді. Більший набір
+    рендерить команда print_labels окремим процесом (ZIP з PDF-частинами,
+    паралельно), а користувач переходить на сторінку експорту.
+    """
+    try:
+        category_id = int(request.GET.get('category') or 0) or None
+        supplier_id = int(request.GET.get('supplier') or 0) or None
+        changed_since = request.GET.get('changed_since')
+        if changed_since:
+            changed_since = timezone.datetime.strptime(changed_since, '%Y-%m-%d').date()
+    except ValueError:
+        return HttpResponse('Некоректний фільтр', status=400)
+
+    ids = labels.product_ids(category_id, supplier_id, changed_since)
+    if not ids:
+        messages.warning(request, 'Немає товарів для друку цінників')
+        return redirect('manager_products_list')
+
+    if len(ids) <= labels.PART_SIZE:
+        response = HttpResponse(labels.render_part(ids), content_type='application/pdf')
+        response['Content-Disposition'] = 'attachment; filename="labels.pdf"'
+        return response
+
+    args = ['--format', 'zip']
+    if category_id:
+        args += ['--category', str(category_id)]
+    if supplier_id:
+        args += ['--supplier', str(supplier_id)]
+    if changed_since:
+        args += ['--changed-since', changed_since.isoformat()]
+    return redirect('manager_export', name=exports.start('print_labels', args, 'labels', 'zip'))
+
+
 @login_required
 @role_required(ROLE_MANAGER)
 def suppliers_list(request):
     """Сторінка списку постачальників (використання сервісу)."""
-    # Використовуємо сервіс для отримання даних
-    suppliers_data = SupplierService.get_suppliers_with_stats()
+    # Статистику прогріває планувальник (run_report_scheduler); товари підвантажує api_product_picker
+    suppliers_data = jobs.read(SupplierService.STATS_JOB)
     
-    products = Product.objects.select_related('category', 'supplier').order_by('name')
+    return render(request, 'store/suppliers_list.html', {
+        'suppliers': suppliers_data,
+        'categories': Category.objects.order_by('name'),
+    })
+
+
+PRODUCT_PICKER_PAGE_SIZE = 30
+
+
+@login_required
+@role_required(ROLE_MANAGER)
+def api_product_picker(request):
+    """
+    Сторінка товарів для формування закупівлі (JSON, курсорна пагінація).
     
-    products_payload = []
-    for p in products:
-        try:
-            products_payload.append({
+    Фільтри: ?supplier=<id> (разом із товарами без постачальника),
+    ?category=<id>, ?low_stock=1, ?q=<назва або SKU>; наступна сторінка — ?cursor=.
+    Спершу товари з найменшим залишком — їх першими дозамовляють.
+    """
+    try:
+        supplier_id = int(request.GET.get('supplier') or 0)
+        category_id = int(request.GET.get('category') or 0)
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': 'Некоректний фільтр'}, status=400)
+    
+    qs = Product.objects.select_related('category', 'supplier')
+    if supplier_id:
+        qs = qs.filter(Q(supplier_id=supplier_id) | Q(supplier__isnull=True))
+    if category_id:
+        qs = qs.filter(category_id=category_id)
+    if request.GET.get('low_stock') == '1':
+        qs = qs.filter(is_low_stock=True)
+    query = request.GET.get('q', '').strip()
+    if query:
+        qs = qs.filter(Q(name__icontains=query) | Q(sku__icontains=query))
+    
+    page = paginate_keyset(request, qs, 'quantity', page_size=PRODUCT_PICKER_PAGE_SIZE)
+    return JsonResponse({
+        'products': [
+            {
                 'id': p.id,
                 'name': p.name,
                 'sku': p.sku or '',
-                'stock': float(p.quantity),
+                'stock': p.quantity,
                 'purchase_price': float(p.purchase_price),
                 'supplier_id': p.supplier_id,
                 'supplier_name': p.supplier.name if p.supplier else '',
                 'category': p.category.name,
-            })
-        except (ValueError, InvalidOperation):
-            continue
-    
-    return render(request, 'store/suppliers_list.html', {
-        'suppliers': suppliers_data,
-        'products_json': json.dumps(products_payload, ensure_ascii=False),
+            }
+            for p in page
+        ],
+        'next_cursor': page.next_cursor,
+        'count': page.count,
+        'count_is_exact': page.count_is_exact,
     })
 
 
+@login_required
+@role_required(ROLE_MANAGER)
+def api_reorder_suggestions(request):
+    """
+    Пропозиції дозамовлення за прогнозом попиту (?supplier=<id> — лише одного постачальника).
+    
+    Прогноз перераховує планувальник (задача reorder_suggestions); позиції
+    мають формат items_json для create_purchase.
+    """
+    try:
+        supplier_id = int(request.GET.get('supplier') or 0)
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': 'Некоректний постачальник'}, status=400)
+    
+    groups = jobs.read(PurchaseService.REORDER_JOB)
+    if supplier_id:
+        groups = [group for group in groups if group['supplier_id'] == supplier_id]
+    return JsonResponse({'suppliers': groups})
+
+
 @login_required
 @role_required(ROLE_MANAGER)
 def create_supplier(request):
@@ -501,6 +668,7 @@ def create_supplier(request):
         form = SupplierForm(request.POST)
         if form.is_valid():
             supplier = form.save()
+            jobs.expire(SupplierService.STATS_JOB)
             messages.success(request, f'Постачальник "{supplier.name}" успішно додан')
         else:
             for field, errors in form.errors.items():
@@ -535,6 +703,8 @@ def create_purchase(request):
                 items_data=items_data,
                 expected_dates_data=expected_dates
             )
+            # Нові поставки враховуються як уже замовлене
+            jobs.expire(PurchaseService.REORDER_JOB)
             
             if not created_purchases:
                 messages.error(request, 'Не вдалося обробити жодну позицію')
@@ -582,112 +752,72 @@ def create_purchase(request):
 @login_required
 @role_required(ROLE_MANAGER)
 def stats_dashboard(request):
-    """Статистика продажів, прибутку та товарів."""
-    from django.db.models import Sum, Count, Avg, Q
-    
-    # Загальні показники
-    total_orders = Order.objects.count()
-    total_sales = Order.objects.aggregate(Sum('total_price'))['total_price__sum'] or Decimal('0')
-    total_profit = Order.objects.aggregate(Sum('total_profit'))['total_profit__sum'] or Decimal('0')
-    avg_check = total_sales / total_orders if total_orders > 0 else Decimal('0')
-    
-    # Показники за сьогодні
-    today = timezone.localdate()
-    today_orders_qs = Order.objects.filter(created_at__date=today)
-    today_orders_count = today_orders_qs.count()
-    today_sales = today_orders_qs.aggregate(Sum('total_price'))['total_price__sum'] or Decimal('0')
-    today_profit = today_orders_qs.aggregate(Sum('total_profit'))['total_profit__sum'] or Decimal('0')
-    today_avg_check = today_sales / today_orders_count if today_orders_count > 0 else Decimal('0')
-    
-    # Топ товарів за продажами
-    top_products = OrderItem.objects.values('product__name').annotate(
-        qty_sold=Sum('quantity'),
-        revenue=Sum(F('quantity') * F('price'), output_field=DecimalField())
-    ).order_by('-revenue')[:10]
-    
-    # Стан товарів
-    low_stock = Product.objects.filter(quantity__lte=5).count()
-    out_of_stock = Product.objects.filter(quantity=0).count()
-    total_products = Product.objects.count()
-    good_stock = total_products - low_stock - out_of_stock
-    total_stock_value = Product.objects.aggregate(
-        value=Sum(F('quantity') * F('purchase_price'), output_field=DecimalField())
-    )['value'] or Decimal('0')
-
-    # Повернення (рефунди)
-    # Агрегацію по сумах робимо на ReturnItem
-    returns_total_refund = ReturnItem.objects.aggregate(
-        total=Sum(F('quantity') * F('unit_price'), output_field=DecimalField())
-    )['total'] or Decimal('0')
-    returns_today_refund = ReturnItem.objects.filter(
-        return_instance__created_at__date=today
-    ).aggregate(
-        total=Sum(F('quantity') * F('unit_price'), output_field=DecimalField())
-    )['total'] or Decimal('0')
-    returns_count = Return.objects.count()
-    returns_today_count = Return.objects.filter(created_at__date=today).count()
-
-    # Потенційний збиток (ймовірно прострочиться невдовзі)
-    soon_days = 14
-    soon_threshold = timezone.now().date() + timedelta(days=soon_days)
-    potential_expiry_loss = Product.objects.filter(
-        expiry_date__isnull=False,
-        expiry_date__lte=soon_threshold,
-        quantity__gt=0
-    ).aggregate(
-        total=Sum(F('quantity') * F('purchase_price'), output_field=DecimalField())
-    )['total'] or Decimal('0')
-    
-    # Постачальники
-    supplier_count = Supplier.objects.count()
-    suppliers_active = Supplier.objects.filter(products__isnull=False).distinct().count()
-    
-    # Поставки
-    purchases_draft = Purchase.objects.filter(status='draft').count()
-    purchases_ordered = Purchase.objects.filter(status='ordered').count()
-    purchases_received = Purchase.objects.filter(status='received').count()
-    purchases_cancelled = Purchase.objects.filter(status='cancelled').count()
-    purchases_total = Purchase.objects.count()
-    
-    # Категорії - найпопулярніші
-    top_categories = OrderItem.objects.values('product__category__name').annotate(
-        qty=Sum('quantity'),
-        revenue=Sum(F('quantity') * F('price'), output_field=DecimalField())
-    ).order_by('-revenue')[:5]
-    
+    """Статистика продажів, прибутку та товарів (каркас; секції вантажаться окремо)."""
     return render(request, 'store/stats_dashboard.html', {
-        'total_orders': total_orders,
-        'total_sales': total_sales,
-        'total_profit': total_profit,
-        'avg_check': avg_check,
-        'today_sales': today_sales,
-        'today_profit': today_profit,
-        'today_orders': today_orders_count,
-        'today_avg_check': today_avg_check,
-        'top_products': list(top_products),
-        'low_stock': low_stock,
-        'out_of_stock': out_of_stock,
-        'good_stock': good_stock,
-        'total_products': total_products,
-        'total_stock_value': total_stock_value,
-        'supplier_count': supplier_count,
-        'suppliers_active': suppliers_active,
-        'purchases_draft': purchases_draft,
-        'purchases_ordered': purchases_ordered,
-        'purchases_received': purchases_received,
-        'purchases_cancelled': purchases_cancelled,
-        'purchases_total': purchases_total,
-        'top_categories': list(top_categories),
-        'today': today,
-        'returns_total_refund': returns_total_refund,
-        'returns_today_refund': returns_today_refund,
-        'returns_count': returns_count,
-        'returns_today_count': returns_today_count,
-        'potential_expiry_loss': potential_expiry_loss,
-        'soon_days': soon_days,
+        'sections': DashboardService.sections(),
+        'soon_days': DashboardService.SOON_EXPIRY_DAYS,
+        'today': timezone.localdate(),
     })
 
 
+@login_required
+@role_required(ROLE_MANAGER)
+def api_dashboard_section(request, section):
+    """API: дані однієї секції аналітики (з власним кешем)."""
+    try:
+        data = DashboardService.get_section(section)
+    except KeyError:
+        return JsonResponse({'status': 'error', 'message': 'Невідома секція'}, status=404)
+    return JsonResponse(data)
+
+
+# === ЖИВИЙ ПОТІК ПОДІЙ (SSE) ===
+
+SSE_HEARTBEAT_SECONDS = 15
+
+
+async def event_stream(request):
+    """
+    Server-Sent Events: нові продажі, повернення, списання та зміни залишків.
+
+    Працює лише під ASGI-сервером (shop_core.asgi): під WSGI потік
+    зайняв би робочий потік сервера назавжди. Касири не отримують прибутку
+    й втрат (events.MANAGER_ONLY_FIELDS).
+    """
+    user = await request.auser()
+    role = await sync_to_async(get_role_level)(user)
+    if role < ROLE_CASHIER:
+        return JsonResponse({'status': 'error', 'message': 'Потрібна авторизація'}, status=403)
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'status': 'error', 'message': 'Потік подій доступний лише через ASGI'}, status=501)
+
+    try:
+        last_event_id = int(request.headers.get('Last-Event-ID', ''))
+    except ValueError:
+        last_event_id = None
+
+    async def stream():
+        queue = broadcaster.subscribe(last_event_id)
+        try:
+            # Клієнт перепідключиться через 3 с після обриву
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=SSE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    # Коментар-пінг не дає проксі закрити "тихе" з'єднання
+                    yield ": ping\n\n"
+                    continue
+                yield format_sse(event, manager=role >= ROLE_MANAGER)
+        finally:
+            broadcaster.unsubscribe(queue)
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 # === СПИСАННЯ ТОВАРІВ ===
 
 @login_required
@@ -708,34 +838,33 @@ def writeoffs_list(request):
     if date_from:
         try:
             from_date = timezone.datetime.strptime(date_from, '%Y-%m-%d').date()
-            writeoffs = writeoffs.filter(created_at__date__gte=from_date)
+            writeoffs = writeoffs.filter(local_date_q('created_at', date_from=from_date))
         except ValueError:
             pass
     
     if date_to:
         try:
             to_date = timezone.datetime.strptime(date_to, '%Y-%m-%d').date()
-            writeoffs = writeoffs.filter(created_at__date__lte=to_date)
+            writeoffs = writeoffs.filter(local_date_q('created_at', date_to=to_date))
         except ValueError:
             pass
     
-    writeoffs = writeoffs.order_by('-created_at')[:100]
-    
-    # Статистика
-    total_loss = WriteOff.objects.aggregate(
-        total=Sum(F('quantity') * F('purchase_price'), output_field=DecimalField())
-    )['total'] or Decimal('0')
-    
     today = timezone.localdate()
-    today_loss = WriteOff.objects.filter(created_at__date=today).aggregate(
-        total=Sum(F('quantity') * F('purchase_price'), output_field=DecimalField())
-    )['total'] or Decimal('0')
+    loss = Sum(F('quantity') * F('purchase_price'), output_field=DecimalField())
     
-    month_loss = WriteOff.objects.filter(
-        created_at__date__gte=today.replace(day=1)
-    ).aggregate(
-        total=Sum(F('quantity') * F('purchase_price'), output_field=DecimalField())
-    )['total'] or Decimal('0')
+    # Список і статистика незалежні — виконуємо паралельно
+    results = run_parallel({
+        'writeoffs': lambda: paginate_keyset(request, writeoffs, 'created_at', descending=True),
+        'total_loss': lambda: WriteOff.objects.aggregate(total=loss)['total'],
+        'today_loss': lambda: WriteOff.objects.filter(local_day_q('created_at', today)).aggregate(total=loss)['total'],
+        'month_loss': lambda: WriteOff.objects.filter(
+            local_date_q('created_at', date_from=today.replace(day=1))
+        ).aggregate(total=loss)['total'],
+    })
+    writeoffs = results['writeoffs']
+    total_loss = results['total_loss'] or Decimal('0')
+    today_loss = results['today_loss'] or Decimal('0')
+    month_loss = results['month_loss'] or Decimal('0')
     
     return render(request, 'store/writeoffs_list.html', {
         'writeoffs': writeoffs,
@@ -761,12 +890,29 @@ def writeoff_create(request):
             writeoff = form.save(commit=False)
             writeoff.manager = request.user
             
+            # Як у process_return: товар блокується, а залишок перевіряється вже
+            # під блокуванням — форма бачила його до паралельних продажів
+            product = Product.objects.select_for_update().get(id=writeoff.product_id)
+            if product.quantity < writeoff.quantity:
+                form.add_error('quantity', f'Недостатньо товару на складі. Доступно: {product.quantity} шт.')
+                return render(request, 'store/writeoff_create.html', {'form': form})
+            writeoff.product = product
+            
             # Списуємо товар зі складу
-            product = writeoff.product
+            Product.objects.filter(id=product.id).update(quantity=F('quantity') - writeoff.quantity)
+            StockValuation.apply_product_delta(product, -writeoff.quantity)
+            old_quantity = product.quantity
             product.quantity -= writeoff.quantity
-            product.save(update_fields=['quantity'])
+            product.stock_changed(old_quantity, product.quantity)
             
             writeoff.save()
+            SalesCounterService.record_writeoff(writeoff)
+            publish_on_commit(EVENT_WRITEOFF, {
+                'id': writeoff.id,
+                'product': product.name,
+                'quantity': writeoff.quantity,
+                'loss': writeoff.get_total_loss(),
+            })
             
             messages.success(
                 request,
@@ -803,14 +949,16 @@ def expired_products(request):
         quantity__gt=0
     ).select_related('category', 'supplier').order_by('expiry_date')
     
-    # Підрахунок потенційних збитків
-    expired_loss = expired.aggregate(
-        total=Sum(F('quantity') * F('purchase_price'), output_field=DecimalField())
-    )['total'] or Decimal('0')
+    # Потенційні збитки — з накопичувальних підсумків вартості складу
+    expired_loss = StockValuationService.expiry_value(date_to=today - timedelta(days=1))
+    expiring_loss = StockValuationService.expiry_value(date_from=today, date_to=today + timedelta(days=warning_days))
     
-    expiring_loss = expiring_soon.aggregate(
-        total=Sum(F('quantity') * F('purchase_price'), output_field=DecimalField())
-    )['total'] or Decimal('0')
+    results = run_parallel({
+        'expired': expired,
+        'expiring_soon': expiring_soon,
+    })
+    expired = results['expired']
+    expiring_soon = results['expiring_soon']
     
     return render(request, 'store/expired_products.html', {
         'expired': expired,
@@ -831,18 +979,18 @@ def receipt_details(request, order_id):
     Використовується для виведення чека у модальному вікні.
     """
     try:
-        order = get_object_or_404(Order, id=order_id)
-        
-        # Генеруємо HTML чека
-        receipt_html = ReceiptService.generate_receipt_html(order)
+        # Готовий HTML з кешу — без запитів до БД при повторних відкриттях
+        receipt = ReceiptService.get_receipt_html(order_id)
         
         return JsonResponse({
             'status': 'success',
-            'order_id': order.id,
-            'receipt_html': receipt_html,
-            'total': float(order.total_price),
-            'created_at': order.created_at.strftime('%d.%m.%Y %H:%M:%S')
+            'order_id': order_id,
+            'receipt_html': receipt['html'],
+            'total': receipt['total'],
+            'created_at': receipt['created_at']
         })
+    except Order.DoesNotExist:
+        return JsonResponse({'status': 'error', 'message': 'Чек не знайдено'}, status=404)
     except Exception as e:
         logger.error(f"Error in receipt_details: {e}")
         return JsonResponse({
@@ -858,21 +1006,42 @@ def receipt_download_pdf(request, order_id):
     Endpoint для завантаження чека у форматі PDF.
     """
     try:
-        order = get_object_or_404(Order, id=order_id)
+        # PDF рендериться один раз і далі віддається з диска
+        pdf_path = ReceiptService.get_receipt_pdf_path(order_id)
         
-        # Генеруємо PDF
-        pdf_buffer = ReceiptService.generate_receipt_pdf(order)
-        
-        # Готуємо відповідь
-        response = HttpResponse(pdf_buffer.getvalue(), content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="receipt_{order.id}.pdf"'
-        
-        return response
+        return FileResponse(
+            open(pdf_path, 'rb'),
+            as_attachment=True,
+            filename=f'receipt_{order_id}.pdf',
+            content_type='application/pdf',
+        )
+    except Order.DoesNotExist:
+        raise Http404('Чек не знайдено')
     except Exception as e:
         logger.error(f"Error in receipt_download_pdf: {e}")
         return HttpResponse('Помилка при генеруванні PDF', status=400)
 
 
+@login_required
+@role_required(ROLE_CASHIER)
+def receipt_download_escpos(request, order_id):
+    """
+    Чек у форматі ESC/POS для прямого друку на термопринтер 80 мм
+    (напр. `cat receipt.bin > /dev/usb/lp0` або через агент друку каси).
+    """
+    try:
+        data = ReceiptService.get_receipt_escpos(order_id)
+    except Order.DoesNotExist:
+        raise Http404('Чек не знайдено')
+    
+    response = HttpResponse(data, content_type='application/octet-stream')
+    response['Content-Disposition'] = f'attachment; filename="receipt_{order_id}.bin"'
+    return response
+
+
+CASHIER_RECEIPTS_PAGE_SIZE = 50
+
+
 @login_required
 @role_required(ROLE_CASHIER)
 def receipts_list_cashier(request):
@@ -884,7 +1053,19 @@ def receipts_list_cashier(request):
     date_from = request.GET.get('date_from', '')
     date_to = request.GET.get('date_to', '')
     
-    orders = Order.objects.all().prefetch_related('items__product')
+    # Кількість позицій та повернені одиниці — корельованими підзапитами,
+    # щоб вартість сторінки не залежала від кількості чеків
+    items_count = OrderItem.objects.filter(order=OuterRef('pk')).values('order').annotate(
+        c=Count('id')
+    ).values('c')
+    returned_qty = ReturnItem.objects.filter(return_instance__order=OuterRef('pk')).values(
+        'return_instance__order'
+    ).annotate(total=Sum('quantity')).values('total')
+    orders = Order.objects.annotate(
+        items_count=Coalesce(Subquery(items_count), 0),
+        has_returns=Exists(Return.objects.filter(order=OuterRef('pk'))),
+        total_returned=Coalesce(Subquery(returned_qty), 0),
+    )
     
     # Пошук за номером чека
     if search_query:
@@ -894,23 +1075,23 @@ def receipts_list_cashier(request):
         except ValueError:
             orders = orders.none()
     
-    # Фільтр за датою
-    if date_from:
-        orders = orders.filter(created_at__date__gte=date_from)
-    if date_to:
-        orders = orders.filter(created_at__date__lte=date_to)
+    # Фільтр за датою (некоректні дати ігноруються)
+    try:
+        orders = orders.filter(local_date_q('created_at', date_from or None, date_to or None))
+    except ValueError:
+        pass
     
-    orders = orders.order_by('-created_at')
+    orders = orders.order_by('-created_at', '-id')
+    page_obj = Paginator(orders, CASHIER_RECEIPTS_PAGE_SIZE).get_page(request.GET.get('page'))
     
-    # Додаємо інформацію про повернення
-    for order in orders:
-        order.has_returns = order.returns.exists()
-        order.total_returned = order.returns.aggregate(
-            total=Sum('items__quantity')
-        )['total'] or 0
+    # Параметри фільтра для посилань пагінації
+    filter_params = request.GET.copy()
+    filter_params.pop('page', None)
     
     return render(request, 'store/receipts_list_cashier.html', {
-        'orders': orders,
+        'orders': page_obj,
+        'page_obj': page_obj,
+        'filter_query': filter_params.urlencode(),
         'search_query': search_query,
         'date_from': date_from,
         'date_to': date_to,
@@ -1013,23 +1194,45 @@ def process_return(request, order_id):
                 comment=comment,
                 processed_by=request.user
             )
+            returned_lines = []
+            # Як у cart_checkout: товари блокуються (в порядку id), тож залишок і
+            # is_low_stock свіжі — паралельний продаж не зіб'є порівняння прапорця
+            locked = {
+                product.id: product for product in Product.objects.select_for_update()
+                .filter(id__in=[item['product_id'] for item in items_to_return]).order_by('id')
+            }
             
             for return_item_data in items_to_return:
                 product_id = return_item_data['product_id']
                 quantity = return_item_data['quantity']
                 order_item = order_items_map[product_id]
+                product = locked[product_id]
                 
                 # Створюємо позицію повернення
                 ReturnItem.objects.create(
                     return_instance=return_obj,
-                    product=order_item.product,
+                    product=product,
                     quantity=quantity,
                     unit_price=order_item.price,
-                    purchase_price=order_item.product.purchase_price
+                    purchase_price=product.purchase_price
                 )
                 
                 # Повертаємо товар на склад
                 Product.objects.filter(id=product_id).update(quantity=F('quantity') + quantity)
+                StockValuation.apply_product_delta(product, quantity)
+                old_quantity = product.quantity
+                product.quantity += quantity
+                product.stock_changed(old_quantity, product.quantity)
+                returned_lines.append((product, quantity, order_item.price))
+            
+            SalesCounterService.record_return(returned_lines)
+            SalesCounterService.record_return_totals(return_obj)
+            publish_on_commit(EVENT_RETURN, {
+                'id': return_obj.id,
+                'order_id': order.id,
+                'refund': return_obj.get_total_refund(),
+                'loss': return_obj.get_total_loss(),
+            })
             
             logger.info(f"Return #{return_obj.id} created for order #{order.id} by user {request.user.username}")
             
@@ -1050,87 +1253,79 @@ def process_return(request, order_id):
 
 # === API ДЛЯ ГРАФІКІВ СТАТИСТИКИ ===
 
+def _parse_chart_range(request):
+    """Читає ?days=7..365 та ?period=day|week|month з запиту."""
+    try:
+        days = int(request.GET.get('days', StatsService.DEFAULT_DAYS))
+    except ValueError:
+        days = StatsService.DEFAULT_DAYS
+    period = request.GET.get('period', 'day')
+    return days, period
+
+
 @login_required
 @role_required(ROLE_MANAGER)
-def api_sales_chart_data(request):
-    """API для отримання даних продажів за останні 30 днів"""
-    from datetime import timedelta
-    
-    today = timezone.localdate()
-    days_ago_30 = today - timedelta(days=29)
-    
-    # Отримуємо продажі по днях за останні 30 днів
-    daily_sales = []
-    labels = []
+def api_chart_data(request):
+    """API: продажі, прибуток і кількість чеків по днях/тижнях/місяцях (один запит)."""
+    days, period = _parse_chart_range(request)
+    return JsonResponse(StatsService.get_sales_timeline(days=days, period=period))
+
+
+@login_required
+@role_required(ROLE_MANAGER)
+def api_sales_heatmap(request):
+    """API: теплова карта продажів (година × день тижня) за ?date_from / ?date_to."""
+    def parse_date(value):
+        try:
+            return timezone.datetime.strptime(value, '%Y-%m-%d').date() if value else None
+        except ValueError:
+            return None
     
-    for i in range(30):
-        current_date = days_ago_30 + timedelta(days=i)
-        day_sales = Order.objects.filter(
-            created_at__date=current_date
-        ).aggregate(
-            total=Sum('total_price')
-        )['total'] or 0
-        
-        daily_sales.append(float(day_sales))
-        labels.append(current_date.strftime('%d.%m'))
+    return JsonResponse(StatsService.get_sales_heatmap(
+        date_from=parse_date(request.GET.get('date_from')),
+        date_to=parse_date(request.GET.get('date_to')),
+    ))
+
+
+@login_required
+@role_required(ROLE_MANAGER)
+def api_sales_chart_data(request):
+    """API для отримання даних продажів (за замовчуванням 30 днів)"""
+    days, period = _parse_chart_range(request)
+    timeline = StatsService.get_sales_timeline(days=days, period=period)
     
     return JsonResponse({
-        'labels': labels,
-        'data': daily_sales
+        'labels': timeline['labels'],
+        'data': timeline['sales']
     })
 
 
 @login_required
 @role_required(ROLE_MANAGER)
 def api_category_chart_data(request):
-    """API для отримання структури продажів за категоріями"""
-    
-    # Топ-5 категорій за виручкою
-    category_sales = OrderItem.objects.values(
-        'product__category__name'
-    ).annotate(
-        total=Sum(F('quantity') * F('price'), output_field=DecimalField())
-    ).order_by('-total')[:5]
-    
-    labels = []
-    data = []
+    """API для отримання структури продажів за категоріями (?days=N — ковзне вікно)"""
+    try:
+        days = int(request.GET['days']) if request.GET.get('days') else None
+    except ValueError:
+        days = None
     
-    for item in category_sales:
-        category_name = item['product__category__name'] or 'Без категорії'
-        labels.append(category_name)
-        data.append(float(item['total']))
+    # Топ-5 категорій за виручкою (з лічильників продажів)
+    category_sales = SalesCounterService.top_categories(limit=5, days=days)
     
     return JsonResponse({
-        'labels': labels,
-        'data': data
+        'labels': [item['name'] for item in category_sales],
+        'data': [item['revenue'] for item in category_sales]
     })
 
 
 @login_required
 @role_required(ROLE_MANAGER)
 def api_profit_chart_data(request):
-    """API для отримання даних прибутку за останні 30 днів"""
-    from datetime import timedelta
-    
-    today = timezone.localdate()
-    days_ago_30 = today - timedelta(days=29)
-    
-    daily_profit = []
-    labels = []
-    
-    for i in range(30):
-        current_date = days_ago_30 + timedelta(days=i)
-        day_profit = Order.objects.filter(
-            created_at__date=current_date
-        ).aggregate(
-            total=Sum('total_profit')
-        )['total'] or 0
-        
-        daily_profit.append(float(day_profit))
-        labels.append(current_date.strftime('%d.%m'))
+    """API для отримання даних прибутку (за замовчуванням 30 днів)"""
+    days, period = _parse_chart_range(request)
+    timeline = StatsService.get_sales_timeline(days=days, period=period)
     
     return JsonResponse({
-        'labels': labels,
-        'data': daily_profit
+        'labels': timeline['labels'],
+        'data': timeline['profit']
     })
-
@@ -0,0 +1,47 @@
+"""
+Потокове формування ZIP без тимчасового файлу.
+
+zipfile пише у «файл» без seek (і сам переходить на data descriptors), а
+генератор після кожного запису віддає накопичені байти — у пам'яті лише
+поточний файл архіву.
+"""
+import io
+import zipfile
+
+
+class ZipStream(io.RawIOBase):
+    """Файл лише для запису: zipfile пише сюди, генератор забирає записані байти."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def pop(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def iter_zip(entries):
+    """
+    Args:
+        entries: iterable[(ім'я в архіві, bytes | шлях до файлу)]
+
+    Yields:
+        bytes - наступна частина архіву
+    """
+    stream = ZipStream()
+    with zipfile.ZipFile(stream, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for arcname, data in entries:
+            if isinstance(data, bytes):
+                archive.writestr(arcname, data)
+            else:
+                archive.write(data, arcname)
+            yield stream.pop()
+    yield stream.pop()